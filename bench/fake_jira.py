@@ -0,0 +1,475 @@
+"""Servidor Jira falso para medir os scripts sem uma instância real.
+
+Cobre o subconjunto da API usado pelo projeto (`serverInfo`, `field`, `issue`, `issue/bulk`, `search` e
+`/rest/agile/1.0/issue/rank`), com Rank no estilo LexoRank, latência configurável e injeção de 429.
+Uso avulso: python bench/fake_jira.py --epics 50 --children 40 --port 8089
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+RANK_FIELD = 'customfield_10019'
+EPIC_LINK_FIELD = 'customfield_10000'
+SPRINT_FIELD = 'customfield_10020'
+SEVERITY_FIELD = 'customfield_10210'
+
+FIELDS = [
+    {'id': 'summary', 'name': 'Summary', 'custom': False, 'schema': {'type': 'string', 'system': 'summary'}},
+    {'id': 'status', 'name': 'Status', 'custom': False, 'schema': {'type': 'status', 'system': 'status'}},
+    {'id': 'priority', 'name': 'Priority', 'custom': False, 'schema': {'type': 'priority', 'system': 'priority'}},
+    {'id': 'issuetype', 'name': 'Issue Type', 'custom': False, 'schema': {'type': 'issuetype', 'system': 'issuetype'}},
+    {'id': 'assignee', 'name': 'Assignee', 'custom': False, 'schema': {'type': 'user', 'system': 'assignee'}},
+    {'id': 'components', 'name': 'Component/s', 'custom': False, 'schema': {'type': 'array', 'system': 'components'}},
+    {'id': RANK_FIELD, 'name': 'Rank', 'custom': True, 'schema': {'type': 'any', 'custom': 'com.pyxis.greenhopper.jira:gh-lexo-rank'}},
+    {'id': EPIC_LINK_FIELD, 'name': 'Epic Link', 'custom': True, 'schema': {'type': 'any', 'custom': 'com.pyxis.greenhopper.jira:gh-epic-link'}},
+    {'id': SPRINT_FIELD, 'name': 'Sprint', 'custom': True, 'schema': {'type': 'array', 'custom': 'com.pyxis.greenhopper.jira:gh-sprint'}},
+    {'id': SEVERITY_FIELD, 'name': 'Gravidade', 'custom': True, 'schema': {'type': 'option', 'custom': 'com.atlassian.jira.plugin.system.customfieldtypes:select'}},
+]
+
+STATUSES = [('To Do', 2), ('Em andamento', 4), ('FECHADO', 3), ('RESOLVIDO', 3)]
+PRIORITIES = [('1', 'Highest'), ('2', 'High'), ('3', 'Medium'), ('4', 'Low'), ('5', 'Lowest')]
+ISSUE_TYPES = ['Story', 'Task', 'Bug']
+SEVERITIES = ['Bloqueante', 'Crítico', 'Normal']
+COMPONENTS = ['Backend', 'Frontend', 'Infra', 'Dados']
+PEOPLE = ['Fulano de Tal', 'Ciclana da Silva', 'Beltrana Souza', 'João Pereira', 'Maria Oliveira']
+
+_DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+
+def _to_base36(value, width):
+    chars = []
+    for _ in range(width):
+        value, digit = divmod(value, 36)
+        chars.append(_DIGITS[digit])
+    return ''.join(reversed(chars))
+
+
+def _from_base36(text, width):
+    value = 0
+    for ch in text.ljust(width, '0'):
+        value = value * 36 + _DIGITS.index(ch)
+    return value
+
+
+def ranks_between(low, high, count):
+    """`count` valores de rank (corpo base 36) estritamente entre `low` e `high` (None = extremidade), como no LexoRank."""
+    width = max(len(low or ''), len(high or ''), 6)
+    while True:
+        a = _from_base36(low, width) if low else 0
+        b = _from_base36(high, width) if high else 36 ** width
+        if b - a > count:
+            step = (b - a) // (count + 1)
+            return [_to_base36(a + step * (i + 1), width) for i in range(count)]
+        width += 1
+
+
+class FakeJiraData:
+    """Projeto sintético: épicos com filhas (e subtarefas opcionais) em um board com ordem por Rank."""
+
+    def __init__(self, project='BENCH', epics=10, children=20, subtasks=0, seed=0):
+        self.project = project
+        self.rnd = random.Random(seed)
+        self.issues = {}
+        self.rank = {}
+        self.updated = {}
+        self.next_id = 1
+        self.lock = threading.RLock()
+        today = date.today()
+        sprints = [
+            f"com.atlassian.greenhopper.service.sprint.Sprint@{i}[id={i},rapidViewId=1,state=CLOSED,name=Sprint {i},"
+            f"startDate={(today - timedelta(days=14 * (10 - i))).isoformat()}T09:00:00.000Z,endDate=<null>,sequence={i}]"
+            for i in range(1, 10)
+        ]
+        for _ in range(epics):
+            epic_key = self._add({'issuetype': {'id': '10000', 'name': 'Epic', 'subtask': False}, 'summary': f'Épico {self.next_id}'})
+            for _ in range(children):
+                status, category = self.rnd.choice(STATUSES)
+                resolved = (today - timedelta(days=self.rnd.randint(0, 365))).isoformat() if category == 3 else None
+                child_key = self._add({
+                    'issuetype': {'id': '1', 'name': self.rnd.choice(ISSUE_TYPES), 'subtask': False},
+                    'summary': f'Tarefa {self.rnd.randint(1, 9999)}',
+                    'status': {'name': status, 'statusCategory': {'id': category}},
+                    'priority': dict(zip(('id', 'name'), self.rnd.choice(PRIORITIES))),
+                    'assignee': {'displayName': self.rnd.choice(PEOPLE)} if self.rnd.random() > 0.1 else None,
+                    'components': [{'name': c} for c in self.rnd.sample(COMPONENTS, self.rnd.randint(0, 2))],
+                    EPIC_LINK_FIELD: epic_key,
+                    SPRINT_FIELD: [self.rnd.choice(sprints)] if self.rnd.random() > 0.3 else None,
+                    SEVERITY_FIELD: {'value': self.rnd.choice(SEVERITIES)} if self.rnd.random() > 0.4 else None,
+                    'resolutiondate': resolved,
+                    'created': (today - timedelta(days=self.rnd.randint(0, 400))).isoformat(),
+                    'subtasks': [],
+                })
+                for _ in range(subtasks):
+                    status, category = self.rnd.choice(STATUSES)
+                    sub_key = self._add({
+                        'issuetype': {'id': '5', 'name': 'Sub-task', 'subtask': True},
+                        'summary': f'Subtarefa {self.rnd.randint(1, 9999)}',
+                        'status': {'name': status, 'statusCategory': {'id': category}},
+                        'priority': dict(zip(('id', 'name'), self.rnd.choice(PRIORITIES))),
+                        'parent': {'key': child_key},
+                    })
+                    self.issues[child_key]['fields']['subtasks'].append({'key': sub_key})
+        # Ordem inicial embaralhada, com ranks bem espaçados
+        keys = list(self.issues)
+        self.rnd.shuffle(keys)
+        for key, value in zip(keys, ranks_between(None, None, len(keys))):
+            self.rank[key] = value
+
+    def _add(self, fields):
+        key = f"{self.project}-{self.next_id}"
+        fields.setdefault('status', {'name': 'To Do', 'statusCategory': {'id': 2}})
+        fields.setdefault('priority', {'id': '3', 'name': 'Medium'})
+        fields['project'] = {'key': self.project}
+        self.issues[key] = {'id': str(10000 + self.next_id), 'key': key, 'fields': fields}
+        self.updated[key] = 0.0
+        self.next_id += 1
+        return key
+
+    def ordered(self, keys):
+        return sorted(keys, key=lambda k: self.rank.get(k, ''))
+
+    def issue_json(self, key, fields=None, base_url=''):
+        issue = self.issues[key]
+        all_fields = dict(issue['fields'])
+        all_fields[RANK_FIELD] = f"0|{self.rank.get(key, '')}"
+        if fields is not None and '*all' not in fields and '*navigable' not in fields:
+            all_fields = {name: all_fields.get(name) for name in fields if name in all_fields or name == RANK_FIELD}
+        return {'id': issue['id'], 'key': key, 'self': f"{base_url}rest/api/2/issue/{issue['id']}", 'fields': all_fields}
+
+    def create(self, fields):
+        with self.lock:
+            data = {k: v for k, v in fields.items() if k != 'project'}
+            if 'issuetype' in data:
+                data['issuetype'] = {'name': data['issuetype'].get('name'), 'subtask': data['issuetype'].get('name', '').lower().startswith('sub')}
+            key = self._add(data)
+            last = max(self.rank.values()) if self.rank else None
+            self.rank[key] = ranks_between(last, None, 1)[0]
+            self.updated[key] = time.time()
+            parent = (data.get('parent') or {}).get('key')
+            if parent in self.issues:
+                self.issues[parent]['fields'].setdefault('subtasks', []).append({'key': key})
+            return self.issues[key]
+
+    def move(self, keys, after=None, before=None):
+        """Reposiciona `keys` (na ordem dada) logo depois de `after` ou logo antes de `before`."""
+        with self.lock:
+            moving = set(keys)
+            order = [k for k in self.ordered(self.rank) if k not in moving]
+            if after is not None:
+                pos = order.index(after) + 1
+            else:
+                pos = order.index(before)
+            low = self.rank[order[pos - 1]] if pos > 0 else None
+            high = self.rank[order[pos]] if pos < len(order) else None
+            for key, value in zip(keys, ranks_between(low, high, len(keys))):
+                self.rank[key] = value
+
+
+def _split_keys(text):
+    return [k.strip().strip('\'"') for k in text.split(',') if k.strip()]
+
+
+def parse_jql(jql):
+    """Converte o subconjunto de JQL usado pelos scripts em uma lista de predicados e a ordenação."""
+    order_by = None
+    m = re.search(r'\s+ORDER\s+BY\s+(\w+)(?:\s+(ASC|DESC))?\s*$', jql, re.IGNORECASE)
+    if m:
+        order_by = (m.group(1).lower(), (m.group(2) or 'ASC').upper())
+        jql = jql[:m.start()]
+    clauses = [c.strip() for c in re.split(r'\s+AND\s+', jql, flags=re.IGNORECASE) if c.strip()]
+    return clauses, order_by
+
+
+def _clause_predicate(clause, data=None):
+    c = clause.strip()
+    m = re.match(r'project\s*=\s*["\']?([^"\']+)["\']?$', c, re.IGNORECASE)
+    if m:
+        return lambda i: i['fields'].get('project', {}).get('key') == m.group(1)
+    m = re.match(r'(?:issuetype|type)\s*=\s*["\']?(\w+)["\']?$', c, re.IGNORECASE)
+    if m:
+        return lambda i: (i['fields'].get('issuetype') or {}).get('name') == m.group(1)
+    if re.match(r'type\s+IN\s+standardIssueTypes\(\)$', c, re.IGNORECASE):
+        return lambda i: not (i['fields'].get('issuetype') or {}).get('subtask')
+    m = re.match(r"'Epic Link'\s*(?:=\s*'([^']+)'|in\s*\((.+)\))$", c, re.IGNORECASE)
+    if m:
+        keys = {m.group(1)} if m.group(1) else set(_split_keys(m.group(2)))
+        return lambda i: i['fields'].get(EPIC_LINK_FIELD) in keys
+    m = re.match(r"parent\s*(?:=\s*'([^']+)'|in\s*\((.+)\))$", c, re.IGNORECASE)
+    if m:
+        keys = {m.group(1)} if m.group(1) else set(_split_keys(m.group(2)))
+        return lambda i: (i['fields'].get('parent') or {}).get('key') in keys
+    m = re.match(r'key\s+in\s*\((.+)\)$', c, re.IGNORECASE)
+    if m:
+        keys = set(_split_keys(m.group(1)))
+        return lambda i: i['key'] in keys
+    m = re.match(r'sprint\s*(?:=\s*"(.+)"|IN\s*\((.+)\))$', c, re.IGNORECASE)
+    if m:
+        names = {m.group(1)} if m.group(1) else set(_split_keys(m.group(2)))
+        return lambda i: any(f"name={n}," in s for s in (i['fields'].get(SPRINT_FIELD) or []) for n in names)
+    m = re.match(r'status\s+IN\s*\((.+)\)$', c, re.IGNORECASE)
+    if m:
+        names = {n.upper() for n in _split_keys(m.group(1))}
+        return lambda i: (i['fields'].get('status') or {}).get('name', '').upper() in names
+    m = re.match(r"resolved\s*(>=|<=|<)\s*'([\d-]+)'$", c, re.IGNORECASE)
+    if m:
+        op, day = m.groups()
+        if op == '>=':
+            return lambda i: (i['fields'].get('resolutiondate') or '') >= day and i['fields'].get('resolutiondate') is not None
+        if op == '<':
+            return lambda i: i['fields'].get('resolutiondate') is not None and i['fields']['resolutiondate'][:10] < day
+        return lambda i: i['fields'].get('resolutiondate') is not None and i['fields']['resolutiondate'][:10] <= day
+    m = re.match(r'updated\s*>=\s*-(\d+)m$', c, re.IGNORECASE)
+    if m:
+        since = time.time() - int(m.group(1)) * 60
+        return lambda i: data is not None and data.updated.get(i['key'], 0.0) >= since
+    return None
+
+
+class FakeJiraState:
+    """Dados + contadores de requisições/bytes e as regras de latência e limitação de taxa."""
+
+    def __init__(self, data, latency_ms=0.0, jitter_ms=0.0, rate_limit=None, error_rate=0.0, page_size=100, seed=0, offset_latency_ms=0.0):
+        self.data = data
+        self.latency_ms = latency_ms
+        # Latência extra das buscas por 1000 de `startAt` (paginação funda fica mais lenta, como no Jira real)
+        self.offset_latency_ms = offset_latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_limit = rate_limit
+        self.error_rate = error_rate
+        self.page_size = page_size
+        self.rnd = random.Random(seed)
+        self.stats_lock = threading.Lock()
+        self.reset_stats()
+        self._window = []
+
+    def reset_stats(self):
+        with self.stats_lock:
+            self.requests = Counter()
+            self.statuses = Counter()
+            self.bytes_in = defaultdict(int)
+            self.bytes_out = defaultdict(int)
+
+    def stats(self):
+        with self.stats_lock:
+            return {
+                'requests': dict(self.requests),
+                'statuses': {str(k): v for k, v in self.statuses.items()},
+                'bytes_in': dict(self.bytes_in),
+                'bytes_out': dict(self.bytes_out),
+                'total_requests': sum(self.requests.values()),
+                'total_bytes_in': sum(self.bytes_in.values()),
+                'total_bytes_out': sum(self.bytes_out.values()),
+            }
+
+    def should_throttle(self):
+        """True se esta requisição deve receber 429 (limite por segundo excedido ou sorteio de `error_rate`)."""
+        with self.stats_lock:
+            if self.error_rate and self.rnd.random() < self.error_rate:
+                return True
+            if not self.rate_limit:
+                return False
+            now = time.monotonic()
+            self._window = [t for t in self._window if now - t < 1.0]
+            if len(self._window) >= self.rate_limit:
+                return True
+            self._window.append(now)
+            return False
+
+
+def endpoint_name(method, path):
+    """Nome agregado do endpoint (sem chaves) para os contadores."""
+    path = re.sub(r'/issue/[^/]+$', '/issue/{key}', path) if not path.endswith(('/issue/bulk', '/issue/rank')) else path
+    return f"{method} {path}"
+
+
+class FakeJiraHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        return raw, (json.loads(raw) if raw else None)
+
+    def _send(self, status, body=None, endpoint=None, headers=None):
+        data = json.dumps(body).encode('utf-8') if body is not None else b''
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json;charset=UTF-8')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if data:
+            self.wfile.write(data)
+        if endpoint:
+            with self.state.stats_lock:
+                self.state.statuses[status] += 1
+                self.state.bytes_out[endpoint] += len(data)
+
+    def _handle(self, method):
+        url = urlparse(self.path)
+        path = url.path.rstrip('/')
+        # `fields` pode vir repetido (`fields=a&fields=b`, como envia o cliente jira); os demais valem pelo último valor
+        query = {k: ','.join(v) if k == 'fields' else v[-1] for k, v in parse_qs(url.query).items()}
+        raw, body = self._body()
+
+        if path == '/_stats':
+            return self._send(200, self.state.stats())
+        if path == '/_reset':
+            self.state.reset_stats()
+            return self._send(204)
+
+        endpoint = endpoint_name(method, path)
+        with self.state.stats_lock:
+            self.state.requests[endpoint] += 1
+            self.state.bytes_in[endpoint] += len(raw)
+
+        if self.state.latency_ms or self.state.jitter_ms:
+            time.sleep(max(0.0, self.state.latency_ms + self.state.rnd.uniform(-1, 1) * self.state.jitter_ms) / 1000)
+        if self.state.should_throttle():
+            return self._send(429, {'errorMessages': ['Rate limit exceeded.']}, endpoint, headers={'Retry-After': '1'})
+
+        try:
+            status, payload = self.route(method, path, query, body)
+        except KeyError as e:
+            status, payload = 404, {'errorMessages': [f"Issue does not exist: {e}"]}
+        except ValueError as e:
+            status, payload = 400, {'errorMessages': [str(e)]}
+        self._send(status, payload, endpoint)
+
+    def route(self, method, path, query, body):
+        data = self.state.data
+        base_url = self.server.base_url
+        if path == '/rest/api/2/serverInfo':
+            return 200, {'baseUrl': base_url.rstrip('/'), 'version': '9.4.0', 'versionNumbers': [9, 4, 0], 'deploymentType': 'Server', 'serverTitle': 'Fake Jira'}
+        if path == '/rest/api/2/field':
+            return 200, FIELDS
+        if path in ('/rest/api/2/search', '/rest/api/3/search'):
+            params = body if method == 'POST' else query
+            return 200, self.search(params or {})
+        if path == '/rest/agile/1.0/issue/rank' and method == 'PUT':
+            keys = body.get('issues') or []
+            if len(keys) > 50:
+                raise ValueError('Ranking more than 50 issues at once is not supported.')
+            data.move(keys, after=body.get('rankAfterIssue'), before=body.get('rankBeforeIssue'))
+            return 204, None
+        if path == '/rest/api/2/issue/bulk' and method == 'POST':
+            created = [data.create(update['fields']) for update in body.get('issueUpdates', [])]
+            return 201, {'issues': [{'id': i['id'], 'key': i['key'], 'self': f"{base_url}rest/api/2/issue/{i['id']}"} for i in created], 'errors': []}
+        if path == '/rest/api/2/issue' and method == 'POST':
+            issue = data.create(body['fields'])
+            return 201, {'id': issue['id'], 'key': issue['key'], 'self': f"{base_url}rest/api/2/issue/{issue['id']}"}
+        m = re.match(r'/rest/api/2/issue/([^/]+)$', path)
+        if m:
+            key = m.group(1)
+            if key not in data.issues:
+                key = next((k for k, i in data.issues.items() if i['id'] == key), key)
+            if method == 'GET':
+                fields = query.get('fields')
+                return 200, data.issue_json(key, fields.split(',') if fields else None, base_url)
+            if method == 'PUT':
+                with data.lock:
+                    data.issues[key]['fields'].update((body or {}).get('fields') or {})
+                    data.updated[key] = time.time()
+                return 204, None
+            if method == 'DELETE':
+                with data.lock:
+                    del data.issues[key]
+                    data.rank.pop(key, None)
+                return 204, None
+        return 404, {'errorMessages': [f"Endpoint não suportado: {method} {path}"]}
+
+    def search(self, params):
+        data = self.state.data
+        clauses, order_by = parse_jql(params.get('jql') or '')
+        if self.state.offset_latency_ms:
+            time.sleep(self.state.offset_latency_ms * int(params.get('startAt') or 0) / 1000 / 1000)
+        predicates = []
+        for clause in clauses:
+            predicate = _clause_predicate(clause, data)
+            if predicate is None:
+                raise ValueError(f"JQL não suportada pelo servidor falso: {clause}")
+            predicates.append(predicate)
+        with data.lock:
+            matches = [key for key, issue in data.issues.items() if all(p(issue) for p in predicates)]
+            if order_by and order_by[0] == 'rank':
+                matches = data.ordered(matches)
+            elif order_by and order_by[0] == 'key':
+                matches.sort(key=lambda k: int(k.rsplit('-', 1)[1]))
+            if order_by and order_by[1] == 'DESC':
+                matches.reverse()
+            start_at = int(params.get('startAt') or 0)
+            requested = params.get('maxResults')
+            max_results = self.state.page_size if requested in (None, '') else min(int(requested), self.state.page_size)
+            fields = params.get('fields')
+            if isinstance(fields, str):
+                fields = [f.strip() for f in fields.split(',') if f.strip()]
+            page = matches[start_at:start_at + max_results]
+            issues = [data.issue_json(key, fields, self.server.base_url) for key in page]
+        return {'startAt': start_at, 'maxResults': max_results, 'total': len(matches), 'issues': issues}
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_PUT(self):
+        self._handle('PUT')
+
+    def do_DELETE(self):
+        self._handle('DELETE')
+
+
+def start_fake_jira(data, host='127.0.0.1', port=0, **options):
+    """Sobe o servidor em uma thread e retorna (servidor, URL base terminada em '/')."""
+    server = ThreadingHTTPServer((host, port), FakeJiraHandler)
+    server.daemon_threads = True
+    server.state = FakeJiraState(data, **options)
+    server.base_url = f"http://{host}:{server.server_address[1]}/"
+    threading.Thread(target=server.serve_forever, name='fake-jira', daemon=True).start()
+    return server, server.base_url
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor Jira falso para testes de desempenho locais.")
+    parser.add_argument('--host', type=str, default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--project', type=str, default='BENCH')
+    parser.add_argument('--epics', type=int, default=10, help='Número de épicos gerados.')
+    parser.add_argument('--children', type=int, default=20, help='Filhas por épico.')
+    parser.add_argument('--subtasks', type=int, default=0, help='Subtarefas por filha.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Latência média adicionada a cada requisição.')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='Variação (+/-) da latência.')
+    parser.add_argument('--rate-limit', type=int, default=None, help='Máximo de requisições por segundo antes de responder 429.')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fração de requisições respondidas com 429 aleatoriamente.')
+    parser.add_argument('--page-size', type=int, default=100, help='maxResults máximo por página de busca.')
+    parser.add_argument('--offset-latency-ms', type=float, default=0.0, help='Latência extra das buscas a cada 1000 de startAt.')
+    args = parser.parse_args()
+
+    data = FakeJiraData(args.project, args.epics, args.children, args.subtasks, args.seed)
+    server, url = start_fake_jira(
+        data, args.host, args.port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        rate_limit=args.rate_limit, error_rate=args.error_rate, page_size=args.page_size, seed=args.seed,
+        offset_latency_ms=args.offset_latency_ms,
+    )
+    print(f"Jira falso em {url} com {len(data.issues)} issues (projeto {args.project}). Estatísticas em {url}_stats. Ctrl-C para encerrar.")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,239 @@
+"""Micro-benchmarks (CPU puro, sem rede) dos caminhos quentes de ordenação, renderização e pivô.
+
+Cobre `sort_issues` (chaves compiladas a partir de `get_value_for_criterion`) por critério de `rank-by` e
+combinado, a conversão para `RankIssue`, `parse_sprint_info` em campos de sprint em texto,
+`format_issue_info` e a contagem/tabelas/percentuais de `generate_report`.
+
+    python bench/micro_bench.py run --output bench_baseline.json
+    python bench/micro_bench.py compare bench_baseline.json --threshold 10
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import timeit
+from datetime import date, datetime, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from fake_jira import (  # noqa: E402
+    COMPONENTS, EPIC_LINK_FIELD, ISSUE_TYPES, PEOPLE, PRIORITIES, RANK_FIELD, SEVERITIES, SEVERITY_FIELD,
+    SPRINT_FIELD, STATUSES, ranks_between,
+)
+from jira_search import LeanIssue  # noqa: E402
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_THRESHOLD = 10.0
+SORT_CRITERIA = ['key', 'priority', 'status', 'issuetype', 'summary', 'epic', 'sprint', 'severity', 'created']
+STATUS_ORDER = ['Em andamento', 'To Do', 'RESOLVIDO', 'FECHADO']
+ISSUETYPE_ORDER = ['Story', 'Task', 'Bug']
+REPORT_CONFIG = {
+    'components_to_track': 'Backend,Frontend,Infra',
+    'role.Fulano de Tal': 'Engenharia de Software - Pleno',
+    'role.Ciclana da Silva': 'Engenharia de Software - Sênior',
+    'role.Beltrana Souza': 'Engenharia de Teste - Pleno',
+}
+
+
+def sprint_string(rnd, today):
+    """Campo de sprint no formato texto do GreenHopper (como retornado por instâncias Server antigas)."""
+    i = rnd.randint(1, 40)
+    start = today - timedelta(days=14 * (40 - i))
+    start_text = f"{start.isoformat()}T09:00:00.000-03:00" if rnd.random() > 0.05 else '<null>'
+    return (f"com.atlassian.greenhopper.service.sprint.Sprint@{i:x}[id={i},rapidViewId=7,state=CLOSED,name=Sprint {i},"
+            f"startDate={start_text},endDate=<null>,completeDate=<null>,sequence={i},goal=]")
+
+
+def make_raw_issues(count, seed=0):
+    """Issues sintéticas no formato JSON da busca do Jira, com todos os campos usados pelos critérios."""
+    rnd = random.Random(seed)
+    today = date.today()
+    ranks = ranks_between(None, None, count)
+    rnd.shuffle(ranks)
+    epics = [f"BENCH-{i}" for i in range(1, max(2, count // 50) + 1)]
+    issues = []
+    for n in range(count):
+        status, category = rnd.choice(STATUSES)
+        priority_id, priority_name = rnd.choice(PRIORITIES)
+        issuetype = rnd.choice(ISSUE_TYPES)
+        issues.append({
+            'id': str(100000 + n),
+            'key': f"BENCH-{n + len(epics) + 1}",
+            'fields': {
+                'summary': f"Tarefa {rnd.randint(1, 99999)} de {rnd.choice(COMPONENTS)}",
+                'status': {'name': status, 'statusCategory': {'id': category}},
+                'priority': {'id': priority_id, 'name': priority_name},
+                'issuetype': {'id': str(ISSUE_TYPES.index(issuetype) + 1), 'name': issuetype},
+                'assignee': {'displayName': rnd.choice(PEOPLE)} if rnd.random() > 0.1 else None,
+                'components': [{'name': c} for c in rnd.sample(COMPONENTS, rnd.randint(0, 2))],
+                'created': (today - timedelta(days=rnd.randint(0, 400))).isoformat(),
+                'subtasks': [],
+                RANK_FIELD: f"0|{ranks[n]}",
+                EPIC_LINK_FIELD: rnd.choice(epics),
+                SPRINT_FIELD: [sprint_string(rnd, today) for _ in range(rnd.randint(1, 3))] if rnd.random() > 0.3 else None,
+                SEVERITY_FIELD: {'value': rnd.choice(SEVERITIES)} if rnd.random() > 0.4 else None,
+            },
+        })
+    return issues
+
+
+def measure(func, repeat):
+    """Executa `func` `repeat` vezes (uma chamada por medição) e retorna mínimo, mediana e as medições."""
+    runs = timeit.Timer(func).repeat(repeat=repeat, number=1)
+    return {'min_s': min(runs), 'median_s': statistics.median(runs), 'runs': runs}
+
+
+def quiet_report(report, issues, options):
+    """`generate_report` sem a impressão no console (o custo medido é o do pivô, não o do terminal)."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        report.generate_report(issues, REPORT_CONFIG, **options)
+
+
+def build_benchmarks(sizes, repeat_for):
+    """Gera (nome, função, repetições) de cada micro-benchmark; os dados são montados fora da medição."""
+    import rank_issues
+    import report
+
+    rank_by_all = SORT_CRITERIA
+    order_all = ['asc', 'desc'] * (len(rank_by_all) // 2) + ['asc'] * (len(rank_by_all) % 2)
+    convert = rank_issues.make_rank_issue_converter(
+        rank_by_all, RANK_FIELD, EPIC_LINK_FIELD, SPRINT_FIELD, SEVERITY_FIELD,
+    )
+    get_value = rank_issues.make_rank_value_getter(STATUS_ORDER, ISSUETYPE_ORDER)
+
+    for size in sizes:
+        repeat = repeat_for(size)
+        lean = [LeanIssue(raw) for raw in make_raw_issues(size)]
+        yield f"convert/{size}", lambda lean=lean: [convert(issue) for issue in lean], repeat
+        records = [convert(issue) for issue in lean]
+
+        for criterion in SORT_CRITERIA:
+            yield (f"sort/{criterion}/{size}",
+                   lambda records=records, c=criterion: rank_issues.sort_issues(records, [c], ['asc'], get_value), repeat)
+        yield (f"sort/all/{size}",
+               lambda records=records: rank_issues.sort_issues(records, rank_by_all, order_all, get_value), repeat)
+        # Caminho do comparador legado: uma em cada sete issues com `created` numérico (tipos mistos no critério)
+        numeric_created = {r.key: i for i, r in enumerate(records[::7])}
+
+        def mixed_value(issue, criterion, numeric_created=numeric_created):
+            if criterion == 'created' and issue.key in numeric_created:
+                return numeric_created[issue.key]
+            return get_value(issue, criterion)
+        yield (f"sort/mixed-types/{size}",
+               lambda records=records, get=mixed_value: rank_issues.sort_issues(records, ['created', 'priority'], ['asc', 'desc'], get), repeat)
+
+        sprint_items = [item for issue in lean for item in (issue.raw['fields'][SPRINT_FIELD] or [])]
+        yield (f"parse_sprint_info/{size}",
+               lambda items=sprint_items: [rank_issues.parse_sprint_info(item) for item in items], repeat)
+        yield (f"format_issue_info/{size}",
+               lambda records=records: [rank_issues.format_issue_info(r, rank_by_all) for r in records], repeat)
+
+        for label, options in (('count', {}), ('percent', {'show_as_percent': True}), ('roles-percent', {'show_as_percent': True, 'show_roles': True})):
+            yield f"generate_report/{label}/{size}", lambda lean=lean, options=options: quiet_report(report, lean, options), repeat
+
+
+def run_benchmarks(sizes, repeat, name_filter=None, logger=print):
+    results = {}
+
+    def repeat_for(size):
+        # Menos repetições nos tamanhos grandes para manter a suíte em poucos minutos
+        return max(3, repeat if size <= 10000 else repeat // 2)
+
+    for name, func, reps in build_benchmarks(sizes, repeat_for):
+        if name_filter and name_filter not in name:
+            continue
+        func()  # aquecimento (caches de _shared_ref, regex compiladas, imports do pandas)
+        results[name] = measure(func, reps)
+        logger(f"  {name:<40} min {results[name]['min_s'] * 1000:>10.2f} ms   mediana {results[name]['median_s'] * 1000:>10.2f} ms")
+    return results
+
+
+def make_document(results, sizes, repeat):
+    return {
+        'meta': {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'sizes': sizes,
+            'repeat': repeat,
+        },
+        'results': results,
+    }
+
+
+def compare_results(baseline, current, threshold=DEFAULT_THRESHOLD, metric='min_s'):
+    """Compara dois documentos de resultados; retorna (linhas do relatório, nomes com regressão acima de `threshold`%)."""
+    base = baseline['results']
+    cur = current['results']
+    lines = [f"{'benchmark':<40} {'base (ms)':>11} {'atual (ms)':>11} {'variação':>9}"]
+    regressions = []
+    for name in list(base) + [n for n in cur if n not in base]:
+        if name not in cur:
+            lines.append(f"{name:<40} {base[name][metric] * 1000:>11.2f} {'-':>11} {'ausente':>9}")
+            continue
+        if name not in base:
+            lines.append(f"{name:<40} {'-':>11} {cur[name][metric] * 1000:>11.2f} {'novo':>9}")
+            continue
+        before, after = base[name][metric], cur[name][metric]
+        change = (after - before) / before * 100 if before else 0.0
+        flag = ''
+        if change > threshold:
+            regressions.append(name)
+            flag = '  <-- REGRESSÃO'
+        lines.append(f"{name:<40} {before * 1000:>11.2f} {after * 1000:>11.2f} {change:>+8.1f}%{flag}")
+    return lines, regressions
+
+
+def parse_sizes(text):
+    return [int(s) for s in text.split(',') if s.strip()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-benchmarks de ordenação, renderização e pivô (sem rede), com baseline em JSON.")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = sub.add_parser('run', help='Executa os micro-benchmarks e grava os resultados em JSON.')
+    compare_parser = sub.add_parser('compare', help='Compara com um baseline; sai com código 1 se houver regressão acima do limite.')
+    for p in (run_parser, compare_parser):
+        p.add_argument('--sizes', type=parse_sizes, default=DEFAULT_SIZES, help=f"Quantidades de issues sintéticas. Padrão: {','.join(map(str, DEFAULT_SIZES))}.")
+        p.add_argument('--repeat', type=int, default=7, help='Medições por benchmark (metade nos tamanhos acima de 10k).')
+        p.add_argument('--filter', type=str, help='Executa só os benchmarks cujo nome contém este texto.')
+    run_parser.add_argument('--output', type=str, help='Arquivo JSON de saída (ex.: bench_baseline.json).')
+    compare_parser.add_argument('baseline', type=str, help='Arquivo JSON do baseline.')
+    compare_parser.add_argument('current', type=str, nargs='?', help='Arquivo JSON com resultados já medidos. Se omitido, executa os benchmarks agora.')
+    compare_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help=f"Regressão máxima tolerada em %% sobre o tempo mínimo. Padrão: {DEFAULT_THRESHOLD:g}.")
+    compare_parser.add_argument('--metric', choices=['min_s', 'median_s'], default='min_s', help='Métrica comparada.')
+    compare_parser.add_argument('--output', type=str, help='Grava também os resultados atuais neste arquivo JSON.')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == 'compare' and args.current:
+        with open(args.current, 'r', encoding='utf-8') as f:
+            current = json.load(f)
+    else:
+        print(f"Executando micro-benchmarks (tamanhos: {', '.join(map(str, args.sizes))})...")
+        current = make_document(run_benchmarks(args.sizes, args.repeat, args.filter), args.sizes, args.repeat)
+        print(f"Concluído em {time.perf_counter() - start:.1f} segundos.")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=2)
+        print(f"Resultados gravados em {args.output}")
+
+    if args.command == 'compare':
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        lines, regressions = compare_results(baseline, current, args.threshold, args.metric)
+        print('\n'.join(lines))
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) com regressão acima de {args.threshold:g}%: {', '.join(regressions)}")
+            sys.exit(1)
+        print(f"\nNenhuma regressão acima de {args.threshold:g}%.")
@@ -0,0 +1,166 @@
+"""Benchmark ponta a ponta dos scripts contra o servidor Jira falso (bench/fake_jira.py).
+
+Para cada cenário sobe um projeto sintético de N épicos x M filhas, executa o script como subprocesso
+e reporta tempo total, requisições e bytes por endpoint (contados pelo servidor) e pico de memória do processo.
+Ex.: python bench/run_bench.py --epics 50 --children 40 --latency-ms 20 --json resultado.json
+"""
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fake_jira import FakeJiraData, start_fake_jira  # noqa: E402
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = ('rank_issues', 'report', 'import')
+
+
+def write_config(path, server_url, project, workdir):
+    config = {
+        "jira_server": server_url,
+        "jira_token": "bench-token",
+        "project-id": project,
+        "default_reporter": "bench.user",
+        "default_assignee": "bench.user",
+        "default_component": "Backend",
+        "components_to_track": "Backend,Frontend,Infra,Dados",
+        "fields_cache_file": os.path.join(workdir, 'fields_cache.json'),
+        "fields_cache_ttl": 0,
+        "state-file": os.path.join(workdir, 'rank.state.sqlite'),
+        "rank-by": ["status", "priority", "issuetype", "key"],
+        "order": ["asc", "desc", "asc", "asc"],
+        "status-order": ["Em andamento", "To Do", "RESOLVIDO", "FECHADO"],
+        "issuetype-order": ["Story", "Task", "Bug"],
+        "role.Fulano de Tal": "Engenharia de Software - Pleno",
+        "role.Ciclana da Silva": "Engenharia de Software - Sênior",
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(config, f, ensure_ascii=False, indent=2)
+
+
+def write_import_csv(path, epic_keys, rows):
+    """CSV no formato do import.py: `rows` issues principais distribuídas entre os épicos, cada uma com uma subtarefa."""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Issue ID', 'Parent ID', 'Summary', 'Description', 'Issue Type', 'Reporter', 'Assignee', 'Epic Link'])
+        for i in range(1, rows + 1):
+            writer.writerow([i, '', f'Issue importada {i}', 'Criada pelo benchmark', 'Story', '', '', epic_keys[i % len(epic_keys)]])
+            writer.writerow(['', i, f'Subtarefa importada {i}', 'Criada pelo benchmark', 'Sub-task', '', '', ''])
+
+
+def script_commands(config_path, csv_path, workdir, project):
+    today = date.today()
+    return {
+        'rank_issues': ['rank_issues.py', '-c', config_path, '--project-id', project, '--full', '--brief', '--no-progress',
+                        '--journal', os.path.join(workdir, 'rank_journal.jsonl')],
+        'report': ['report.py', '-c', config_path, '--month', str(today.month), '--year', str(today.year),
+                   '--output', os.path.join(workdir, 'report.xlsx')],
+        'import': ['import.py', '--action', 'create', '-c', config_path, '--csv', csv_path, '-i',
+                   '--logfile', os.path.join(workdir, 'import_log.csv')],
+    }
+
+
+def run_script(name, argv, server, workdir):
+    """Executa um script como subprocesso e mede tempo, pico de RSS (wait4) e o tráfego registrado pelo servidor."""
+    server.state.reset_stats()
+    log_path = os.path.join(workdir, f"{name}.log")
+    start = time.perf_counter()
+    with open(log_path, 'w', encoding='utf-8') as log:
+        proc = subprocess.Popen([sys.executable, os.path.join(REPO_DIR, argv[0])] + argv[1:], cwd=workdir, stdout=log, stderr=subprocess.STDOUT,
+                                env=dict(os.environ, PYTHONPATH=REPO_DIR, PYTHONIOENCODING='utf-8'))
+        _, status, usage = os.wait4(proc.pid, 0)
+    elapsed = time.perf_counter() - start
+    stats = server.state.stats()
+    return {
+        'script': name,
+        'exit_code': os.waitstatus_to_exitcode(status),
+        'wall_s': round(elapsed, 3),
+        'peak_rss_mb': round(usage.ru_maxrss / 1024, 1),
+        'requests': stats['total_requests'],
+        'bytes_in': stats['total_bytes_in'],
+        'bytes_out': stats['total_bytes_out'],
+        'by_endpoint': {
+            endpoint: {'count': count, 'bytes_in': stats['bytes_in'].get(endpoint, 0), 'bytes_out': stats['bytes_out'].get(endpoint, 0)}
+            for endpoint, count in sorted(stats['requests'].items())
+        },
+        'statuses': stats['statuses'],
+        'log': log_path,
+    }
+
+
+def format_results(results):
+    lines = [f"{'script':<12} {'saída':>5} {'tempo (s)':>10} {'RSS (MB)':>9} {'reqs':>7} {'KB env.':>9} {'KB rec.':>9}"]
+    for r in results:
+        lines.append(f"{r['script']:<12} {r['exit_code']:>5} {r['wall_s']:>10.2f} {r['peak_rss_mb']:>9.1f} {r['requests']:>7} "
+                     f"{r['bytes_in'] / 1024:>9.1f} {r['bytes_out'] / 1024:>9.1f}")
+        for endpoint, s in r['by_endpoint'].items():
+            lines.append(f"    {endpoint:<44} {s['count']:>7} {s['bytes_in'] / 1024:>9.1f} {s['bytes_out'] / 1024:>9.1f}")
+    return '\n'.join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark ponta a ponta de rank_issues.py, report.py e import.py contra um Jira falso local.")
+    parser.add_argument('--scripts', type=lambda s: [x.strip() for x in s.split(',')], default=list(SCRIPTS), help=f"Scripts a medir, separados por vírgula. Padrão: {','.join(SCRIPTS)}.")
+    parser.add_argument('--project', type=str, default='BENCH')
+    parser.add_argument('--epics', type=int, default=20, help='Número de épicos do projeto sintético.')
+    parser.add_argument('--children', type=int, default=30, help='Filhas por épico.')
+    parser.add_argument('--subtasks', type=int, default=0, help='Subtarefas por filha.')
+    parser.add_argument('--import-rows', type=int, default=20, help='Issues principais no CSV do import.py (cada uma com uma subtarefa).')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Latência adicionada pelo servidor a cada requisição.')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='Variação (+/-) da latência.')
+    parser.add_argument('--rate-limit', type=int, default=None, help='Requisições por segundo aceitas antes de responder 429.')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fração de requisições respondidas com 429 aleatoriamente.')
+    parser.add_argument('--page-size', type=int, default=100, help='maxResults máximo por página de busca.')
+    parser.add_argument('--offset-latency-ms', type=float, default=0.0, help='Latência extra das buscas a cada 1000 de startAt (paginação funda).')
+    parser.add_argument('--json', type=str, help='Grava os resultados neste arquivo JSON.')
+    parser.add_argument('--keep', action='store_true', help='Mantém o diretório temporário com configuração e logs.')
+    args = parser.parse_args()
+
+    unknown = [s for s in args.scripts if s not in SCRIPTS]
+    if unknown:
+        parser.error(f"Script(s) desconhecido(s): {', '.join(unknown)}. Opções: {', '.join(SCRIPTS)}")
+
+    workdir = tempfile.mkdtemp(prefix='smarter-jira-bench-')
+    config_path = os.path.join(workdir, 'config.json')
+    csv_path = os.path.join(workdir, 'import.csv')
+    results = []
+    for name in args.scripts:
+        # Dados novos a cada script, para que um não altere o cenário do seguinte
+        data = FakeJiraData(args.project, args.epics, args.children, args.subtasks, args.seed)
+        server, url = start_fake_jira(
+            data, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, rate_limit=args.rate_limit,
+            error_rate=args.error_rate, page_size=args.page_size, seed=args.seed, offset_latency_ms=args.offset_latency_ms,
+        )
+        try:
+            write_config(config_path, url, args.project, workdir)
+            epic_keys = [k for k, i in data.issues.items() if i['fields']['issuetype']['name'] == 'Epic']
+            write_import_csv(csv_path, epic_keys, args.import_rows)
+            argv = script_commands(config_path, csv_path, workdir, args.project)[name]
+            print(f"Executando {name} ({len(data.issues)} issues no Jira falso)...", flush=True)
+            results.append(run_script(name, argv, server, workdir))
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    print(format_results(results))
+    scenario = {k: getattr(args, k) for k in ('epics', 'children', 'subtasks', 'import_rows', 'latency_ms', 'jitter_ms', 'rate_limit', 'error_rate', 'page_size', 'offset_latency_ms', 'seed')}
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'scenario': scenario, 'python': sys.version.split()[0], 'results': results}, f, ensure_ascii=False, indent=2)
+        print(f"Resultados gravados em {args.json}")
+    failed = [r['script'] for r in results if r['exit_code'] != 0]
+    if failed:
+        print(f"Aviso: {', '.join(failed)} terminou com erro; veja os logs em {workdir}")
+    elif not args.keep:
+        import shutil
+        shutil.rmtree(workdir, ignore_errors=True)
+    else:
+        print(f"Arquivos mantidos em {workdir}")
+    sys.exit(1 if failed else 0)
@@ -1,5 +1,4 @@
 # -*- coding: utf-8 -*-
-import requests
 import json
 import csv
 import os
@@ -7,6 +6,11 @@ import sys
 import argparse
 from datetime import datetime
 
+from jira_fields import DEFAULT_FIELDS_CACHE_FILE, DEFAULT_FIELDS_CACHE_TTL, get_field_registry
+from jira_metrics import enable_metrics_export, flush_metrics_export, phase
+from jira_profile import DEFAULT_PROFILE_TOP, start_profiling, stop_profiling
+from jira_session import get_session
+
 # Reconfigura o encoding da saída padrão no Windows para evitar quebras por caracteres especiais
 if hasattr(sys.stdout, 'reconfigure'):
     try:
@@ -48,10 +52,31 @@ def validate_config(config, config_path, required_keys):
 
 # --- Funções da API do Jira ---
 
+def resolve_epic_link_field_id(config, token):
+    """Retorna o ID do campo 'Epic Link' do config ou o descobre pelo registro de campos (com cache em disco)."""
+    if config.get('epic_link_field_id'):
+        return config['epic_link_field_id']
+
+    def fetch_fields():
+        response = get_session(config).get(f"{config['jira_server']}rest/api/2/field")
+        response.raise_for_status()
+        return response.json()
+
+    try:
+        registry = get_field_registry(
+            config['jira_server'],
+            fetch_fields,
+            cache_file=config.get('fields_cache_file', DEFAULT_FIELDS_CACHE_FILE),
+            ttl=config.get('fields_cache_ttl', DEFAULT_FIELDS_CACHE_TTL),
+        )
+        return registry.get('epic_link')
+    except Exception as e:
+        print(f"Aviso: Não foi possível descobrir o ID do campo 'Epic Link'. Erro: {e}")
+        return None
+
 def create_jira_issue(config, token, issue_data, verbose=False, parent_key=None):
     """Cria uma issue no Jira."""
     api_url = f"{config['jira_server']}rest/api/2/issue"
-    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
 
     reporter_email = issue_data.get('Reporter') or config['default_reporter']
     assignee_email = issue_data.get('Assignee') or config.get('default_assignee')
@@ -84,7 +109,7 @@ def create_jira_issue(config, token, issue_data, verbose=False, parent_key=None)
     if verbose:
         print(f"--- PAYLOAD (CREATE) ---\n{json.dumps(payload, indent=4)}\n--------------------------")
 
-    response = requests.post(api_url, headers=headers, data=json.dumps(payload))
+    response = get_session(config).post(api_url, json=payload)
 
     if response.status_code == 201:
         return response.json()
@@ -95,7 +120,6 @@ def create_jira_issue(config, token, issue_data, verbose=False, parent_key=None)
 def update_jira_issue(issue_key, config, token, issue_data, verbose=False):
     """Atualiza uma issue no Jira."""
     api_url = f"{config['jira_server']}rest/api/2/issue/{issue_key}"
-    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
 
     fields_to_update = {}
     # Apenas o assignee pode ser atualizado por enquanto, conforme solicitado
@@ -112,7 +136,7 @@ def update_jira_issue(issue_key, config, token, issue_data, verbose=False):
     if verbose:
         print(f"--- PAYLOAD (UPDATE) ---\n{json.dumps(payload, indent=4)}\n--------------------------")
 
-    response = requests.put(api_url, headers=headers, data=json.dumps(payload))
+    response = get_session(config).put(api_url, json=payload)
 
     if response.status_code == 204:
         return True
@@ -123,8 +147,7 @@ def update_jira_issue(issue_key, config, token, issue_data, verbose=False):
 def delete_jira_issue(issue_key, config, token):
     """Deleta uma issue no Jira."""
     api_url = f"{config['jira_server']}rest/api/2/issue/{issue_key}"
-    headers = {"Authorization": f"Bearer {token}"}
-    response = requests.delete(api_url, headers=headers)
+    response = get_session(config).delete(api_url)
     if response.status_code == 204:
         print(f"Sucesso ao deletar issue {issue_key}.")
         return True
@@ -236,19 +259,24 @@ def process_update(config, token, csv_file, log_writer, verbose=False):
 
 # --- Ponto de Entrada ---
 
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Cria, deleta ou atualiza issues no Jira a partir de um arquivo CSV.")
+def main(argv=None, prog=None):
+    """Ponto de entrada da linha de comando; `argv` (padrão: sys.argv[1:]) permite chamar a partir de outro código."""
+    parser = argparse.ArgumentParser(prog=prog, description="Cria, deleta ou atualiza issues no Jira a partir de um arquivo CSV.")
     parser.add_argument('--action', type=str, choices=['create', 'delete', 'update'], default='create', help='Ação a ser executada.')
     parser.add_argument('-c', '--config', type=str, required=True, help='Caminho para o arquivo de configuração JSON.')
     parser.add_argument('--csv', type=str, required=True, help='Caminho para o arquivo CSV de entrada.')
     parser.add_argument('--logfile', type=str, help='Nome do arquivo de log de saída. Padrão: NOME_DO_CSV_log_TIMESTAMP.csv')
     parser.add_argument('-v', '--verbose', action='store_true', help='Exibe o payload JSON enviado para a API do Jira.')
     parser.add_argument('-i', '--ignore-epics', action='store_true', help='Ignora a verificação de Epic Link obrigatório na criação.')
-    args = parser.parse_args()
+    parser.add_argument('--metrics-json', type=str, help='Grava ao final um resumo JSON das métricas (requisições por endpoint, latência, status, tentativas, bytes e tempo por fase).')
+    parser.add_argument('--metrics-prom', type=str, help='Grava ao final as mesmas métricas no formato texto do Prometheus (textfile collector).')
+    parser.add_argument('--profile', nargs='?', const='', default=None, metavar='PREFIXO', help="Perfila a execução: grava PREFIXO.pstats (cProfile de todas as threads) e PREFIXO.collapsed.txt (pilhas para flamegraph), mede o pico de memória por fase (tracemalloc) e imprime as funções mais custosas ao final. Padrão do prefixo: profile_<script>_TIMESTAMP.")
+    parser.add_argument('--profile-top', type=int, default=DEFAULT_PROFILE_TOP, help=f"Número de funções na tabela de hotspots do --profile. Padrão: {DEFAULT_PROFILE_TOP}.")
+    args = parser.parse_args(argv)
 
     config = load_config(args.config)
     if not config:
-        exit(1)
+        sys.exit(1)
     # Valida presença de parmetros obrigatrios no arquivo de configurao
     required_keys = ['jira_server', 'project-id', 'default_reporter', 'default_component', 'jira_token']
     validate_config(config, args.config, required_keys)
@@ -256,10 +284,13 @@ if __name__ == "__main__":
     token = config.get("jira_token")
     if not token or "YOUR_JIRA_API_TOKEN" in token:
         print("Erro: Token do Jira não encontrado ou não configurado no arquivo de configuração JSON.")
-        exit(1)
+        sys.exit(1)
 
     log_filename = args.logfile or f"{os.path.splitext(os.path.basename(args.csv))[0]}_log_{datetime.now().strftime('%Y-%m-%d_%H%M%S')}.csv"
     
+    enable_metrics_export('import', args.metrics_json or config.get('metrics-json'), args.metrics_prom or config.get('metrics-prom'))
+    if args.profile is not None:
+        start_profiling('import', args.profile, args.profile_top)
     try:
         with open(log_filename, 'w', newline='', encoding='utf-8') as logfile:
             log_writer = csv.writer(logfile)
@@ -269,14 +300,25 @@ if __name__ == "__main__":
             print(f"Usando arquivo de log: {log_filename}")
 
             if args.action == 'create':
-                process_creation(config, token, args.csv, log_writer, verbose=args.verbose, ignore_epics=args.ignore_epics)
+                config['epic_link_field_id'] = resolve_epic_link_field_id(config, token)
+                with phase('apply'):
+                    process_creation(config, token, args.csv, log_writer, verbose=args.verbose, ignore_epics=args.ignore_epics)
             elif args.action == 'delete':
-                process_deletion(config, token, args.csv, log_writer)
+                with phase('apply'):
+                    process_deletion(config, token, args.csv, log_writer)
             elif args.action == 'update':
-                process_update(config, token, args.csv, log_writer, verbose=args.verbose)
+                with phase('apply'):
+                    process_update(config, token, args.csv, log_writer, verbose=args.verbose)
 
             print("Processo finalizado.")
 
     except IOError as e:
         print(f"Erro ao escrever no arquivo de log '{log_filename}': {e}")
-        exit(1)
+        sys.exit(1)
+    finally:
+        stop_profiling()
+        flush_metrics_export()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import json
+import os
+import threading
+import time
+
+from jira_metrics import phase
+
+# Tempo de validade (segundos) dos IDs de campos gravados em disco. 0 desativa o cache em disco.
+DEFAULT_FIELDS_CACHE_TTL = 24 * 60 * 60
+DEFAULT_FIELDS_CACHE_FILE = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+    'smarter-jira',
+    'fields.json',
+)
+
+FIELD_NAMES = ('rank', 'epic_link', 'sprint', 'severity')
+
+_registries = {}
+_registries_lock = threading.Lock()
+_cache_file_lock = threading.Lock()
+
+
+def discover_field_ids(all_fields):
+    """Extrai os IDs dos campos Rank, Epic Link, Sprint e Gravidade/Severity da lista de campos do Jira."""
+    found = dict.fromkeys(FIELD_NAMES)
+    for field in all_fields:
+        name = field.get('name')
+        if found['rank'] is None and name == 'Rank':
+            found['rank'] = field.get('id')
+        if found['epic_link'] is None and name == 'Epic Link':
+            found['epic_link'] = field.get('id')
+        if found['sprint'] is None:
+            schema = field.get('schema', {})
+            if name == 'Sprint' or ('custom' in schema and 'sprint' in schema.get('custom', '').lower()):
+                found['sprint'] = field.get('id')
+        if found['severity'] is None and name in ('Gravidade', 'Severity'):
+            found['severity'] = field.get('id')
+    return found
+
+
+def _read_cache_file(cache_file):
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_cache_entry(cache_file, server_url, field_ids):
+    """Grava (de forma atômica) os IDs de um servidor no arquivo de cache, preservando os demais servidores."""
+    with _cache_file_lock:
+        data = _read_cache_file(cache_file)
+        data[server_url] = {'fetched_at': time.time(), 'fields': field_ids}
+        try:
+            os.makedirs(os.path.dirname(cache_file) or '.', exist_ok=True)
+            tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_file, cache_file)
+        except OSError as e:
+            print(f"Aviso: Não foi possível gravar o cache de campos em '{cache_file}': {e}")
+
+
+class FieldRegistry:
+    """IDs de campos do Jira resolvidos uma única vez por processo (e reaproveitados do disco enquanto válidos)."""
+
+    def __init__(self, server_url, fetch_fields, cache_file=DEFAULT_FIELDS_CACHE_FILE, ttl=DEFAULT_FIELDS_CACHE_TTL):
+        self.server_url = server_url.rstrip('/')
+        self.fetch_fields = fetch_fields
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self._field_ids = None
+        self._lock = threading.Lock()
+
+    def _load_from_disk(self):
+        if not self.cache_file or not self.ttl or self.ttl <= 0:
+            return None
+        entry = _read_cache_file(self.cache_file).get(self.server_url)
+        if not isinstance(entry, dict):
+            return None
+        if time.time() - entry.get('fetched_at', 0) > self.ttl:
+            return None
+        fields = entry.get('fields')
+        if not isinstance(fields, dict) or any(name not in fields for name in FIELD_NAMES):
+            return None
+        return fields
+
+    def field_ids(self):
+        """Retorna o dicionário {rank, epic_link, sprint, severity} -> ID (ou None), consultando o Jira só na primeira vez."""
+        if self._field_ids is not None:
+            return self._field_ids
+        with self._lock:
+            if self._field_ids is None:
+                field_ids = self._load_from_disk()
+                if field_ids is None:
+                    with phase('field_discovery'):
+                        field_ids = discover_field_ids(self.fetch_fields())
+                    if self.cache_file and self.ttl and self.ttl > 0:
+                        _write_cache_entry(self.cache_file, self.server_url, field_ids)
+                self._field_ids = field_ids
+        return self._field_ids
+
+    def get(self, name):
+        return self.field_ids().get(name)
+
+    def invalidate(self):
+        """Descarta os IDs em memória; a próxima consulta volta ao disco/Jira."""
+        with self._lock:
+            self._field_ids = None
+
+
+def get_field_registry(server_url, fetch_fields, cache_file=DEFAULT_FIELDS_CACHE_FILE, ttl=DEFAULT_FIELDS_CACHE_TTL):
+    """Retorna o registro de campos compartilhado do processo para o servidor informado."""
+    key = server_url.rstrip('/')
+    with _registries_lock:
+        registry = _registries.get(key)
+        if registry is None:
+            registry = FieldRegistry(key, fetch_fields, cache_file=cache_file, ttl=ttl)
+            _registries[key] = registry
+        return registry
+
+
+def get_client_field_registry(client, config=None):
+    """Atalho para um cliente `jira.JIRA`: usa `client.fields()` e as opções de cache do config."""
+    config = config or {}
+    return get_field_registry(
+        client._options['server'],
+        client.fields,
+        cache_file=config.get('fields_cache_file', DEFAULT_FIELDS_CACHE_FILE),
+        ttl=config.get('fields_cache_ttl', DEFAULT_FIELDS_CACHE_TTL),
+    )
@@ -0,0 +1,291 @@
+import atexit
+import json
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+# Limites (segundos) dos buckets do histograma de latência, no estilo Prometheus
+DEFAULT_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+METRIC_PREFIX = 'smarter_jira'
+
+_ISSUE_KEY = re.compile(r'^[A-Z][A-Z0-9_]*-\d+$')
+_NUMERIC_ID = re.compile(r'^\d+$')
+
+
+def endpoint_template(url):
+    """Caminho da API com chaves/IDs substituídos (`/rest/api/2/issue/{key}`), para agregar as métricas por endpoint."""
+    path = urlparse(url).path
+    start = path.find('/rest/')
+    if start > 0:
+        path = path[start:]
+    segments = path.rstrip('/').split('/')
+    for i, segment in enumerate(segments[4:], start=4):
+        if _ISSUE_KEY.match(segment):
+            segments[i] = '{key}'
+        elif _NUMERIC_ID.match(segment):
+            segments[i] = '{id}'
+    return '/'.join(segments) or '/'
+
+
+def _peak_rss_bytes():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss é reportado em KB no Linux e em bytes no macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_label_value(value)}"' for name, value in labels.items()) + '}'
+
+
+class _EndpointStats:
+    __slots__ = ('calls', 'statuses', 'retries', 'response_bytes', 'latency_sum', 'latency_max', 'buckets')
+
+    def __init__(self, bucket_count):
+        self.calls = 0
+        self.statuses = {}
+        self.retries = 0
+        self.response_bytes = 0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self.buckets = [0] * (bucket_count + 1)
+
+
+class Metrics:
+    """Métricas do processo: por endpoint (chamadas, histograma de latência, status, tentativas e bytes) e tempo por fase.
+
+    As fases acumulam o tempo de todas as threads, então a soma pode passar do tempo total em execuções paralelas.
+    """
+
+    def __init__(self, script=None, buckets=DEFAULT_LATENCY_BUCKETS):
+        self.script = script or os.path.splitext(os.path.basename(sys.argv[0] or 'python'))[0]
+        self.buckets = tuple(buckets)
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self._endpoints = {}
+        self._phases = {}
+        self._lock = threading.Lock()
+        # Observador opcional de início/fim de fase (ex.: o --profile mede memória por fase)
+        self.phase_observer = None
+
+    def reset(self, script=None):
+        """Zera endpoints e fases e reinicia o relógio (início de uma nova execução no mesmo processo)."""
+        with self._lock:
+            if script:
+                self.script = script
+            self.started_at = time.time()
+            self._started = time.perf_counter()
+            self._endpoints = {}
+            self._phases = {}
+
+    def _endpoint(self, method, url):
+        key = ((method or 'GET').upper(), endpoint_template(url))
+        stats = self._endpoints.get(key)
+        if stats is None:
+            stats = self._endpoints[key] = _EndpointStats(len(self.buckets))
+        return stats
+
+    def record_request(self, method, url, status, seconds, response_bytes=0):
+        with self._lock:
+            stats = self._endpoint(method, url)
+            stats.calls += 1
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            stats.response_bytes += response_bytes or 0
+            stats.latency_sum += seconds
+            stats.latency_max = max(stats.latency_max, seconds)
+            index = next((i for i, limit in enumerate(self.buckets) if seconds <= limit), len(self.buckets))
+            stats.buckets[index] += 1
+
+    def record_response(self, response, *args, **kwargs):
+        """Hook `response` do requests: registra método, endpoint, status, latência (até os cabeçalhos) e bytes do corpo."""
+        try:
+            size = len(response.content)
+        except Exception:
+            size = int(response.headers.get('Content-Length') or 0)
+        self.record_request(response.request.method, response.url, response.status_code, response.elapsed.total_seconds(), size)
+        return response
+
+    def record_retry(self, method, url):
+        with self._lock:
+            self._endpoint(method, url).retries += 1
+
+    def add_phase_time(self, name, seconds):
+        with self._lock:
+            total, calls = self._phases.get(name, (0.0, 0))
+            self._phases[name] = (total + seconds, calls + 1)
+
+    @contextmanager
+    def phase(self, name):
+        """Acumula o tempo do bloco na fase `name` (ex.: field_discovery, fetch, sort, render, apply)."""
+        observer = self.phase_observer
+        token = observer.phase_started(name) if observer is not None else None
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase_time(name, time.perf_counter() - start)
+            if observer is not None:
+                observer.phase_finished(name, token)
+
+    def elapsed(self):
+        return time.perf_counter() - self._started
+
+    def summary(self):
+        """Resumo serializável em JSON de todas as métricas coletadas até agora."""
+        with self._lock:
+            endpoints = []
+            for (method, endpoint), s in sorted(self._endpoints.items(), key=lambda item: (item[0][1], item[0][0])):
+                cumulative, histogram = 0, {}
+                for limit, count in zip(list(self.buckets) + ['+Inf'], s.buckets):
+                    cumulative += count
+                    histogram[str(limit)] = cumulative
+                endpoints.append({
+                    'method': method,
+                    'endpoint': endpoint,
+                    'calls': s.calls,
+                    'statuses': {str(k): v for k, v in sorted(s.statuses.items(), key=lambda item: str(item[0]))},
+                    'retries': s.retries,
+                    'response_bytes': s.response_bytes,
+                    'latency_sum_s': round(s.latency_sum, 6),
+                    'latency_avg_s': round(s.latency_sum / s.calls, 6) if s.calls else None,
+                    'latency_max_s': round(s.latency_max, 6),
+                    'latency_histogram': histogram,
+                })
+            phases = {name: {'seconds': round(total, 6), 'calls': calls} for name, (total, calls) in sorted(self._phases.items())}
+        return {
+            'script': self.script,
+            'started_at': self.started_at,
+            'duration_s': round(self.elapsed(), 6),
+            'peak_rss_bytes': _peak_rss_bytes(),
+            'requests_total': sum(e['calls'] for e in endpoints),
+            'retries_total': sum(e['retries'] for e in endpoints),
+            'response_bytes_total': sum(e['response_bytes'] for e in endpoints),
+            'endpoints': endpoints,
+            'phases': phases,
+        }
+
+    def to_prometheus(self, summary=None):
+        """Métricas no formato texto do Prometheus (para o textfile collector do node_exporter)."""
+        summary = summary or self.summary()
+        script = summary['script']
+        p = METRIC_PREFIX
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {p}_{name} {help_text}")
+            lines.append(f"# TYPE {p}_{name} {kind}")
+            for suffix, labels, value in samples:
+                lines.append(f"{p}_{name}{suffix}{_labels(**labels)} {value}")
+
+        endpoints = summary['endpoints']
+        metric('http_requests_total', 'counter', 'Requisições HTTP ao Jira por endpoint e status.', [
+            ('', {'script': script, 'method': e['method'], 'endpoint': e['endpoint'], 'status': status}, count)
+            for e in endpoints for status, count in e['statuses'].items()
+        ])
+        duration_samples = []
+        for e in endpoints:
+            base = {'script': script, 'method': e['method'], 'endpoint': e['endpoint']}
+            for limit, count in e['latency_histogram'].items():
+                duration_samples.append(('_bucket', dict(base, le=limit), count))
+            duration_samples.append(('_sum', base, e['latency_sum_s']))
+            duration_samples.append(('_count', base, e['calls']))
+        metric('http_request_duration_seconds', 'histogram', 'Latência das requisições HTTP ao Jira.', duration_samples)
+        metric('http_retries_total', 'counter', 'Novas tentativas após 429/503 ou erro de conexão.', [
+            ('', {'script': script, 'method': e['method'], 'endpoint': e['endpoint']}, e['retries']) for e in endpoints
+        ])
+        metric('http_response_bytes_total', 'counter', 'Bytes recebidos nos corpos das respostas.', [
+            ('', {'script': script, 'method': e['method'], 'endpoint': e['endpoint']}, e['response_bytes']) for e in endpoints
+        ])
+        metric('phase_seconds_total', 'counter', 'Tempo acumulado por fase (somado entre threads).', [
+            ('', {'script': script, 'phase': name}, phase['seconds']) for name, phase in summary['phases'].items()
+        ])
+        metric('phase_calls_total', 'counter', 'Execuções de cada fase.', [
+            ('', {'script': script, 'phase': name}, phase['calls']) for name, phase in summary['phases'].items()
+        ])
+        metric('run_duration_seconds', 'gauge', 'Tempo total da última execução.', [('', {'script': script}, summary['duration_s'])])
+        metric('run_last_timestamp_seconds', 'gauge', 'Início da última execução (epoch).', [('', {'script': script}, round(summary['started_at'], 3))])
+        if summary['peak_rss_bytes'] is not None:
+            metric('run_peak_rss_bytes', 'gauge', 'Pico de memória residente da última execução.', [('', {'script': script}, summary['peak_rss_bytes'])])
+        return '\n'.join(lines) + '\n'
+
+    def write(self, json_path=None, prom_path=None):
+        """Grava o resumo em JSON e/ou no formato do Prometheus (escrita atômica, para coletores que leem o arquivo)."""
+        summary = self.summary()
+        outputs = []
+        if json_path:
+            outputs.append((json_path, json.dumps(summary, indent=2, ensure_ascii=False) + '\n'))
+        if prom_path:
+            outputs.append((prom_path, self.to_prometheus(summary)))
+        for path, content in outputs:
+            try:
+                os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(content)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                print(f"Aviso: Não foi possível gravar as métricas em '{path}': {e}")
+
+
+_metrics = Metrics()
+# Destino do resumo da execução atual ((json, prom) ou None), gravado por `flush_metrics_export`
+_export_paths = None
+_atexit_registered = False
+
+
+def get_metrics():
+    """Retorna as métricas compartilhadas do processo."""
+    return _metrics
+
+
+def phase(name):
+    """Atalho para `get_metrics().phase(name)`."""
+    return _metrics.phase(name)
+
+
+def install_metrics(session, metrics=None):
+    """Registra todas as respostas de uma `requests.Session` (ou `ResilientSession` do jira) nas métricas. Retorna a sessão."""
+    metrics = metrics or _metrics
+    hooks = session.hooks.setdefault('response', [])
+    if metrics.record_response not in hooks:
+        hooks.append(metrics.record_response)
+    return session
+
+
+def install_client_metrics(client, metrics=None):
+    """Atalho para um cliente `jira.JIRA`: instrumenta `client._session`."""
+    return install_metrics(client._session, metrics)
+
+
+def enable_metrics_export(script, json_path=None, prom_path=None):
+    """Inicia as métricas de uma execução de `script` e define onde gravar o resumo (JSON e/ou Prometheus).
+
+    O `main()` de cada script chama `flush_metrics_export()` no próprio `finally`; o `atexit` é só um fallback para
+    processos que saem sem passar por ele.
+    """
+    global _export_paths, _atexit_registered
+    _metrics.reset(script)
+    _export_paths = (json_path, prom_path) if json_path or prom_path else None
+    if _export_paths and not _atexit_registered:
+        atexit.register(flush_metrics_export)
+        _atexit_registered = True
+
+
+def flush_metrics_export():
+    """Grava o resumo da execução atual, se `enable_metrics_export` pediu, e zera as métricas para a próxima."""
+    global _export_paths
+    paths, _export_paths = _export_paths, None
+    if paths:
+        _metrics.write(*paths)
+    _metrics.reset()
@@ -0,0 +1,224 @@
+import atexit
+import os
+import re
+import sys
+import threading
+from datetime import datetime
+
+from jira_metrics import get_metrics
+
+DEFAULT_PROFILE_TOP = 25
+# Intervalo (segundos) entre amostras de pilha usadas no arquivo de pilhas colapsadas (flamegraph)
+DEFAULT_SAMPLE_INTERVAL = 0.005
+
+_REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+# Primitivas de espera: o tempo nelas é de threads bloqueadas, não de CPU, e fica fora da tabela de hotspots
+IDLE_FUNCTIONS = {
+    "<method 'acquire' of '_thread.lock' objects>",
+    "<method 'acquire' of '_thread.RLock' objects>",
+    "<method 'get' of '_queue.SimpleQueue' objects>",
+    "<built-in method time.sleep>",
+}
+# Perfilador da execução atual, parado por `stop_profiling` (no `finally` do main ou, como fallback, no atexit)
+_active_profiler = None
+_atexit_registered = False
+
+
+def default_profile_prefix(script):
+    return f"profile_{script}_{datetime.now().strftime('%Y-%m-%d_%H%M%S')}"
+
+
+def _short_path(filename):
+    """Caminho relativo ao repositório (ou só o nome do arquivo, para bibliotecas) para as tabelas e pilhas."""
+    if filename.startswith(_REPO_DIR + os.sep):
+        return os.path.relpath(filename, _REPO_DIR)
+    return os.path.basename(filename)
+
+
+class StackSampler:
+    """Amostra periodicamente a pilha de todas as threads (tempo de relógio, inclusive esperas de rede).
+
+    O resultado é gravado no formato de pilhas colapsadas (`thread;f1;f2 N`), lido por flamegraph.pl, speedscope e similares.
+    """
+
+    def __init__(self, interval=DEFAULT_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.counts = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        own = threading.get_ident()
+        labels = {}
+        while not self._stop.wait(self.interval):
+            # Threads de um mesmo pool (ThreadPoolExecutor-0_3) são agrupadas em uma única raiz
+            names = {t.ident: re.sub(r'_\d+$', '', t.name) for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    label = labels.get(code)
+                    if label is None:
+                        label = labels[code] = f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+                    stack.append(label)
+                    frame = frame.f_back
+                stack.append(names.get(ident, 'thread'))
+                key = ';'.join(reversed(stack))
+                self.counts[key] = self.counts.get(key, 0) + 1
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=1)
+
+    def write(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in sorted(self.counts.items()):
+                f.write(f"{stack} {count}\n")
+
+
+class Profiler:
+    """`--profile`: cProfile em todas as threads, pilhas amostradas para flamegraph e pico de memória (tracemalloc) por fase.
+
+    Ao parar, grava `<prefixo>.pstats` e `<prefixo>.collapsed.txt` e imprime as N funções mais custosas e a memória por fase.
+    Os picos por fase são aproximados quando fases rodam ao mesmo tempo em threads diferentes.
+    """
+
+    def __init__(self, script, prefix=None, top=DEFAULT_PROFILE_TOP, interval=DEFAULT_SAMPLE_INTERVAL):
+        self.script = script
+        self.prefix = prefix or default_profile_prefix(script)
+        self.top = top
+        self.sampler = StackSampler(interval)
+        self.phase_memory = {}
+        self._profiles = []
+        self._lock = threading.Lock()
+        self._running = False
+
+    def start(self):
+        import cProfile
+        import tracemalloc
+
+        self._running = True
+        tracemalloc.start()
+        get_metrics().phase_observer = self
+        self.sampler.start()
+        # Cada nova thread liga o próprio cProfile (o perfilador só mede a thread em que foi ativado)
+        threading.setprofile(self._start_thread_profile)
+        main_profile = cProfile.Profile()
+        self._profiles.append(main_profile)
+        main_profile.enable()
+
+    def _start_thread_profile(self, frame, event, arg):
+        import cProfile
+
+        profile = cProfile.Profile()
+        with self._lock:
+            self._profiles.append(profile)
+        profile.enable()
+
+    def phase_started(self, name):
+        import tracemalloc
+
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        return current
+
+    def phase_finished(self, name, start_current):
+        import tracemalloc
+
+        _, peak = tracemalloc.get_traced_memory()
+        with self._lock:
+            peak_max, growth_max = self.phase_memory.get(name, (0, 0))
+            self.phase_memory[name] = (max(peak_max, peak), max(growth_max, peak - start_current))
+
+    def stop(self):
+        """Desliga os perfiladores, grava os arquivos e imprime o resumo. Pode ser chamado mais de uma vez."""
+        if not self._running:
+            return
+        self._running = False
+        import pstats
+        import tracemalloc
+
+        self._profiles[0].disable()
+        threading.setprofile(None)
+        self.sampler.stop()
+        get_metrics().phase_observer = None
+        _, traced_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        stats = pstats.Stats(self._profiles[0])
+        for profile in self._profiles[1:]:
+            try:
+                stats.add(profile)
+            except TypeError:
+                # Thread que não chegou a executar nenhuma função Python
+                pass
+        os.makedirs(os.path.dirname(self.prefix) or '.', exist_ok=True)
+        pstats_path = f"{self.prefix}.pstats"
+        collapsed_path = f"{self.prefix}.collapsed.txt"
+        stats.dump_stats(pstats_path)
+        self.sampler.write(collapsed_path)
+
+        print(f"\n--- Perfil de execução ({self.script}) ---")
+        print(format_hotspots(stats, self.top))
+        print(self.format_phases(traced_peak))
+        print(f"\nPerfil cProfile gravado em '{pstats_path}' (python -m pstats {pstats_path}).")
+        print(f"Pilhas colapsadas gravadas em '{collapsed_path}' (flamegraph.pl ou speedscope).")
+
+    def format_phases(self, traced_peak):
+        phases = get_metrics().summary()['phases']
+        lines = [f"\n{'fase':<18} {'tempo (s)':>10} {'execuções':>10} {'pico mem. (MB)':>15} {'cresc. (MB)':>12}"]
+        for name in sorted(set(phases) | set(self.phase_memory)):
+            seconds = phases.get(name, {}).get('seconds', 0.0)
+            calls = phases.get(name, {}).get('calls', 0)
+            peak, growth = self.phase_memory.get(name, (0, 0))
+            lines.append(f"{name:<18} {seconds:>10.3f} {calls:>10} {peak / 1048576:>15.1f} {growth / 1048576:>12.1f}")
+        lines.append(f"Pico de memória Python (tracemalloc) no processo: {traced_peak / 1048576:.1f} MB")
+        return '\n'.join(lines)
+
+
+def _is_idle(func):
+    filename, _, name = func
+    return filename == '~' and name in IDLE_FUNCTIONS
+
+
+def format_hotspots(stats, top=DEFAULT_PROFILE_TOP):
+    """Tabela das `top` funções com maior tempo próprio (somado entre threads), sem as esperas de threads ociosas."""
+    idle = sum(stat[2] for func, stat in stats.stats.items() if _is_idle(func))
+    busy = [item for item in stats.stats.items() if not _is_idle(item[0])]
+    rows = sorted(busy, key=lambda item: item[1][2], reverse=True)[:top]
+    lines = [f"{'tempo próprio (s)':>18} {'acumulado (s)':>14} {'chamadas':>10}  função"]
+    for (filename, line, name), (cc, nc, tt, ct, callers) in rows:
+        calls = f"{nc}/{cc}" if nc != cc else str(nc)
+        where = f"{_short_path(filename)}:{line}({name})" if filename != '~' else name
+        lines.append(f"{tt:>18.3f} {ct:>14.3f} {calls:>10}  {where}")
+    lines.append(f"Espera em locks, filas e sleep (limitador, pools ociosos), somada entre threads: {idle:.3f} s")
+    return '\n'.join(lines)
+
+
+def start_profiling(script, prefix=None, top=DEFAULT_PROFILE_TOP):
+    """Liga o `--profile` da execução atual. Retorna o `Profiler`.
+
+    O `main()` de cada script chama `stop_profiling()` no próprio `finally`; o `atexit` é só um fallback.
+    """
+    global _active_profiler, _atexit_registered
+    stop_profiling()
+    profiler = Profiler(script, prefix or None, top)
+    profiler.start()
+    _active_profiler = profiler
+    if not _atexit_registered:
+        atexit.register(stop_profiling)
+        _atexit_registered = True
+    return profiler
+
+
+def stop_profiling():
+    """Para o perfilador ligado por `start_profiling` (se houver), gravando os arquivos e imprimindo o resumo."""
+    global _active_profiler
+    profiler, _active_profiler = _active_profiler, None
+    if profiler is not None:
+        profiler.stop()
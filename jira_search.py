@@ -0,0 +1,222 @@
+import collections
+import concurrent.futures
+import itertools
+from datetime import date, timedelta
+
+from jira_metrics import phase
+
+DEFAULT_PAGE_SIZE = 100
+DEFAULT_SEARCH_WORKERS = 4
+# Máximo de issues por janela de data em `search_date_windows`: acima disso o `startAt` fica fundo e lento no servidor
+DEFAULT_WINDOW_SIZE = 1000
+
+
+class LeanObject:
+    """Acesso por atributos a um dict JSON do Jira, sem hidratar `jira.resources.Resource`.
+
+    Campos ausentes levantam AttributeError (como nos Resources), então `hasattr`/`getattr` continuam válidos.
+    """
+    __slots__ = ('_data',)
+
+    def __init__(self, data):
+        self._data = data
+
+    def __getattr__(self, name):
+        # copy/pickle procuram `__deepcopy__`, `__reduce_ex__`, ... antes de `_data` existir na instância nova
+        if name.startswith('__') or name == '_data':
+            raise AttributeError(name)
+        try:
+            value = self._data[name]
+        except KeyError:
+            raise AttributeError(name) from None
+        return _wrap(value)
+
+    def __repr__(self):
+        return f"LeanObject({self._data!r})"
+
+
+def _wrap(value):
+    if isinstance(value, dict):
+        return LeanObject(value)
+    if isinstance(value, list):
+        return [_wrap(v) for v in value]
+    return value
+
+
+class LeanIssue:
+    """Issue enxuta decodificada do JSON de busca: apenas `id`, `key` e os campos solicitados."""
+    __slots__ = ('id', 'key', 'raw', 'fields')
+
+    def __init__(self, raw):
+        self.id = raw.get('id')
+        self.key = raw.get('key')
+        self.raw = {'key': self.key, 'fields': raw.get('fields') or {}}
+        self.fields = LeanObject(self.raw['fields'])
+
+    def __repr__(self):
+        return f"<LeanIssue: key='{self.key}'>"
+
+
+def iter_pages(fetch_page, page_size=DEFAULT_PAGE_SIZE, max_workers=DEFAULT_SEARCH_WORKERS):
+    """Gera as páginas de uma busca na ordem da JQL, conforme chegam, sem acumular as issues.
+
+    A primeira página informa o `total`; os demais `startAt` são buscados com até `max_workers` threads e no máximo
+    `2 * max_workers` páginas em memória. Chaves repetidas entre páginas (ordem alterada durante a busca) são descartadas;
+    para isso as chaves já geradas ficam em um conjunto, que cresce com o total da busca (só as chaves, não as issues).
+    """
+    first, total = fetch_page(0, page_size)
+    first = list(first)
+    seen = {issue.key for issue in first}
+    yield first
+    if not first or total is None or len(first) >= total:
+        return
+
+    step = len(first)
+    offsets = iter(range(step, total, step))
+
+    def unseen(page):
+        fresh = [issue for issue in page if issue.key not in seen]
+        seen.update(issue.key for issue in fresh)
+        return fresh
+
+    workers = max(1, min(max_workers or 1, -(-(total - step) // step)))
+    if workers == 1:
+        for start_at in offsets:
+            yield unseen(fetch_page(start_at, step)[0])
+        return
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = collections.deque(executor.submit(fetch_page, start_at, step) for start_at in itertools.islice(offsets, 2 * workers))
+        while pending:
+            page, _ = pending.popleft().result()
+            start_at = next(offsets, None)
+            if start_at is not None:
+                pending.append(executor.submit(fetch_page, start_at, step))
+            yield unseen(page)
+
+
+def _collect_pages(fetch_page, page_size, max_workers):
+    """Busca a primeira página, lê `total` e busca os demais `startAt` em paralelo, preservando a ordem."""
+    issues = []
+    for page in iter_pages(fetch_page, page_size, max_workers):
+        issues.extend(page)
+    return issues
+
+
+def search_all_issues(client, jql, fields=None, page_size=DEFAULT_PAGE_SIZE, max_workers=DEFAULT_SEARCH_WORKERS, lean=False, **kwargs):
+    """Busca todas as issues de uma JQL buscando as páginas restantes em paralelo.
+
+    A primeira página informa o `total` e o tamanho de página efetivo do servidor; os demais `startAt`
+    são buscados com até `max_workers` threads. O resultado preserva a ordem da JQL (ex.: `ORDER BY Rank`)
+    e descarta chaves repetidas caso a ordem mude entre páginas. Com `lean=True`, as páginas são lidas
+    direto de `/rest/api/2/search` e decodificadas em `LeanIssue`.
+    """
+    if lean:
+        return lean_search_issues(client, jql, fields, page_size=page_size, max_workers=max_workers)
+
+    if fields is not None:
+        kwargs['fields'] = fields
+
+    def fetch_page(start_at, max_results):
+        page = client.search_issues(jql, startAt=start_at, maxResults=max_results, **kwargs)
+        return page, getattr(page, 'total', None)
+
+    with phase('fetch'):
+        return _collect_pages(fetch_page, page_size, max_workers)
+
+
+def lean_search_issues(client, jql, fields, page_size=DEFAULT_PAGE_SIZE, max_workers=DEFAULT_SEARCH_WORKERS):
+    """Busca via `/rest/api/2/search` na sessão do cliente e retorna `LeanIssue` com apenas os campos pedidos."""
+    fetch_page = _lean_page_fetcher(client, jql, fields)
+    with phase('fetch'):
+        return _collect_pages(fetch_page, page_size, max_workers)
+
+
+def lean_search_pages(client, jql, fields, page_size=DEFAULT_PAGE_SIZE, max_workers=DEFAULT_SEARCH_WORKERS):
+    """Como `lean_search_issues`, mas gera cada página de `LeanIssue` assim que chega, para agregar sem guardar todas.
+
+    O tempo de cada requisição entra na fase `fetch` (somado entre threads).
+    """
+    fetch_page = _lean_page_fetcher(client, jql, fields)
+
+    def timed_fetch_page(start_at, max_results):
+        with phase('fetch'):
+            return fetch_page(start_at, max_results)
+
+    return iter_pages(timed_fetch_page, page_size, max_workers)
+
+
+def _lean_page_fetcher(client, jql, fields):
+    if isinstance(fields, str):
+        fields = [f.strip() for f in fields.split(',') if f.strip()]
+    search_url = f"{client._options['server'].rstrip('/')}/rest/api/2/search"
+
+    def fetch_page(start_at, max_results):
+        payload = {'jql': jql, 'startAt': start_at, 'maxResults': max_results, 'fields': list(fields or ['*navigable'])}
+        response = client._session.post(search_url, json=payload)
+        response.raise_for_status()
+        data = response.json()
+        return [LeanIssue(raw) for raw in data.get('issues', [])], data.get('total')
+
+    return fetch_page
+
+
+def count_issues(client, jql):
+    """Total de issues de uma JQL sem trazer nenhuma issue (`maxResults=0`)."""
+    search_url = f"{client._options['server'].rstrip('/')}/rest/api/2/search"
+    with phase('fetch'):
+        response = client._session.post(search_url, json={'jql': jql, 'startAt': 0, 'maxResults': 0, 'fields': ['key']})
+    response.raise_for_status()
+    return response.json().get('total', 0)
+
+
+def search_date_windows(client, clauses, start_date, end_date, fields, date_field='resolved', window_size=DEFAULT_WINDOW_SIZE, max_workers=DEFAULT_SEARCH_WORKERS):
+    """Gera as `LeanIssue` de `clauses` com `date_field` entre `start_date` e `end_date` (YYYY-MM-DD), dividindo o período em janelas.
+
+    Uma contagem (`maxResults=0`) do período decide a divisão: até `window_size` issues, a busca é única; acima disso, o
+    período é dividido em janelas de dias, contadas e buscadas em paralelo (até `max_workers` requisições ao mesmo tempo).
+    Janelas com mais de `window_size` issues são divididas ao meio até ficarem com um dia. As issues saem conforme as
+    janelas terminam, fora da ordem da JQL. As janelas são semiabertas e disjuntas, então as chaves repetidas só são
+    procuradas dentro de cada janela (pela busca paginada) e nada é guardado entre elas. Datas em outro formato aceito
+    pela JQL (ex.: `-30d`) são repassadas como estão, em uma busca única.
+    """
+    def window_jql(first, last, closed):
+        # Janelas semiabertas [first, last); só a última inclui `end_date`, como na consulta original
+        return " AND ".join(list(clauses) + [f"{date_field} >= '{first}'", f"{date_field} {'<=' if closed else '<'} '{last}'"])
+
+    try:
+        start, end = date.fromisoformat(str(start_date)), date.fromisoformat(str(end_date))
+    except ValueError:
+        start, end = start_date, end_date
+        total = None
+    else:
+        total = count_issues(client, window_jql(start, end, True))
+    if total is None or total <= window_size:
+        for page in lean_search_pages(client, window_jql(start, end, True), fields, max_workers=max_workers):
+            yield from page
+        return
+
+    days = max(1, (end - start).days)
+    count = min(days, -(-total // window_size))
+    bounds = [start + timedelta(days=days * i // count) for i in range(count)] + [end]
+    windows = [(bounds[i], bounds[i + 1], i == count - 1) for i in range(count)]
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, max_workers or 1)) as executor:
+        pending = {executor.submit(count_issues, client, window_jql(*window)): ('count', window) for window in windows}
+        while pending:
+            done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                kind, window = pending.pop(future)
+                result = future.result()
+                if kind == 'fetch':
+                    yield from result
+                    continue
+                first, last, closed = window
+                if result == 0:
+                    continue
+                if result > window_size and (last - first).days >= 2:
+                    middle = first + timedelta(days=(last - first).days // 2)
+                    for half in ((first, middle, False), (middle, last, closed)):
+                        pending[executor.submit(count_issues, client, window_jql(*half))] = ('count', half)
+                else:
+                    pending[executor.submit(lean_search_issues, client, window_jql(*window), fields, max_workers=1)] = ('fetch', window)
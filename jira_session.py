@@ -0,0 +1,67 @@
+import threading
+
+from jira_metrics import install_metrics, phase
+from jira_throttle import install_client_rate_limiter, install_session_rate_limiter
+
+# Tamanho padrão do pool de conexões keep-alive por servidor (o mesmo padrão do urllib3)
+DEFAULT_POOL_SIZE = 10
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def pool_size_for(config, *workers):
+    """Tamanho do pool para a concorrência informada: `http-pool-size` do config ou a soma das threads, no mínimo o padrão."""
+    configured = (config or {}).get('http-pool-size')
+    if configured:
+        return int(configured)
+    return max(DEFAULT_POOL_SIZE, sum(w or 0 for w in workers))
+
+
+def configure_session(session, token=None, pool_size=DEFAULT_POOL_SIZE):
+    """Prepara uma sessão para o Jira: pool keep-alive com `pool_size` conexões, gzip, autenticação e métricas definidos uma vez."""
+    from requests.adapters import HTTPAdapter
+
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(1, pool_size))
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.pool_size = max(1, pool_size)
+    session.headers.update({'Accept-Encoding': 'gzip, deflate'})
+    if token:
+        session.headers.update({'Authorization': f'Bearer {token}'})
+    install_metrics(session)
+    return session
+
+
+def get_session(config, pool_size=DEFAULT_POOL_SIZE):
+    """Sessão `requests` compartilhada do processo para o servidor e token do config, com limitador de requisições.
+
+    Criada na primeira chamada; chamadas seguintes com um pool maior ampliam o pool da mesma sessão.
+    """
+    import requests
+
+    server_url = config['jira_server'].rstrip('/')
+    token = config.get('jira_token')
+    key = (server_url, token)
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = configure_session(requests.Session(), token, pool_size)
+            session.headers.update({'Accept': 'application/json'})
+            install_session_rate_limiter(session, config)
+            _sessions[key] = session
+        elif pool_size > session.pool_size:
+            configure_session(session, token, pool_size)
+        return session
+
+
+def create_jira_client(config, pool_size=DEFAULT_POOL_SIZE, max_rps=None):
+    """Cria o cliente `jira.JIRA` do config com a sessão já configurada (pool, gzip, autenticação, métricas e limitador)."""
+    from jira import JIRA
+
+    token = config.get('jira_token')
+    with phase('connect'):
+        client = JIRA(server=config['jira_server'], options={'headers': {'Authorization': f'Bearer {token}'}})
+    configure_session(client._session, token, pool_size)
+    install_client_rate_limiter(client, config, max_rps=max_rps)
+    return client
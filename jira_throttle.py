@@ -0,0 +1,168 @@
+import random
+import threading
+import time
+
+from jira_metrics import get_metrics
+
+DEFAULT_MAX_RPS = 10
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BACKOFF_BASE = 1.0
+DEFAULT_BACKOFF_CAP = 60.0
+
+RETRYABLE_STATUS = (429, 503)
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+# POSTs que só leem dados e podem ser repetidos com segurança
+IDEMPOTENT_POST_PATHS = ('/rest/api/2/search', '/rest/api/3/search')
+
+
+class RateLimiter:
+    """Token bucket compartilhado entre threads: no máximo `rate` requisições/s, com rajadas de até `burst`.
+
+    Um `Retry-After` recebido por qualquer thread pausa todas as demais até o prazo indicado.
+    """
+
+    def __init__(self, rate=DEFAULT_MAX_RPS, burst=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate) if rate and rate > 0 else None
+        self.burst = float(burst or max(1, self.rate or 1))
+        self._tokens = self.burst
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Bloqueia até haver um token disponível (e até o fim de uma pausa global em andamento)."""
+        while True:
+            with self._lock:
+                now = self._clock()
+                wait = self._paused_until - now
+                if wait <= 0:
+                    if self.rate is None:
+                        return
+                    self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            self._sleep(wait)
+
+    def pause(self, seconds):
+        """Suspende todas as threads por `seconds` a partir de agora (sem encurtar uma pausa maior já vigente)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, self._clock() + seconds)
+
+
+def parse_retry_after(value):
+    """Converte o cabeçalho `Retry-After` (segundos ou data HTTP) em segundos; None se ausente/inválido."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        from email.utils import parsedate_to_datetime
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, base=DEFAULT_BACKOFF_BASE, cap=DEFAULT_BACKOFF_CAP):
+    """Espera exponencial com jitter completo para a tentativa `attempt` (1, 2, ...)."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def is_idempotent(method, url):
+    method = (method or '').upper()
+    if method in IDEMPOTENT_METHODS:
+        return True
+    return method == 'POST' and str(url).rstrip('/').endswith(IDEMPOTENT_POST_PATHS)
+
+
+def _retry_status(error):
+    """Status HTTP que justifica nova tentativa (429/503) ou None."""
+    status = getattr(error, 'status_code', None)
+    if status is None:
+        status = getattr(getattr(error, 'response', None), 'status_code', None)
+    return status if status in RETRYABLE_STATUS else None
+
+
+def install_rate_limiter(session, limiter, max_retries=DEFAULT_MAX_RETRIES, backoff_base=DEFAULT_BACKOFF_BASE, backoff_cap=DEFAULT_BACKOFF_CAP, logger=print):
+    """Faz todas as requisições de `session` passarem pelo `limiter`, repetindo as idempotentes em 429/503.
+
+    As tentativas próprias da `ResilientSession` do jira são desligadas para que cada nova tentativa também
+    consuma um token e respeite a pausa global. Um `Retry-After` pausa todas as threads no `limiter`; sem ele, só a
+    requisição que falhou espera o backoff. Retorna a sessão.
+    """
+    from requests.exceptions import ConnectionError as RequestsConnectionError
+
+    if getattr(session, '_rate_limiter', None) is not None:
+        session._rate_limiter = limiter
+        return session
+    if hasattr(session, 'max_retries'):
+        session.max_retries = 0
+    original_request = session.request
+
+    def request(method, url, *args, **kwargs):
+        attempt = 0
+        while True:
+            session._rate_limiter.acquire()
+            response = None
+            try:
+                response = original_request(method, url, *args, **kwargs)
+                status = response.status_code if response.status_code in RETRYABLE_STATUS else None
+                error = None
+            except Exception as e:
+                # JIRAError (ResilientSession) ou erro de conexão; o jira não é importado aqui para não pesar no import.py
+                status = _retry_status(e)
+                error = e
+                response = getattr(e, 'response', None)
+                if status is None and not isinstance(e, RequestsConnectionError):
+                    raise
+            if (status is None and error is None) or attempt >= max_retries or not is_idempotent(method, url):
+                if error is not None:
+                    raise error
+                return response
+
+            attempt += 1
+            retry_after = parse_retry_after(response.headers.get('Retry-After')) if response is not None else None
+            if retry_after is not None:
+                delay = retry_after + random.uniform(0, backoff_base)
+            else:
+                delay = backoff_delay(attempt, backoff_base, backoff_cap)
+            reason = f"HTTP {status}" if status else f"erro de conexão ({error})"
+            logger(f"    -> {reason} em {method.upper()} {url}; nova tentativa {attempt}/{max_retries} em {delay:.1f}s.")
+            get_metrics().record_retry(method, url)
+            if retry_after is not None:
+                # O servidor pediu uma pausa: vale para todas as threads
+                session._rate_limiter.pause(delay)
+            else:
+                # Sem Retry-After, o backoff é só desta requisição; as demais seguem no ritmo do limitador
+                time.sleep(delay)
+
+    session._rate_limiter = limiter
+    session.request = request
+    return session
+
+
+def install_session_rate_limiter(session, config=None, max_rps=None, logger=print):
+    """Limita e repete as requisições de `session` conforme o config (`max-requests-per-second`, `max-retries`, ...)."""
+    config = config or {}
+    rate = max_rps if max_rps is not None else config.get('max-requests-per-second', DEFAULT_MAX_RPS)
+    limiter = RateLimiter(rate, burst=config.get('rate-limit-burst'))
+    install_rate_limiter(
+        session,
+        limiter,
+        max_retries=config.get('max-retries', DEFAULT_MAX_RETRIES),
+        backoff_base=config.get('retry-backoff-base', DEFAULT_BACKOFF_BASE),
+        backoff_cap=config.get('retry-backoff-cap', DEFAULT_BACKOFF_CAP),
+        logger=logger,
+    )
+    return limiter
+
+
+def install_client_rate_limiter(client, config=None, max_rps=None, logger=print):
+    """Atalho para um cliente `jira.JIRA`: limita e repete as requisições de `client._session` conforme o config."""
+    return install_session_rate_limiter(client._session, config, max_rps=max_rps, logger=logger)
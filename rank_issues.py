@@ -1,11 +1,25 @@
 import argparse
+import bisect
+import concurrent.futures
 import json
 import os
 import sys
+import threading
 import traceback
 import time
+from datetime import datetime
+from collections import namedtuple
 from functools import cmp_to_key
-from jira import JIRA, JIRAError
+
+from jira_fields import DEFAULT_FIELDS_CACHE_FILE, get_client_field_registry
+from jira_metrics import enable_metrics_export, flush_metrics_export, phase
+from jira_profile import DEFAULT_PROFILE_TOP, start_profiling, stop_profiling
+from jira_search import DEFAULT_SEARCH_WORKERS, count_issues, search_all_issues
+from rank_journal import ISSUE_KEY_RE, RankJournal, journal_keys, label_parent, load_journal, open_parents, pending_batches, plan_still_valid
+from rank_state import RankState, children_fingerprint, settings_fingerprint, updated_since_jql
+from rank_webhook import DEFAULT_DEBOUNCE_SECONDS, DEFAULT_SERVE_HOST, DEFAULT_SERVE_PORT, SPRINT_TARGET_PREFIX, Debouncer, make_webhook_server
+from jira_session import create_jira_client, pool_size_for
+from jira_throttle import DEFAULT_MAX_RPS
 
 # Reconfigura o encoding da saída padrão no Windows para evitar quebras por caracteres especiais
 if hasattr(sys.stdout, 'reconfigure'):
@@ -22,6 +36,8 @@ if hasattr(sys.stderr, 'reconfigure'):
 
 def check_and_handle_401(e):
     """Verifica se a exceção é um erro 401 (Não Autorizado) do Jira e encerra com mensagem amigável."""
+    from jira import JIRAError
+
     is_401 = False
     if isinstance(e, JIRAError) and e.status_code == 401:
         is_401 = True
@@ -31,7 +47,7 @@ def check_and_handle_401(e):
     if is_401:
         print("\nErro: O token do Jira fornecido não é mais válido (Erro HTTP 401 - Não Autorizado).")
         print("Por favor, verifique se o 'jira_token' no seu arquivo de configuração está correto e ativo.")
-        exit(1)
+        sys.exit(1)
 
 
 
@@ -45,18 +61,25 @@ def load_config(config_path):
 
 
 def get_rank_field_id(client):
-    """Descobre dinamicamente o ID do campo 'Rank'."""
+    """Descobre dinamicamente o ID do campo 'Rank' (resolvido uma vez por processo pelo registro de campos)."""
     try:
-        all_fields = client.fields()
-        for field in all_fields:
-            if field.get('name') == 'Rank':
-                return field.get('id')
+        return get_client_field_registry(client).get('rank')
     except Exception as e:
         check_and_handle_401(e)
         print(f"Aviso: Não foi possível descobrir o ID do campo 'Rank'. Erro: {e}")
     return None
 
 
+def resolve_field_ids(client, epic_field_id=None, sprint_field_id=None, severity_field_id=None):
+    """Completa os IDs de Epic Link, Sprint e Gravidade não informados a partir do registro de campos."""
+    if not epic_field_id or not sprint_field_id or not severity_field_id:
+        field_ids = get_client_field_registry(client).field_ids()
+        epic_field_id = epic_field_id or field_ids.get('epic_link')
+        sprint_field_id = sprint_field_id or field_ids.get('sprint')
+        severity_field_id = severity_field_id or field_ids.get('severity')
+    return epic_field_id, sprint_field_id, severity_field_id
+
+
 def parse_sprint_info(item):
     start_date = None
     sprint_id = -1
@@ -131,7 +154,7 @@ def get_issuetype_emoji(name):
 def get_priority_emoji(priority):
     if not priority:
         return "⚪"
-    name = priority.name.lower() if hasattr(priority, 'name') else str(priority).lower()
+    name = (priority.name or '').lower() if hasattr(priority, 'name') else str(priority).lower()
     pid = str(priority.id) if hasattr(priority, 'id') else str(priority)
     if pid == '1' or 'highest' in name or 'crítico' in name or 'critico' in name or 'urgente' in name:
         return "🔴"
@@ -163,7 +186,7 @@ def get_severity_emoji(severity_val):
 def get_status_emoji(status):
     if not status:
         return "⚪"
-    name = status.name.lower() if hasattr(status, 'name') else str(status).lower()
+    name = (status.name or '').lower() if hasattr(status, 'name') else str(status).lower()
     name = name.strip()
     if "pendência" in name or "pendencia" in name or "pending" in name:
         return "⚠️"
@@ -190,7 +213,685 @@ def get_status_emoji(status):
     return "ℹ️"
 
 
-def format_issue_info(issue, rank_by_list, epic_field_id, severity_field_id):
+def compare_criterion_values(val1, val2, order):
+    """Compara dois valores de um critério: nulos por último, fallback para str() em tipos incompatíveis."""
+    if val1 is None and val2 is not None:
+        return 1
+    if val1 is not None and val2 is None:
+        return -1
+    if val1 is None and val2 is None:
+        return 0
+    try:
+        if val1 < val2:
+            return -1 if order == 'asc' else 1
+        if val1 > val2:
+            return 1 if order == 'asc' else -1
+    except TypeError:
+        s1 = str(val1)
+        s2 = str(val2)
+        if s1 < s2:
+            return -1 if order == 'asc' else 1
+        if s1 > s2:
+            return 1 if order == 'asc' else -1
+    return 0
+
+
+class _Descending:
+    """Inverte a comparação de um valor para compor chaves de ordenação descendentes."""
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __repr__(self):
+        return f"desc({self.value!r})"
+
+
+def _value_kind(value):
+    """Classifica um valor para decidir se a coluna pode ser comparada diretamente (sem TypeError)."""
+    if isinstance(value, (bool, int, float)):
+        return 'num'
+    if isinstance(value, str):
+        return 'str'
+    if isinstance(value, tuple):
+        kinds = tuple(_value_kind(v) for v in value)
+        return kinds if all(isinstance(k, str) for k in kinds) else None
+    return None
+
+
+def compile_sort_keys(issues, rank_by_list, order_list, get_value):
+    """Extrai cada critério uma única vez por issue e compila chaves de ordenação compostas.
+
+    Retorna (chaves, valores): `valores[i]` guarda os valores brutos da issue i e `chaves[i]` a tupla
+    normalizada (nulos por último, desc invertido). Quando algum critério mistura tipos não comparáveis,
+    `chaves` é None e a ordenação deve recorrer ao comparador legado sobre os valores já extraídos.
+    """
+    values = [tuple(get_value(issue, criterion) for criterion in rank_by_list) for issue in issues]
+
+    column_kinds = []
+    for col in range(len(rank_by_list)):
+        kinds = {_value_kind(row[col]) for row in values if row[col] is not None}
+        if None in kinds or len(kinds) > 1:
+            return None, values
+        column_kinds.append(kinds.pop() if kinds else None)
+
+    keys = []
+    for row in values:
+        key = []
+        for col, val in enumerate(row):
+            if val is None:
+                key.append((1,))
+            elif order_list[col] == 'asc':
+                key.append((0, val))
+            elif column_kinds[col] == 'num':
+                key.append((0, -val))
+            else:
+                key.append((0, _Descending(val)))
+        keys.append(tuple(key))
+    return keys, values
+
+
+def sort_issues(issues, rank_by_list, order_list, get_value, debug=False, logger=print):
+    """Ordena as issues pelos critérios informados usando chaves pré-compiladas (ordem estável)."""
+    with phase('sort'):
+        keys, values = compile_sort_keys(issues, rank_by_list, order_list, get_value)
+
+        if debug:
+            logger("\n--- Chaves de ordenação calculadas ---")
+            for issue, row in zip(issues, values):
+                explained = ", ".join(f"{c}={v!r}" for c, v in zip(rank_by_list, row))
+                logger(f"  {issue.key}: {explained}")
+            if keys is None:
+                logger("  > Tipos mistos em algum critério: usando o comparador legado sobre os valores extraídos.")
+
+        indices = range(len(issues))
+        if keys is not None:
+            order = sorted(indices, key=keys.__getitem__)
+        else:
+            def compare_rows(i, j):
+                for col, direction in enumerate(order_list):
+                    result = compare_criterion_values(values[i][col], values[j][col], direction)
+                    if result:
+                        return result
+                return 0
+            order = sorted(indices, key=cmp_to_key(compare_rows))
+        return [issues[i] for i in order]
+
+
+RANK_API_MAX_ISSUES = 50
+# A partir de quantas chamadas um plano é dividido em cadeias independentes enviadas em paralelo
+SPLIT_PLAN_MIN_CALLS = 8
+# Quanto tempo, em segundos, esperar a thread de um item cancelado por tempo limite terminar o lote em andamento
+DEFAULT_CANCEL_GRACE = 30.0
+
+
+def _longest_increasing_subsequence(values):
+    """Retorna os índices de uma subsequência estritamente crescente de tamanho máximo (O(n log n))."""
+    tails = []
+    tails_idx = []
+    previous = [-1] * len(values)
+    for i, v in enumerate(values):
+        pos = bisect.bisect_left(tails, v)
+        if pos == len(tails):
+            tails.append(v)
+            tails_idx.append(i)
+        else:
+            tails[pos] = v
+            tails_idx[pos] = i
+        previous[i] = tails_idx[pos - 1] if pos > 0 else -1
+    result = []
+    i = tails_idx[-1] if tails_idx else -1
+    while i != -1:
+        result.append(i)
+        i = previous[i]
+    result.reverse()
+    return result
+
+
+def plan_rank_moves(current_order_keys, proposed_order_keys, batch_size=RANK_API_MAX_ISSUES):
+    """Monta o plano mínimo de chamadas à API de rank para levar a ordem atual à proposta.
+
+    Mantém no lugar a maior subsequência já ordenada e move apenas as demais issues, agrupando
+    sequências contíguas (na ordem proposta) em uma única chamada `rankAfterIssue`/`rankBeforeIssue`.
+    Cada item do plano é o próprio payload da chamada.
+    """
+    batch_size = max(1, min(batch_size, RANK_API_MAX_ISSUES))
+    current_pos = {key: i for i, key in enumerate(current_order_keys)}
+    positions = [current_pos.get(key, -1) for key in proposed_order_keys]
+    kept = set(_longest_increasing_subsequence(positions))
+
+    plan = []
+    total = len(proposed_order_keys)
+    i = 0
+    while i < total:
+        if i in kept:
+            i += 1
+            continue
+        j = i
+        while j < total and j not in kept:
+            j += 1
+        run = proposed_order_keys[i:j]
+        chunks = [run[k:k + batch_size] for k in range(0, len(run), batch_size)]
+        for n, chunk in enumerate(chunks):
+            if n > 0:
+                plan.append({"issues": chunk, "rankAfterIssue": chunks[n - 1][-1]})
+            elif i > 0:
+                plan.append({"issues": chunk, "rankAfterIssue": proposed_order_keys[i - 1]})
+            else:
+                plan.append({"issues": chunk, "rankBeforeIssue": proposed_order_keys[j]})
+        i = j
+    return plan
+
+
+def split_rank_plan(plan):
+    """Divide o plano em cadeias independentes, da maior para a menor.
+
+    Cada sequência movida é ancorada em uma issue que permanece no lugar; só os lotes de uma mesma
+    sequência dependem uns dos outros (cada um vai depois do último do lote anterior). Cadeias
+    diferentes podem, portanto, ser enviadas em paralelo.
+    """
+    chains = []
+    for move in plan:
+        if chains and move.get("rankAfterIssue") == chains[-1][-1]["issues"][-1]:
+            chains[-1].append(move)
+        else:
+            chains.append([move])
+    return sorted(chains, key=len, reverse=True)
+
+
+def describe_rank_plan(plan, total_issues, batch_size=RANK_API_MAX_ISSUES):
+    """Resumo textual do plano: issues movidas e chamadas previstas versus a reordenação completa."""
+    batch_size = max(1, min(batch_size, RANK_API_MAX_ISSUES))
+    moved = sum(len(move["issues"]) for move in plan)
+    full_calls = -(-max(0, total_issues - 1) // batch_size)
+    return f"Plano de reordenação: {moved} issue(s) a mover em {len(plan)} chamada(s) à API de rank (reordenação completa exigiria {full_calls})."
+
+
+class RankCancelled(Exception):
+    """A aplicação de um plano de rank foi interrompida (ex.: tempo limite do épico esgotado)."""
+
+
+def apply_rank_plan(client, plan, logger=print, debug=False, verbose=True, journal=None, label=None, start=0, cancel_event=None):
+    """Envia cada movimento do plano para a API de rank do Jira, na ordem planejada.
+
+    Com `journal`, o plano e cada lote confirmado são gravados no diário sob `label`; `start` retoma a partir de um lote.
+    Se `cancel_event` for sinalizado, para antes do próximo lote levantando `RankCancelled`.
+    """
+    server_url = client._options['server'].rstrip('/')
+    rank_url = f"{server_url}/rest/agile/1.0/issue/rank"
+    if journal is not None and start == 0:
+        journal.record_plan(label, plan)
+    for index in range(start, len(plan)):
+        if cancel_event is not None and cancel_event.is_set():
+            if journal is not None:
+                journal.record_failed(label, index, 'cancelado')
+            raise RankCancelled(f"aplicação interrompida antes do lote {index + 1} de {len(plan)}")
+        move = plan[index]
+        batch_keys = move["issues"]
+        if "rankAfterIssue" in move:
+            target = f"para depois de '{move['rankAfterIssue']}'"
+        else:
+            target = f"para antes de '{move['rankBeforeIssue']}'"
+        if len(batch_keys) == 1:
+            logger(f"  - Movendo '{batch_keys[0]}' {target}...")
+        else:
+            logger(f"  - Movendo lote de {len(batch_keys)} issues ({', '.join(batch_keys)}) {target}...")
+        try:
+            with phase('apply'):
+                response = client._session.put(rank_url, json=move)
+                response.raise_for_status()
+        except BaseException as e:
+            if journal is not None:
+                journal.record_failed(label, index, e)
+            raise
+        if journal is not None:
+            journal.record_done(label, index)
+        if debug or verbose:
+            logger(f"    -> API response: {response.status_code} {response.reason}")
+    if journal is not None:
+        journal.record_complete(label)
+
+
+def iter_parallel(items, worker, max_workers, ordered=False, reorder_window=None, timeout=None, on_tick=None, tick=0.5, grace=DEFAULT_CANCEL_GRACE):
+    """Executa `worker(item, cancel_event)` em um pool e gera (item, resultado, erro) conforme os itens terminam.
+
+    Com `ordered=True` a saída segue a ordem de `items`, usando um buffer de reordenação de até `reorder_window`
+    itens (novos itens só são submetidos dentro dessa janela). Com `timeout` (segundos), um item que excede o
+    tempo de relógio é sinalizado pelo seu `cancel_event` e a thread tem até `grace` segundos para terminar o que
+    está em andamento; o item é então gerado com `TimeoutError` e o resultado parcial do worker (None se a thread
+    não terminou). Ao sair, espera as threads canceladas dentro desse prazo, para que recursos compartilhados só
+    sejam fechados depois delas. `on_tick()` é chamado periodicamente (ex.: para atualizar uma linha de progresso).
+    """
+    items = list(items)
+    total = len(items)
+    max_workers = max(1, max_workers or 1)
+    window = max(max_workers, reorder_window or max_workers * 4)
+    in_flight_limit = max_workers * 2
+
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+    running = {}
+    cancelling = {}
+    started = {}
+    events = {}
+    buffered = {}
+    abandoned = set()
+    next_submit = 0
+    next_emit = 0
+
+    def run(index):
+        started[index] = time.monotonic()
+        return worker(items[index], events[index])
+
+    def submit_more():
+        nonlocal next_submit
+        while next_submit < total and len(running) + len(cancelling) < in_flight_limit and (not ordered or next_submit < next_emit + window):
+            events[next_submit] = threading.Event()
+            running[executor.submit(run, next_submit)] = next_submit
+            next_submit += 1
+
+    def timeout_error():
+        return TimeoutError(f"tempo limite de {timeout:g}s excedido")
+
+    try:
+        submit_more()
+        while running or cancelling or buffered:
+            finished, _ = concurrent.futures.wait(list(running) + list(cancelling), timeout=tick, return_when=concurrent.futures.FIRST_COMPLETED)
+            ready = []
+            for future in finished:
+                if future in cancelling:
+                    index, _ = cancelling.pop(future)
+                    ready.append((index, None if future.exception() else future.result(), timeout_error()))
+                    continue
+                index = running.pop(future)
+                err = future.exception()
+                ready.append((index, None if err else future.result(), err))
+
+            if timeout:
+                now = time.monotonic()
+                for future, index in list(running.items()):
+                    if index in started and now - started[index] > timeout:
+                        events[index].set()
+                        del running[future]
+                        cancelling[future] = (index, now + grace)
+                for future, (index, deadline) in list(cancelling.items()):
+                    if now >= deadline:
+                        del cancelling[future]
+                        abandoned.add(future)
+                        ready.append((index, None, TimeoutError(f"tempo limite de {timeout:g}s excedido; a thread não terminou em {grace:g}s após o cancelamento")))
+
+            for index, result, err in ready:
+                if ordered:
+                    buffered[index] = (result, err)
+                else:
+                    yield items[index], result, err
+            while ordered and next_emit in buffered:
+                result, err = buffered.pop(next_emit)
+                yield items[next_emit], result, err
+                next_emit += 1
+            if not ordered:
+                next_emit = next_submit
+            submit_more()
+            if on_tick is not None:
+                on_tick()
+    finally:
+        for event in events.values():
+            event.set()
+        if cancelling:
+            deadline = max(deadline for _, deadline in cancelling.values())
+            concurrent.futures.wait(list(cancelling), timeout=max(0.0, deadline - time.monotonic()))
+        stuck = any(not future.done() for future in list(cancelling) + list(abandoned))
+        executor.shutdown(wait=not stuck, cancel_futures=True)
+
+
+def dispatch_rank_plan(client, label, plan, rank_scheduler=None, logger=print, debug=False, verbose=True, cancel_event=None):
+    """Aplica o plano de `label`; planos grandes são divididos em cadeias independentes enviadas em paralelo pelo `rank_scheduler`."""
+    journal = rank_scheduler.journal if rank_scheduler else None
+    chains = [plan]
+    if rank_scheduler is not None and rank_scheduler.max_workers > 1 and len(plan) >= SPLIT_PLAN_MIN_CALLS:
+        chains = split_rank_plan(plan)
+    if len(chains) <= 1:
+        apply_rank_plan(client, plan, logger=logger, debug=debug, verbose=verbose, journal=journal, label=label, cancel_event=cancel_event)
+        return
+    if verbose:
+        logger(f"Plano dividido em {len(chains)} sequência(s) independentes, enviadas em paralelo.")
+    jobs = [(f"{label}#{n}", chain) for n, chain in enumerate(chains, 1)]
+    errors = rank_scheduler.run(jobs, logger=logger, debug=debug, verbose=verbose, cancel_event=cancel_event)
+    if errors:
+        raise next(iter(errors.values()))
+
+
+def format_progress(done, total, issues, elapsed):
+    """Linha de progresso: concluídos/total, issues por segundo e tempo estimado restante."""
+    rate = issues / elapsed if elapsed > 0 else 0.0
+    if done and done < total:
+        remaining = elapsed / done * (total - done)
+        eta = f"{int(remaining // 60)}m{int(remaining % 60):02d}s"
+    else:
+        eta = "--"
+    return f"[{done}/{total}] {rate:.1f} issues/s, ETA {eta}"
+
+
+class RankScheduler:
+    """Executa planos de rank de vários pais em um pool de threads compartilhado.
+
+    Os movimentos de um mesmo plano são enviados em sequência; planos de pais diferentes rodam em paralelo.
+    """
+
+    def __init__(self, client, max_workers=1, journal=None):
+        self.client = client
+        self.max_workers = max(1, max_workers or 1)
+        self.journal = journal
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def run(self, jobs, logger=print, debug=False, verbose=True, cancel_event=None):
+        """Aplica os planos `jobs` (lista de (rótulo, plano) ou (rótulo, plano, lote inicial)) e retorna {rótulo: exceção} dos que falharam."""
+        def run_job(job):
+            label, plan = job[0], job[1]
+            start = job[2] if len(job) > 2 else 0
+            job_log = []
+            try:
+                apply_rank_plan(self.client, plan, logger=make_logger(job_log), debug=debug, verbose=verbose, journal=self.journal, label=label, start=start, cancel_event=cancel_event)
+                return job_log, None
+            except Exception as e:
+                return job_log, e
+
+        if self.max_workers == 1 or len(jobs) <= 1:
+            results = [run_job(job) for job in jobs]
+        else:
+            executor = self._get_executor()
+            results = [future.result() for future in [executor.submit(run_job, job) for job in jobs]]
+
+        errors = {}
+        for job, (job_log, err) in zip(jobs, results):
+            label = job[0]
+            for msg in job_log:
+                logger(msg)
+            if err is not None:
+                errors[label] = err
+        return errors
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+
+def fetch_rank_values(client, keys, rank_field_id, search_workers=DEFAULT_SEARCH_WORKERS):
+    """Busca o valor atual do campo Rank de cada chave (consultas `key in (...)` em lote)."""
+    rank_by_key = {}
+    for chunk in chunked(keys, BULK_JQL_CHUNK_SIZE):
+        jql = f"key in ({', '.join(chunk)})"
+        for issue in search_all_issues(client, jql, fields=[rank_field_id], max_workers=search_workers, lean=True):
+            rank_by_key[issue.key] = getattr(issue.fields, rank_field_id, None)
+    return rank_by_key
+
+
+def resume_rank_journal(client, journal_path, rank_scheduler, logger=print, debug=False, verbose=True, search_workers=DEFAULT_SEARCH_WORKERS, replan=None):
+    """Retoma a aplicação dos planos de rank de um diário a partir do primeiro lote não confirmado de cada rótulo.
+
+    Se os lotes já confirmados de um pai não estiverem mais no lugar, o plano antigo não é reenviado: `replan(pai)`
+    busca as filhas, reordena e grava um novo plano no diário, retornando a exceção se falhar (ou None). Pais sem
+    nenhum lote confirmado também são replanejados com `replan`, já que não há como conferir o plano. Sem `replan`,
+    ou para rótulos que não são issues (sprints), um pai obsoleto é reportado como erro para ser reordenado novamente.
+    Retorna (pais retomados ou replanejados, {rótulo: exceção} dos que falharam).
+    """
+    state = load_journal(journal_path)
+    parents = open_parents(state)
+    if not parents:
+        logger(f"Diário '{journal_path}': todos os planos já foram concluídos. Nada a retomar.")
+        return 0, {}
+
+    keys = journal_keys(state)
+    logger(f"Diário '{journal_path}': {len(parents)} plano(s) pendente(s). Conferindo a ordem atual de {len(keys)} issues no Jira...")
+    rank_by_key = fetch_rank_values(client, keys, get_rank_field_id(client), search_workers=search_workers)
+
+    jobs = []
+    to_replan = []
+    errors = {}
+    for parent, labels in parents.items():
+        valid = plan_still_valid([state[label] for label in labels], rank_by_key)
+        can_replan = replan is not None and ISSUE_KEY_RE.match(parent)
+        if valid is False and not can_replan:
+            logger(f"  - {parent}: lotes já confirmados não estão mais na posição planejada; o plano antigo não será reenviado. Reordene novamente.")
+            errors[parent] = RuntimeError("diário obsoleto; reordene novamente")
+        elif not valid and can_replan:
+            reason = "lotes já confirmados não estão mais na posição planejada" if valid is False else "nenhum lote confirmado"
+            logger(f"  - {parent}: {reason}; buscando as filhas para replanejar.")
+            to_replan.append(parent)
+        else:
+            for label in labels:
+                remaining = pending_batches(state[label])
+                if remaining:
+                    start = remaining[0][0]
+                    logger(f"  - {label}: retomando do lote {start + 1} de {len(state[label]['batches'])}.")
+                    jobs.append((label, state[label]['batches'], start))
+
+    if jobs:
+        errors.update(rank_scheduler.run(jobs, logger=logger, debug=debug, verbose=verbose))
+    journal = rank_scheduler.journal
+    for parent in to_replan:
+        err = replan(parent)
+        if err is not None:
+            errors[parent] = err
+        elif journal is not None:
+            # O novo plano é gravado sob o rótulo do pai; as cadeias do plano antigo deixam de estar pendentes
+            for label in parents[parent]:
+                if label != parent and not state[label]['complete']:
+                    journal.record_replanned(label)
+    return len({label_parent(job[0]) for job in jobs}) + len(to_replan), errors
+
+
+Ref = namedtuple('Ref', 'id name')
+DEFAULT_SEVERITY_ORDER = ['bloqueante', 'crítico', 'critico', 'normal']
+KNOWN_CRITERIA = {'key', 'priority', 'status', 'issuetype', 'summary', 'epic', 'sprint', 'severity'}
+
+_refs = {}
+_refs_lock = threading.Lock()
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _shared_ref(ref_id, name):
+    """Retorna uma única instância de Ref por (id, nome), compartilhada entre todas as issues do processo."""
+    key = (ref_id, name)
+    ref = _refs.get(key)
+    if ref is None:
+        with _refs_lock:
+            ref = _refs.setdefault(key, Ref(_intern(ref_id), _intern(name)))
+    return ref
+
+
+class RankIssue:
+    """Representação compacta de uma issue para ordenação: só os valores normalizados usados no ranking, sem `raw`."""
+    __slots__ = ('key', 'rank', 'status', 'issuetype', 'priority', 'priority_value', 'epic', 'sprint', 'severity', 'severity_index', 'summary', 'has_subtasks', 'extra')
+
+    def __repr__(self):
+        return f"<RankIssue: key='{self.key}'>"
+
+
+def _first_raw_field_containing(raw_fields, term):
+    for k, v in raw_fields.items():
+        if k and term in k.lower():
+            return v
+    return None
+
+
+def make_rank_issue_converter(rank_by_list, rank_field_id=None, epic_field_id=None, sprint_field_id=None, severity_field_id=None, severity_order=None):
+    """Retorna uma função que converte uma issue buscada (Issue ou LeanIssue) em `RankIssue`."""
+    severity_order_lower = [s.lower() for s in severity_order] if severity_order else None
+    extra_criteria = [c for c in rank_by_list if c not in KNOWN_CRITERIA]
+
+    def convert(issue):
+        if isinstance(issue, RankIssue):
+            return issue
+        fields = issue.fields
+        raw_fields = issue.raw.get('fields') or {}
+        record = RankIssue()
+        record.key = _intern(issue.key)
+        record.rank = getattr(fields, rank_field_id, 'N/A') if rank_field_id else 'N/A'
+
+        status = getattr(fields, 'status', None)
+        if status is not None:
+            try:
+                category_id = int(status.statusCategory.id)
+            except Exception:
+                category_id = None
+            record.status = _shared_ref(category_id, getattr(status, 'name', None))
+        else:
+            record.status = None
+
+        issuetype = getattr(fields, 'issuetype', None)
+        record.issuetype = _shared_ref(getattr(issuetype, 'id', None), getattr(issuetype, 'name', None)) if issuetype else None
+
+        priority = getattr(fields, 'priority', None)
+        record.priority = _shared_ref(getattr(priority, 'id', None), getattr(priority, 'name', None)) if priority else None
+        try:
+            record.priority_value = int(priority.id)
+        except Exception:
+            record.priority_value = None
+
+        epic_val = raw_fields.get(epic_field_id) if epic_field_id else None
+        if not epic_val:
+            if hasattr(fields, 'epic'):
+                epic_val = getattr(fields, 'epic')
+            elif hasattr(fields, 'Epic'):
+                epic_val = getattr(fields, 'Epic')
+            else:
+                epic_val = _first_raw_field_containing(raw_fields, 'epic')
+        record.epic = _intern(epic_val)
+
+        record.sprint = None
+        try:
+            sprint_val = raw_fields.get(sprint_field_id) if sprint_field_id else None
+            if not sprint_val:
+                if hasattr(fields, 'sprint'):
+                    sprint_val = getattr(fields, 'sprint')
+                else:
+                    sprint_val = _first_raw_field_containing(raw_fields, 'sprint')
+            if sprint_val:
+                if not isinstance(sprint_val, list):
+                    sprint_val = [sprint_val]
+                sprint_tuples = [parse_sprint_info(item) for item in sprint_val]
+                if sprint_tuples:
+                    start_date, sprint_id = max(sprint_tuples)
+                    record.sprint = (_intern(start_date), sprint_id)
+        except Exception:
+            record.sprint = None
+
+        severity_val = raw_fields.get(severity_field_id) if severity_field_id else None
+        if not severity_val:
+            if hasattr(fields, 'severity'):
+                severity_val = getattr(fields, 'severity')
+            else:
+                severity_val = _first_raw_field_containing(raw_fields, 'severity')
+        record.severity = None
+        record.severity_index = None
+        if severity_val:
+            label = severity_val.value if hasattr(severity_val, 'value') else str(severity_val)
+            record.severity = _intern(label)
+            label_lower = str(label).lower().strip()
+            order = severity_order_lower or DEFAULT_SEVERITY_ORDER
+            record.severity_index = order.index(label_lower) if label_lower in order else len(order)
+
+        record.summary = getattr(fields, 'summary', None)
+        if record.summary is None and hasattr(fields, 'summary'):
+            record.summary = ''
+        record.has_subtasks = bool(getattr(fields, 'subtasks', None))
+        record.extra = {c: _intern(getattr(fields, c, None)) for c in extra_criteria} if extra_criteria else None
+        return record
+
+    return convert
+
+
+def make_rank_value_getter(status_order=None, issuetype_order=None, epic_order=None, epic_as_text=False):
+    """Retorna a função (issue, critério) -> valor de ordenação sobre `RankIssue`.
+
+    Com `epic_as_text=True` (coleções/sprints), o épico é comparado como texto ou pela posição em `epic_order`.
+    """
+    status_order_lower = [s.lower() for s in status_order] if status_order else None
+    issuetype_order_lower = [s.lower() for s in issuetype_order] if issuetype_order else None
+    epic_order_list = epic_order or []
+    category_id_map = {2: 0, 4: 1, 3: 2}
+
+    def get_value_for_criterion(issue, criterion):
+        if criterion == 'key':
+            try:
+                prefix, number = issue.key.rsplit('-', 1)
+                return (prefix, int(number))
+            except (ValueError, TypeError):
+                return (issue.key, 0)
+        if criterion == 'priority':
+            return issue.priority_value
+        if criterion == 'status':
+            status = issue.status
+            if status is None:
+                return None
+            if status_order_lower:
+                if status.name is None:
+                    return None
+                status_name = status.name.lower()
+                return status_order_lower.index(status_name) if status_name in status_order_lower else len(status_order_lower)
+            if status.id is None:
+                return None
+            return category_id_map.get(status.id, 99)
+        if criterion == 'issuetype':
+            if issue.issuetype is None or issue.issuetype.name is None:
+                return None
+            if issuetype_order_lower:
+                issuetype_name = issue.issuetype.name.lower()
+                return issuetype_order_lower.index(issuetype_name) if issuetype_name in issuetype_order_lower else len(issuetype_order_lower)
+            return issue.issuetype.name
+        if criterion == 'summary':
+            if issue.summary is None:
+                return None
+            return issue.summary.strip().lower()
+        if criterion == 'epic':
+            if not issue.epic:
+                return None
+            if not epic_as_text:
+                return issue.epic
+            ev = str(issue.epic)
+            if epic_order_list:
+                return epic_order_list.index(ev) if ev in epic_order_list else len(epic_order_list)
+            return ev
+        if criterion == 'sprint':
+            return issue.sprint
+        if criterion == 'severity':
+            return issue.severity_index
+        return issue.extra.get(criterion) if issue.extra else None
+
+    return get_value_for_criterion
+
+
+def peak_rss_mb():
+    """Pico de memória residente do processo em MB (None se indisponível, ex.: Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss é reportado em KB no Linux e em bytes no macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def format_issue_info(issue, rank_by_list):
+    """Resumo visual (emojis e resumo) de uma `RankIssue`, começando pelos campos usados na ordenação."""
     target_fields = ['issuetype', 'priority', 'severity', 'status', 'summary']
     sorting_fields = [f for f in rank_by_list if f in target_fields]
     non_sorting_fields = [f for f in target_fields if f not in sorting_fields]
@@ -199,126 +900,290 @@ def format_issue_info(issue, rank_by_list, epic_field_id, severity_field_id):
     parts = []
     for f in fields_order:
         if f == 'issuetype':
-            val = getattr(issue.fields, 'issuetype', None)
-            name = val.name if val else None
-            parts.append(get_issuetype_emoji(name))
+            parts.append(get_issuetype_emoji(issue.issuetype.name if issue.issuetype else None))
         elif f == 'priority':
-            val = getattr(issue.fields, 'priority', None)
-            parts.append(get_priority_emoji(val))
+            parts.append(get_priority_emoji(issue.priority))
         elif f == 'severity':
-            severity_val = None
-            if severity_field_id:
-                severity_val = issue.raw.get('fields', {}).get(severity_field_id)
-            if not severity_val:
-                if hasattr(issue.fields, 'severity'):
-                    severity_val = getattr(issue.fields, 'severity')
-                else:
-                    for k, v in (issue.raw.get('fields') or {}).items():
-                        if k and 'severity' in k.lower():
-                            severity_val = v
-                            break
-            parts.append(get_severity_emoji(severity_val))
+            parts.append(get_severity_emoji(issue.severity))
         elif f == 'status':
-            val = getattr(issue.fields, 'status', None)
-            parts.append(get_status_emoji(val))
+            parts.append(get_status_emoji(issue.status))
         elif f == 'summary':
-            val = getattr(issue.fields, 'summary', '')
-            parts.append(val if val else '')
+            parts.append(issue.summary or '')
 
     return " ".join(parts)
 
 
-def rank_child_issues(client, parent_key, rank_by_list, order_list, dry_run=False, debug=False, status_order=None, issuetype_order=None, brief=False, epic_field_id=None, sprint_field_id=None, severity_field_id=None, severity_order=None, batch_size=50, log_buffer=None, rank_subtasks=False):
-    """Busca, ordena e, opcionalmente, reordena as issues filhas de uma issue pai."""
+EPIC_TYPE_NAMES = ['Epic', 'Épico']
+BULK_JQL_CHUNK_SIZE = 100
+
+
+def chunked(items, size):
+    """Divide uma lista em pedaços de até `size` itens."""
+    size = max(1, size)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def build_fields_to_fetch(rank_by_list, rank_field_id=None, epic_field_id=None, sprint_field_id=None, severity_field_id=None, rank_subtasks=False):
+    """Monta a lista de campos a buscar no Jira para ordenar pelos critérios informados."""
+    fields_to_fetch = set(rank_by_list)
+    fields_to_fetch.update(['priority', 'status', 'issuetype', 'summary'])
+    if rank_field_id:
+        fields_to_fetch.add(rank_field_id)
+    if severity_field_id:
+        fields_to_fetch.add(severity_field_id)
+    if rank_subtasks:
+        fields_to_fetch.add('subtasks')
+    # Se 'epic' for critério, troque pelo ID real do campo (quando disponível)
+    if 'epic' in fields_to_fetch and epic_field_id:
+        fields_to_fetch.discard('epic')
+        fields_to_fetch.add(epic_field_id)
+    # Se 'sprint' for critério, troque pelo ID real do campo (quando disponível)
+    if 'sprint' in fields_to_fetch and sprint_field_id:
+        fields_to_fetch.discard('sprint')
+        fields_to_fetch.add(sprint_field_id)
+    # Se 'severity' for critério, troque pelo ID real do campo (quando disponível)
+    if 'severity' in fields_to_fetch:
+        fields_to_fetch.discard('severity')
+        if severity_field_id:
+            fields_to_fetch.add(severity_field_id)
+    return list(fields_to_fetch)
+
+
+def prefetch_children(client, parent_keys, fields, link='epic', epic_field_id=None, chunk_size=BULK_JQL_CHUNK_SIZE, search_workers=DEFAULT_SEARCH_WORKERS):
+    """Busca as filhas de vários pais com poucas consultas paginadas e as agrupa por pai.
+
+    `link='epic'` usa `'Epic Link' in (...)` (exige `epic_field_id` para agrupar); `link='parent'` usa
+    `parent in (...)`. Cada grupo preserva a ordem `ORDER BY Rank ASC` da consulta.
+    """
+    if link == 'epic' and not epic_field_id:
+        raise ValueError("O ID do campo 'Epic Link' é necessário para agrupar as filhas por épico.")
+    fields = list(fields)
+    if link == 'epic':
+        if epic_field_id not in fields:
+            fields.append(epic_field_id)
+        clause = "'Epic Link'"
+    else:
+        if 'parent' not in fields:
+            fields.append('parent')
+        clause = "parent"
+
+    groups = {key: [] for key in parent_keys}
+    for chunk in chunked(list(parent_keys), chunk_size):
+        keys_jql = ", ".join(f"'{key}'" for key in chunk)
+        jql = f"{clause} in ({keys_jql}) ORDER BY Rank ASC"
+        for issue in search_all_issues(client, jql, fields=fields, max_workers=search_workers, lean=True):
+            raw_fields = issue.raw.get('fields') or {}
+            if link == 'epic':
+                parent = raw_fields.get(epic_field_id)
+            else:
+                parent = (raw_fields.get('parent') or {}).get('key')
+            if parent in groups:
+                groups[parent].append(issue)
+    return groups
+
+
+DEFAULT_EPIC_SIZES_FILE = os.path.join(os.path.dirname(DEFAULT_FIELDS_CACHE_FILE), 'epic_sizes.json')
+
+
+def load_epic_sizes(cache_file, server_url):
+    """Número de filhas por épico observado na execução anterior para o servidor informado."""
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            sizes = json.load(f).get(server_url.rstrip('/'), {})
+        return sizes if isinstance(sizes, dict) else {}
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+
+def save_epic_sizes(cache_file, server_url, sizes):
+    """Grava (de forma atômica) os tamanhos observados, mesclando com os já existentes."""
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            data = {}
+    except (OSError, ValueError):
+        data = {}
+    key = server_url.rstrip('/')
+    merged = data.get(key) if isinstance(data.get(key), dict) else {}
+    merged.update(sizes)
+    data[key] = merged
+    try:
+        os.makedirs(os.path.dirname(cache_file) or '.', exist_ok=True)
+        tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_file, cache_file)
+    except OSError as e:
+        print(f"Aviso: Não foi possível gravar o cache de tamanhos de épicos em '{cache_file}': {e}")
+
+
+def estimate_epic_sizes(client, epic_keys, cached=None, search_workers=DEFAULT_SEARCH_WORKERS):
+    """Estimativa do número de filhas por épico: usa `cached` e conta os demais com buscas `maxResults=0` em paralelo."""
+    sizes = {key: cached[key] for key in epic_keys if cached and key in cached}
+    missing = [key for key in epic_keys if key not in sizes]
+
+    def count(key):
+        try:
+            return key, count_issues(client, f"'Epic Link' = '{key}'")
+        except Exception:
+            return key, None
+
+    if missing:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, search_workers or 1)) as executor:
+            for key, total in executor.map(count, missing):
+                if total is not None:
+                    sizes[key] = total
+    return sizes
+
+
+def find_dirty_epics(client, project_id, epic_field_id, last_run, margin_minutes=5, include_subtasks=False, search_workers=DEFAULT_SEARCH_WORKERS):
+    """Épicos do projeto com alguma issue (o próprio épico, filhas ou, opcionalmente, subtarefas) alterada desde `last_run`."""
+    jql = f'project = "{project_id}" AND {updated_since_jql(last_run, margin_minutes)}'
+    changed = search_all_issues(client, jql, fields=[epic_field_id, 'issuetype', 'parent'], max_workers=search_workers, lean=True)
+    dirty = set()
+    subtask_parents = set()
+    for issue in changed:
+        raw_fields = issue.raw.get('fields') or {}
+        issuetype = raw_fields.get('issuetype') or {}
+        if issuetype.get('name') in EPIC_TYPE_NAMES:
+            dirty.add(issue.key)
+        elif raw_fields.get(epic_field_id):
+            dirty.add(raw_fields[epic_field_id])
+        elif include_subtasks and issuetype.get('subtask') and raw_fields.get('parent'):
+            subtask_parents.add(raw_fields['parent'].get('key'))
+    for chunk in chunked(sorted(k for k in subtask_parents if k), BULK_JQL_CHUNK_SIZE):
+        for parent in search_all_issues(client, f"key in ({', '.join(chunk)})", fields=[epic_field_id], max_workers=search_workers, lean=True):
+            epic_key = (parent.raw.get('fields') or {}).get(epic_field_id)
+            if epic_key:
+                dirty.add(epic_key)
+    return dirty
+
+
+def order_longest_first(epics, sizes):
+    """Ordena os épicos do maior para o menor (LPT); épicos sem estimativa vão ao fim, na ordem original."""
+    return sorted(epics, key=lambda epic: -(sizes.get(epic.key) or 0))
+
+
+def rank_subtasks_in_bulk(client, parents, rank_by_list, order_list, dry_run=False, debug=False, status_order=None, issuetype_order=None, brief=False, epic_field_id=None, sprint_field_id=None, severity_field_id=None, severity_order=None, batch_size=50, log_buffer=None, rank_scheduler=None, search_workers=DEFAULT_SEARCH_WORKERS):
+    """Ordena as subtarefas de várias issues já buscadas com poucas consultas `parent in (...)`.
+
+    Cada grupo é ordenado localmente e os movimentos de todos os grupos são enviados pelo `rank_scheduler`.
+    """
     logger = make_logger(log_buffer)
-    if not rank_by_list:
-        logger(f"Erro: parâmetro 'rank_by_list' vazio para {parent_key}. Pulando.")
+    verbose = not brief
+    parents_with_subtasks = [issue for issue in parents if issue.has_subtasks]
+    if not parents_with_subtasks:
         return 0, 0
-    if isinstance(rank_by_list, str):
-        rank_by_list = [s.strip() for s in rank_by_list.split(',')]
-    if not order_list:
-        order_list = ['asc']
 
+    parent_keys = [issue.key for issue in parents_with_subtasks]
     try:
-        verbose = not brief
+        fields_to_fetch = build_fields_to_fetch(rank_by_list, get_rank_field_id(client), epic_field_id, sprint_field_id, severity_field_id)
         if verbose:
-            logger(f"\n--- Processando issue pai: {parent_key} ---")
-        parent_issue = client.issue(parent_key, fields="issuetype")
-        if verbose:
-            logger(f"Buscando a issue pai '{parent_key}' para determinar o tipo...")
-            logger(f"Issue pai encontrada. Tipo: {parent_issue.fields.issuetype.name}")
+            logger(f"\n[Subtarefas] Buscando as subtarefas de {len(parent_keys)} issues em {len(chunked(parent_keys, BULK_JQL_CHUNK_SIZE))} consulta(s)...")
+        subtasks_by_parent = prefetch_children(client, parent_keys, fields_to_fetch, link='parent', search_workers=search_workers)
     except Exception as e:
         check_and_handle_401(e)
-        logger(f"Erro: Não foi possível encontrar a issue pai '{parent_key}'. Pulando.")
+        logger(f"Erro ao buscar as subtarefas em lote: {e}")
         if debug:
             logger(traceback.format_exc())
         return 0, 0
 
-    rank_field_id = get_rank_field_id(client)
+    pending_moves = []
+    total_analyzed = 0
+    total_moved = 0
+    for parent in parents_with_subtasks:
+        if verbose:
+            logger(f"\n[Subtarefas] Ordenando subtarefas de {parent.key}...")
+        sub_analyzed, sub_moved = rank_child_issues(
+            client, parent.key, rank_by_list, order_list,
+            dry_run=dry_run, debug=debug, status_order=status_order,
+            issuetype_order=issuetype_order, brief=brief,
+            epic_field_id=epic_field_id, sprint_field_id=sprint_field_id,
+            severity_field_id=severity_field_id, severity_order=severity_order,
+            batch_size=batch_size, log_buffer=log_buffer, rank_subtasks=False,
+            child_issues=subtasks_by_parent.get(parent.key, []),
+            parent_type_name=parent.issuetype.name if parent.issuetype else None,
+            pending_moves=pending_moves,
+        )
+        total_analyzed += sub_analyzed
+        total_moved += sub_moved
+
+    if pending_moves:
+        scheduler = rank_scheduler or RankScheduler(client)
+        calls = sum(len(plan) for _, plan in pending_moves)
+        logger(f"\n[Subtarefas] Aplicando {calls} chamada(s) de rank para {len(pending_moves)} issues...")
+        errors = scheduler.run(pending_moves, logger=logger, debug=debug, verbose=verbose)
+        for parent_key, err in errors.items():
+            check_and_handle_401(err)
+            logger(f"\nOcorreu um erro durante a reordenação das subtarefas de {parent_key} via API do Jira.")
+            logger("É possível que a ordenação tenha sido parcialmente aplicada.")
+            logger(f"Erro: {err}")
+        if not errors:
+            logger("\n[Subtarefas] Reordenação concluída com sucesso!")
 
-    # se não fornecido, tentar descobrir os campos
-    if not epic_field_id or not sprint_field_id or not severity_field_id:
+    return total_analyzed, total_moved
+
+
+def rank_child_issues(client, parent_key, rank_by_list, order_list, dry_run=False, debug=False, status_order=None, issuetype_order=None, brief=False, epic_field_id=None, sprint_field_id=None, severity_field_id=None, severity_order=None, batch_size=50, log_buffer=None, rank_subtasks=False, child_issues=None, parent_type_name=None, pending_moves=None, rank_scheduler=None, cancel_event=None, search_workers=DEFAULT_SEARCH_WORKERS):
+    """Busca, ordena e, opcionalmente, reordena as issues filhas de uma issue pai.
+
+    Se `child_issues` (já ordenadas por Rank) e `parent_type_name` forem informados, as buscas no Jira são puladas.
+    Se `pending_moves` for uma lista, o plano de rank é acrescentado a ela em vez de aplicado imediatamente.
+    Se `cancel_event` for sinalizado, nenhum lote novo é enviado e as subtarefas não são processadas.
+    """
+    logger = make_logger(log_buffer)
+    if not rank_by_list:
+        logger(f"Erro: parâmetro 'rank_by_list' vazio para {parent_key}. Pulando.")
+        return 0, 0
+    if isinstance(rank_by_list, str):
+        rank_by_list = [s.strip() for s in rank_by_list.split(',')]
+    if not order_list:
+        order_list = ['asc']
+
+    verbose = not brief
+    if verbose:
+        logger(f"\n--- Processando issue pai: {parent_key} ---")
+    if parent_type_name is None:
         try:
-            all_fields = client.fields()
-            if not epic_field_id:
-                for field in all_fields:
-                    if field.get('name') == 'Epic Link':
-                        epic_field_id = field.get('id')
-                        break
-            if not sprint_field_id:
-                for field in all_fields:
-                    schema = field.get('schema', {})
-                    if (field.get('name') == 'Sprint' or 
-                        ('custom' in schema and 'sprint' in schema.get('custom', '').lower())):
-                        sprint_field_id = field.get('id')
-                        break
-            if not severity_field_id:
-                for field in all_fields:
-                    if (field.get('name') == 'Gravidade' or 
-                        field.get('name') == 'Severity'):
-                        severity_field_id = field.get('id')
-                        break
+            parent_issue = client.issue(parent_key, fields="issuetype")
+            parent_type_name = parent_issue.fields.issuetype.name
+            if verbose:
+                logger(f"Buscando a issue pai '{parent_key}' para determinar o tipo...")
+                logger(f"Issue pai encontrada. Tipo: {parent_type_name}")
         except Exception as e:
             check_and_handle_401(e)
+            logger(f"Erro: Não foi possível encontrar a issue pai '{parent_key}'. Pulando.")
+            if debug:
+                logger(traceback.format_exc())
+            return 0, 0
 
-    if parent_issue.fields.issuetype.name in ['Epic', 'Épico']:
-        jql = f"'Epic Link' = '{parent_key}' ORDER BY Rank ASC"
-    else:
-        jql = f"parent = '{parent_key}' ORDER BY Rank ASC"
-
-    if verbose:
-        print(f"Buscando issues filhas com JQL: {jql}")
+    rank_field_id = get_rank_field_id(client)
 
+    # se não fornecido, tentar descobrir os campos
     try:
-        fields_to_fetch = set(rank_by_list)
-        fields_to_fetch.update(['priority', 'status', 'issuetype', 'summary'])
-        if rank_field_id:
-            fields_to_fetch.add(rank_field_id)
-        if severity_field_id:
-            fields_to_fetch.add(severity_field_id)
-        if rank_subtasks:
-            fields_to_fetch.add('subtasks')
-        # Se 'epic' for critério, troque pelo ID real do campo (quando disponível)
-        if 'epic' in fields_to_fetch and epic_field_id:
-            fields_to_fetch.discard('epic')
-            fields_to_fetch.add(epic_field_id)
-        # Se 'sprint' for critério, troque pelo ID real do campo (quando disponível)
-        if 'sprint' in fields_to_fetch and sprint_field_id:
-            fields_to_fetch.discard('sprint')
-            fields_to_fetch.add(sprint_field_id)
-        # Se 'severity' for critério, troque pelo ID real do campo (quando disponível)
-        if 'severity' in fields_to_fetch:
-            fields_to_fetch.discard('severity')
-            if severity_field_id:
-                fields_to_fetch.add(severity_field_id)
-
-        child_issues = client.search_issues(jql, maxResults=False, fields=list(fields_to_fetch))
+        epic_field_id, sprint_field_id, severity_field_id = resolve_field_ids(client, epic_field_id, sprint_field_id, severity_field_id)
     except Exception as e:
         check_and_handle_401(e)
-        logger(f"Erro ao executar a busca por issues filhas para '{parent_key}': {e}")
-        if debug:
-            logger(traceback.format_exc())
-        return 0, 0
+
+    if child_issues is None:
+        if parent_type_name in EPIC_TYPE_NAMES:
+            jql = f"'Epic Link' = '{parent_key}' ORDER BY Rank ASC"
+        else:
+            jql = f"parent = '{parent_key}' ORDER BY Rank ASC"
+
+        if verbose:
+            print(f"Buscando issues filhas com JQL: {jql}")
+
+        try:
+            fields_to_fetch = build_fields_to_fetch(rank_by_list, rank_field_id, epic_field_id, sprint_field_id, severity_field_id, rank_subtasks)
+            child_issues = search_all_issues(client, jql, fields=fields_to_fetch, max_workers=search_workers, lean=True)
+        except Exception as e:
+            check_and_handle_401(e)
+            logger(f"Erro ao executar a busca por issues filhas para '{parent_key}': {e}")
+            if debug:
+                logger(traceback.format_exc())
+            return 0, 0
 
     if not child_issues:
         if brief:
@@ -327,6 +1192,10 @@ def rank_child_issues(client, parent_key, rank_by_list, order_list, dry_run=Fals
             logger("Nenhuma issue filha encontrada para reordenar.")
         return 0, 0
 
+    # Converte para registros compactos e descarta o JSON bruto das issues buscadas
+    convert = make_rank_issue_converter(rank_by_list, rank_field_id, epic_field_id, sprint_field_id, severity_field_id, severity_order)
+    child_issues = [convert(issue) for issue in child_issues]
+
     if verbose:
         logger(f"Encontradas {len(child_issues)} issues filhas.")
 
@@ -338,182 +1207,10 @@ def rank_child_issues(client, parent_key, rank_by_list, order_list, dry_run=Fals
         print(f"Erro: O número de critérios de ordenação ({len(rank_by_list)}) não corresponde ao número de direções ({len(order_list)}).")
         return len(child_issues), 0
 
-    status_order_lower = [s.lower() for s in status_order] if status_order else None
-    issuetype_order_lower = [s.lower() for s in issuetype_order] if issuetype_order else None
-    severity_order_lower = [s.lower() for s in severity_order] if severity_order else None
-
-    def get_value_for_criterion(issue, criterion):
-        if criterion == 'key':
-            try:
-                prefix, number = issue.key.rsplit('-', 1)
-                return (prefix, int(number))
-            except (ValueError, TypeError):
-                return (issue.key, 0)
-        if criterion == 'priority':
-            try:
-                return int(issue.fields.priority.id)
-            except Exception:
-                return None
-        if criterion == 'status':
-            try:
-                if status_order_lower:
-                    status_name = issue.fields.status.name.lower()
-                    try:
-                        return status_order_lower.index(status_name)
-                    except ValueError:
-                        return len(status_order_lower)
-                category_id_map = {2: 0, 4: 1, 3: 2}
-                category_id = int(issue.fields.status.statusCategory.id)
-                return category_id_map.get(category_id, 99)
-            except Exception:
-                return None
-        if criterion == 'issuetype':
-            try:
-                if issuetype_order_lower:
-                    issuetype_name = issue.fields.issuetype.name.lower()
-                    try:
-                        return issuetype_order_lower.index(issuetype_name)
-                    except ValueError:
-                        return len(issuetype_order_lower)
-                return issue.fields.issuetype.name
-            except Exception:
-                return None
-        if criterion == 'summary':
-            try:
-                return (issue.fields.summary or '').strip().lower()
-            except Exception:
-                return None
-
-        if criterion == 'epic':
-            try:
-                # Tenta vários acessos para obter a chave do épico
-                if epic_field_id:
-                    # campo customizado retorna a chave do épico em muitas instâncias
-                    val = issue.raw.get('fields', {}).get(epic_field_id)
-                    if val:
-                        return val
-                # fallback para 'epic' ou 'Epic Link' direto nos fields
-                if hasattr(issue.fields, 'epic'):
-                    return getattr(issue.fields, 'epic')
-                if hasattr(issue.fields, 'Epic'):
-                    return getattr(issue.fields, 'Epic')
-                # última tentativa: procurar por qualquer campo que contenha 'epic' no nome
-                for k, v in (issue.raw.get('fields') or {}).items():
-                    if k and 'epic' in k.lower():
-                        return v
-            except Exception:
-                return None
-
-        if criterion == 'sprint':
-            try:
-                sprint_val = None
-                if sprint_field_id:
-                    sprint_val = issue.raw.get('fields', {}).get(sprint_field_id)
-                if not sprint_val:
-                    if hasattr(issue.fields, 'sprint'):
-                        sprint_val = getattr(issue.fields, 'sprint')
-                    else:
-                        for k, v in (issue.raw.get('fields') or {}).items():
-                            if k and 'sprint' in k.lower():
-                                sprint_val = v
-                                break
-                if sprint_val:
-                    if not isinstance(sprint_val, list):
-                        sprint_val = [sprint_val]
-                    sprint_tuples = []
-                    for item in sprint_val:
-                        sprint_tuples.append(parse_sprint_info(item))
-                    if sprint_tuples:
-                        return max(sprint_tuples)
-                return None
-            except Exception:
-                return None
-
-        if criterion == 'severity':
-            try:
-                severity_val = None
-                if severity_field_id:
-                    severity_val = issue.raw.get('fields', {}).get(severity_field_id)
-                if not severity_val:
-                    if hasattr(issue.fields, 'severity'):
-                        severity_val = getattr(issue.fields, 'severity')
-                    else:
-                        for k, v in (issue.raw.get('fields') or {}).items():
-                            if k and 'severity' in k.lower():
-                                severity_val = v
-                                break
-                if severity_val:
-                    val_str = severity_val.value if hasattr(severity_val, 'value') else str(severity_val)
-                    val_str_lower = val_str.lower().strip()
-                    if severity_order_lower:
-                        try:
-                            return severity_order_lower.index(val_str_lower)
-                        except ValueError:
-                            return len(severity_order_lower)
-                    default_order = ['bloqueante', 'crítico', 'critico', 'normal']
-                    try:
-                        return default_order.index(val_str_lower)
-                    except ValueError:
-                        return len(default_order)
-                return None
-            except Exception:
-                return None
-
-        return getattr(issue.fields, criterion, None)
-
-    def compare_issues(issue1, issue2):
-        if debug:
-            logger(f"\n--- Comparando {issue1.key} e {issue2.key} ---")
-        for i, criterion in enumerate(rank_by_list):
-            val1 = get_value_for_criterion(issue1, criterion)
-            val2 = get_value_for_criterion(issue2, criterion)
-            order = order_list[i]
-
-            if debug:
-                logger(f"  Critério '{criterion}' (ordem: {order}): val1={val1}, val2={val2}")
-
-            if val1 is None and val2 is not None:
-                return 1
-            if val1 is not None and val2 is None:
-                return -1
-            if val1 is None and val2 is None:
-                if debug:
-                    logger("  > Ambos nulos. Empate.")
-                continue
-
-            try:
-                if val1 < val2:
-                    result = -1 if order == 'asc' else 1
-                    if debug:
-                        logger(f"  > {val1} < {val2}. Resultado: {result}")
-                    return result
-                if val1 > val2:
-                    result = 1 if order == 'asc' else -1
-                    if debug:
-                        logger(f"  > {val1} > {val2}. Resultado: {result}")
-                    return result
-            except TypeError:
-                s1 = str(val1)
-                s2 = str(val2)
-                if s1 < s2:
-                    result = -1 if order == 'asc' else 1
-                    if debug:
-                        logger(f"  > {s1} < {s2}. Resultado: {result}")
-                    return result
-                if s1 > s2:
-                    result = 1 if order == 'asc' else -1
-                    if debug:
-                        logger(f"  > {s1} > {s2}. Resultado: {result}")
-                    return result
-
-            if debug:
-                logger("  > Iguais. Empate, próximo critério.")
-        if debug:
-            logger("--- Fim da Comparação: Iguais ---")
-        return 0
+    get_value_for_criterion = make_rank_value_getter(status_order, issuetype_order)
 
     try:
-        sorted_child_issues = sorted(child_issues, key=cmp_to_key(compare_issues))
+        sorted_child_issues = sort_issues(child_issues, rank_by_list, order_list, get_value_for_criterion, debug=debug, logger=logger)
         if verbose:
             logger(f"\nIssues ordenadas com sucesso por: {', '.join(rank_by_list)}.")
     except Exception as e:
@@ -536,49 +1233,35 @@ def rank_child_issues(client, parent_key, rank_by_list, order_list, dry_run=Fals
     needs_reordering = (moved > 0)
 
     if needs_reordering:
+        rank_plan = plan_rank_moves(current_order_keys, proposed_order_keys, batch_size)
         if brief and dry_run:
             if not rank_subtasks:
-                logger(f"{parent_key}: {len(sorted_child_issues)} filhas ordenadas.")
+                logger(f"{parent_key}: {len(sorted_child_issues)} filhas ordenadas ({len(rank_plan)} chamada(s) de rank previstas).")
                 return len(sorted_child_issues), moved
 
         # Impressão detalhada (não-brief)
         if not brief:
             logger("\n--- Ordem Proposta (Final) ---")
-            for issue in sorted_child_issues:
-                rank_value = getattr(issue.fields, rank_field_id, 'N/A') if rank_field_id else 'N/A'
-                issue_info = format_issue_info(issue, rank_by_list, epic_field_id, severity_field_id)
-                logger(f"  - {issue.key} | {issue_info} (Rank atual: {rank_value})")
+            with phase('render'):
+                for issue in sorted_child_issues:
+                    issue_info = format_issue_info(issue, rank_by_list)
+                    logger(f"  - {issue.key} | {issue_info} (Rank atual: {issue.rank})")
             logger("----------------------------")
 
         if dry_run:
             if verbose and not brief:
+                logger(describe_rank_plan(rank_plan, len(sorted_child_issues), batch_size))
                 logger("\nMODO DRY-RUN ATIVADO. Nenhuma alteração será aplicada no Jira.")
+        elif pending_moves is not None:
+            pending_moves.append((parent_key, rank_plan))
+            if verbose:
+                logger(describe_rank_plan(rank_plan, len(sorted_child_issues), batch_size))
         else:
             logger("\nIniciando o processo de reordenação no Jira (isso pode levar um tempo)...")
+            if verbose:
+                logger(describe_rank_plan(rank_plan, len(sorted_child_issues), batch_size))
             try:
-                server_url = client._options['server'].rstrip('/')
-                rank_url = f"{server_url}/rest/agile/1.0/issue/rank"
-                batch_size = max(1, batch_size)
-                total_issues = len(sorted_child_issues)
-                i = 1
-                ref_issue_key = sorted_child_issues[0].key
-                while i < total_issues:
-                    batch_issues = sorted_child_issues[i:i + batch_size]
-                    batch_keys = [issue.key for issue in batch_issues]
-                    if len(batch_keys) == 1:
-                        logger(f"  - Movendo '{batch_keys[0]}' para depois de '{ref_issue_key}'...")
-                    else:
-                        logger(f"  - Movendo lote de {len(batch_keys)} issues ({', '.join(batch_keys)}) para depois de '{ref_issue_key}'...")
-                    payload = {
-                        "issues": batch_keys,
-                        "rankAfterIssue": ref_issue_key
-                    }
-                    response = client._session.put(rank_url, json=payload)
-                    response.raise_for_status()
-                    if debug or verbose:
-                        logger(f"    -> API response: {response.status_code} {response.reason}")
-                    ref_issue_key = batch_keys[-1]
-                    i += batch_size
+                dispatch_rank_plan(client, parent_key, rank_plan, rank_scheduler, logger=logger, debug=debug, verbose=verbose, cancel_event=cancel_event)
                 logger("\nReordenação concluída com sucesso!")
             except Exception as e:
                 check_and_handle_401(e)
@@ -594,28 +1277,25 @@ def rank_child_issues(client, parent_key, rank_by_list, order_list, dry_run=Fals
     total_analyzed = len(sorted_child_issues)
     total_moved = moved
 
-    if parent_issue.fields.issuetype.name in ['Epic', 'Épico'] and rank_subtasks:
-        for child in sorted_child_issues:
-            if hasattr(child.fields, 'subtasks') and child.fields.subtasks:
-                if verbose:
-                    logger(f"\n[Subtarefas] Ordenando subtarefas de {child.key}...")
-                sub_analyzed, sub_moved = rank_child_issues(
-                    client, child.key, rank_by_list, order_list,
-                    dry_run=dry_run, debug=debug, status_order=status_order,
-                    issuetype_order=issuetype_order, brief=brief,
-                    epic_field_id=epic_field_id, sprint_field_id=sprint_field_id,
-                    severity_field_id=severity_field_id, severity_order=severity_order,
-                    batch_size=batch_size, log_buffer=log_buffer, rank_subtasks=False
-                )
-                total_analyzed += sub_analyzed
-                total_moved += sub_moved
+    if parent_type_name in EPIC_TYPE_NAMES and rank_subtasks and not (cancel_event is not None and cancel_event.is_set()):
+        sub_analyzed, sub_moved = rank_subtasks_in_bulk(
+            client, sorted_child_issues, rank_by_list, order_list,
+            dry_run=dry_run, debug=debug, status_order=status_order,
+            issuetype_order=issuetype_order, brief=brief,
+            epic_field_id=epic_field_id, sprint_field_id=sprint_field_id,
+            severity_field_id=severity_field_id, severity_order=severity_order,
+            batch_size=batch_size, log_buffer=log_buffer, rank_scheduler=rank_scheduler,
+            search_workers=search_workers,
+        )
+        total_analyzed += sub_analyzed
+        total_moved += sub_moved
 
     if brief and (needs_reordering or rank_subtasks):
         logger(f"{parent_key}: {total_analyzed} filhas ordenadas.")
     return total_analyzed, total_moved
 
 
-def rank_issues_collection(client, label, issues, rank_by_list, order_list, dry_run=False, debug=False, status_order=None, issuetype_order=None, epic_order=None, brief=False, epic_field_id=None, sprint_field_id=None, severity_field_id=None, severity_order=None, batch_size=50, log_buffer=None, rank_subtasks=False):
+def rank_issues_collection(client, label, issues, rank_by_list, order_list, dry_run=False, debug=False, status_order=None, issuetype_order=None, epic_order=None, brief=False, epic_field_id=None, sprint_field_id=None, severity_field_id=None, severity_order=None, batch_size=50, log_buffer=None, rank_subtasks=False, rank_scheduler=None, search_workers=DEFAULT_SEARCH_WORKERS):
     """Ordena e opcionalmente aplica ordenação para uma coleção arbitrária de issues."""
     logger = make_logger(log_buffer)
     if not rank_by_list:
@@ -633,29 +1313,13 @@ def rank_issues_collection(client, label, issues, rank_by_list, order_list, dry_
     rank_field_id = get_rank_field_id(client)
 
     # se não fornecido, tentar descobrir os campos
-    if not epic_field_id or not sprint_field_id or not severity_field_id:
-        try:
-            all_fields = client.fields()
-            if not epic_field_id:
-                for field in all_fields:
-                    if field.get('name') == 'Epic Link':
-                        epic_field_id = field.get('id')
-                        break
-            if not sprint_field_id:
-                for field in all_fields:
-                    schema = field.get('schema', {})
-                    if (field.get('name') == 'Sprint' or 
-                        ('custom' in schema and 'sprint' in schema.get('custom', '').lower())):
-                        sprint_field_id = field.get('id')
-                        break
-            if not severity_field_id:
-                for field in all_fields:
-                    if (field.get('name') == 'Gravidade' or 
-                        field.get('name') == 'Severity'):
-                        severity_field_id = field.get('id')
-                        break
-        except Exception as e:
-            check_and_handle_401(e)
+    try:
+        epic_field_id, sprint_field_id, severity_field_id = resolve_field_ids(client, epic_field_id, sprint_field_id, severity_field_id)
+    except Exception as e:
+        check_and_handle_401(e)
+
+    convert = make_rank_issue_converter(rank_by_list, rank_field_id, epic_field_id, sprint_field_id, severity_field_id, severity_order)
+    issues = [convert(issue) for issue in issues]
 
     current_order_keys = [issue.key for issue in issues]
 
@@ -665,184 +1329,10 @@ def rank_issues_collection(client, label, issues, rank_by_list, order_list, dry_
         print(f"Erro: O número de critérios de ordenação ({len(rank_by_list)}) não corresponde ao número de direções ({len(order_list)}).")
         return len(issues), 0
 
-    status_order_lower = [s.lower() for s in status_order] if status_order else None
-    issuetype_order_lower = [s.lower() for s in issuetype_order] if issuetype_order else None
-    severity_order_lower = [s.lower() for s in severity_order] if severity_order else None
-    epic_order_list = epic_order or []
-
-    def get_value_for_criterion(issue, criterion):
-        if criterion == 'key':
-            try:
-                prefix, number = issue.key.rsplit('-', 1)
-                return (prefix, int(number))
-            except (ValueError, TypeError):
-                return (issue.key, 0)
-        if criterion == 'priority':
-            try:
-                return int(issue.fields.priority.id)
-            except Exception:
-                return None
-        if criterion == 'status':
-            try:
-                if status_order_lower:
-                    status_name = issue.fields.status.name.lower()
-                    try:
-                        return status_order_lower.index(status_name)
-                    except ValueError:
-                        return len(status_order_lower)
-                category_id_map = {2: 0, 4: 1, 3: 2}
-                category_id = int(issue.fields.status.statusCategory.id)
-                return category_id_map.get(category_id, 99)
-            except Exception:
-                return None
-        if criterion == 'issuetype':
-            try:
-                if issuetype_order_lower:
-                    issuetype_name = issue.fields.issuetype.name.lower()
-                    try:
-                        return issuetype_order_lower.index(issuetype_name)
-                    except ValueError:
-                        return len(issuetype_order_lower)
-                return issue.fields.issuetype.name
-            except Exception:
-                return None
-        if criterion == 'summary':
-            try:
-                return (issue.fields.summary or '').strip().lower()
-            except Exception:
-                return None
-
-        if criterion == 'epic':
-            try:
-                epic_val = None
-                if epic_field_id:
-                    epic_val = issue.raw.get('fields', {}).get(epic_field_id)
-                if not epic_val:
-                    # tentar atributos padrões
-                    if hasattr(issue.fields, 'epic'):
-                        epic_val = getattr(issue.fields, 'epic')
-                if epic_val:
-                    ev = str(epic_val)
-                    if epic_order_list:
-                        try:
-                            return epic_order_list.index(ev)
-                        except ValueError:
-                            return len(epic_order_list)
-                    return ev
-                return None
-            except Exception:
-                return None
-
-        if criterion == 'sprint':
-            try:
-                sprint_val = None
-                if sprint_field_id:
-                    sprint_val = issue.raw.get('fields', {}).get(sprint_field_id)
-                if not sprint_val:
-                    if hasattr(issue.fields, 'sprint'):
-                        sprint_val = getattr(issue.fields, 'sprint')
-                    else:
-                        for k, v in (issue.raw.get('fields') or {}).items():
-                            if k and 'sprint' in k.lower():
-                                sprint_val = v
-                                break
-                if sprint_val:
-                    if not isinstance(sprint_val, list):
-                        sprint_val = [sprint_val]
-                    sprint_tuples = []
-                    for item in sprint_val:
-                        sprint_tuples.append(parse_sprint_info(item))
-                    if sprint_tuples:
-                        return max(sprint_tuples)
-                return None
-            except Exception:
-                return None
-
-        if criterion == 'severity':
-            try:
-                severity_val = None
-                if severity_field_id:
-                    severity_val = issue.raw.get('fields', {}).get(severity_field_id)
-                if not severity_val:
-                    if hasattr(issue.fields, 'severity'):
-                        severity_val = getattr(issue.fields, 'severity')
-                    else:
-                        for k, v in (issue.raw.get('fields') or {}).items():
-                            if k and 'severity' in k.lower():
-                                severity_val = v
-                                break
-                if severity_val:
-                    val_str = severity_val.value if hasattr(severity_val, 'value') else str(severity_val)
-                    val_str_lower = val_str.lower().strip()
-                    if severity_order_lower:
-                        try:
-                            return severity_order_lower.index(val_str_lower)
-                        except ValueError:
-                            return len(severity_order_lower)
-                    default_order = ['bloqueante', 'crítico', 'critico', 'normal']
-                    try:
-                        return default_order.index(val_str_lower)
-                    except ValueError:
-                        return len(default_order)
-                return None
-            except Exception:
-                return None
-
-        return getattr(issue.fields, criterion, None)
-
-    def compare_issues(issue1, issue2):
-        if debug:
-            logger(f"\n--- Comparando {issue1.key} e {issue2.key} ---")
-        for i, criterion in enumerate(rank_by_list):
-            val1 = get_value_for_criterion(issue1, criterion)
-            val2 = get_value_for_criterion(issue2, criterion)
-            order = order_list[i]
-
-            if debug:
-                logger(f"  Critério '{criterion}' (ordem: {order}): val1={val1}, val2={val2}")
-
-            if val1 is None and val2 is not None:
-                return 1
-            if val1 is not None and val2 is None:
-                return -1
-            if val1 is None and val2 is None:
-                if debug:
-                    logger("  > Ambos nulos. Empate.")
-                continue
-
-            try:
-                if val1 < val2:
-                    result = -1 if order == 'asc' else 1
-                    if debug:
-                        logger(f"  > {val1} < {val2}. Resultado: {result}")
-                    return result
-                if val1 > val2:
-                    result = 1 if order == 'asc' else -1
-                    if debug:
-                        logger(f"  > {val1} > {val2}. Resultado: {result}")
-                    return result
-            except TypeError:
-                s1 = str(val1)
-                s2 = str(val2)
-                if s1 < s2:
-                    result = -1 if order == 'asc' else 1
-                    if debug:
-                        logger(f"  > {s1} < {s2}. Resultado: {result}")
-                    return result
-                if s1 > s2:
-                    result = 1 if order == 'asc' else -1
-                    if debug:
-                        logger(f"  > {s1} > {s2}. Resultado: {result}")
-                    return result
-
-            if debug:
-                logger("  > Iguais. Empate, próximo critério.")
-        if debug:
-            logger("--- Fim da Comparação: Iguais ---")
-        return 0
+    get_value_for_criterion = make_rank_value_getter(status_order, issuetype_order, epic_order, epic_as_text=True)
 
     try:
-        sorted_issues = sorted(issues, key=cmp_to_key(compare_issues))
+        sorted_issues = sort_issues(issues, rank_by_list, order_list, get_value_for_criterion, debug=debug, logger=logger)
         if verbose:
             logger(f"\nIssues ordenadas com sucesso por: {', '.join(rank_by_list)}.")
     except Exception as e:
@@ -865,81 +1355,45 @@ def rank_issues_collection(client, label, issues, rank_by_list, order_list, dry_
     needs_reordering = (moved > 0)
 
     if needs_reordering:
+        rank_plan = plan_rank_moves(current_order_keys, proposed_order_keys, batch_size)
         if brief and dry_run:
             if not rank_subtasks:
-                logger(f"{label}: {len(sorted_issues)} issues ordenadas.")
+                logger(f"{label}: {len(sorted_issues)} issues ordenadas ({len(rank_plan)} chamada(s) de rank previstas).")
                 return len(sorted_issues), moved
 
         if not brief:
             logger("\n--- Ordem Proposta (Final) ---")
-            # Exibir para cada issue: chave, epic link e destino da movimentação proposta
-            for idx, issue in enumerate(sorted_issues):
-                # rank atual
-                rank_value = getattr(issue.fields, rank_field_id, 'N/A') if rank_field_id else 'N/A'
-                # tentar obter epic link bruto para exibição
-                epic_display = None
-                try:
-                    if epic_field_id:
-                        epic_display = issue.raw.get('fields', {}).get(epic_field_id)
-                    if not epic_display and hasattr(issue.fields, 'epic'):
-                        epic_display = getattr(issue.fields, 'epic')
-                    if not epic_display and hasattr(issue.fields, 'Epic'):
-                        epic_display = getattr(issue.fields, 'Epic')
-                    if not epic_display:
-                        for k, v in (issue.raw.get('fields') or {}).items():
-                            if k and 'epic' in k.lower():
-                                epic_display = v
-                                break
-                    if epic_display is None:
-                        epic_display = 'N/A'
-                except Exception:
-                    epic_display = 'N/A'
-
-                # destino proposto: depois do anterior na lista ordenada
-                if idx == 0:
-                    dest = 'TOP'
-                else:
-                    dest = sorted_issues[idx - 1].key
+            with phase('render'):
+                # Exibir para cada issue: chave, epic link e destino da movimentação proposta
+                for idx, issue in enumerate(sorted_issues):
+                    epic_display = issue.epic if issue.epic is not None else 'N/A'
+
+                    # destino proposto: depois do anterior na lista ordenada
+                    if idx == 0:
+                        dest = 'TOP'
+                    else:
+                        dest = sorted_issues[idx - 1].key
 
-                # posição atual (se conhecida)
-                try:
-                    current_pos = current_order_keys.index(issue.key) + 1
-                except ValueError:
-                    current_pos = 'N/A'
+                    # posição atual (se conhecida)
+                    try:
+                        current_pos = current_order_keys.index(issue.key) + 1
+                    except ValueError:
+                        current_pos = 'N/A'
 
-                issue_info = format_issue_info(issue, rank_by_list, epic_field_id, severity_field_id)
-                logger(f"  - {issue.key} | {issue_info} (Epic: {epic_display}) -> after: {dest} (current pos: {current_pos}, Rank atual: {rank_value})")
+                    issue_info = format_issue_info(issue, rank_by_list)
+                    logger(f"  - {issue.key} | {issue_info} (Epic: {epic_display}) -> after: {dest} (current pos: {current_pos}, Rank atual: {issue.rank})")
             print("----------------------------")
 
         if dry_run:
             if verbose and not brief:
+                logger(describe_rank_plan(rank_plan, len(sorted_issues), batch_size))
                 logger("\nMODO DRY-RUN ATIVADO. Nenhuma alteração será aplicada no Jira.")
         else:
             logger("\nIniciando o processo de reordenação no Jira (isso pode levar um tempo)...")
+            if verbose:
+                logger(describe_rank_plan(rank_plan, len(sorted_issues), batch_size))
             try:
-                server_url = client._options['server'].rstrip('/')
-                rank_url = f"{server_url}/rest/agile/1.0/issue/rank"
-                batch_size = max(1, batch_size)
-                total_issues = len(sorted_issues)
-                i = 1
-                ref_issue_key = sorted_issues[0].key
-                while i < total_issues:
-                    batch_issues = sorted_issues[i:i + batch_size]
-                    batch_keys = [issue.key for issue in batch_issues]
-                    if len(batch_keys) == 1:
-                        logger(f"  - Movendo '{batch_keys[0]}' para depois de '{ref_issue_key}'...")
-                    else:
-                        logger(f"  - Movendo lote de {len(batch_keys)} issues ({', '.join(batch_keys)}) para depois de '{ref_issue_key}'...")
-                    payload = {
-                        "issues": batch_keys,
-                        "rankAfterIssue": ref_issue_key
-                    }
-                    response = client._session.put(rank_url, json=payload)
-                    response.raise_for_status()
-                    if debug or verbose:
-                        logger(f"    -> API response: {response.status_code} {response.reason}")
-                    ref_issue_key = batch_keys[-1]
-                    i += batch_size
+                dispatch_rank_plan(client, label, rank_plan, rank_scheduler, logger=logger, debug=debug, verbose=verbose)
                 logger("\nReordenação concluída com sucesso!")
             except Exception as e:
                 check_and_handle_401(e)
@@ -956,28 +1410,88 @@ def rank_issues_collection(client, label, issues, rank_by_list, order_list, dry_
     total_moved = moved
 
     if rank_subtasks:
-        for issue in sorted_issues:
-            if hasattr(issue.fields, 'subtasks') and issue.fields.subtasks:
-                if verbose:
-                    logger(f"\n[Subtarefas] Ordenando subtarefas de {issue.key}...")
-                sub_analyzed, sub_moved = rank_child_issues(
-                    client, issue.key, rank_by_list, order_list,
-                    dry_run=dry_run, debug=debug, status_order=status_order,
-                    issuetype_order=issuetype_order, brief=brief,
-                    epic_field_id=epic_field_id, sprint_field_id=sprint_field_id,
-                    severity_field_id=severity_field_id, severity_order=severity_order,
-                    batch_size=batch_size, log_buffer=log_buffer, rank_subtasks=False
-                )
-                total_analyzed += sub_analyzed
-                total_moved += sub_moved
+        sub_analyzed, sub_moved = rank_subtasks_in_bulk(
+            client, sorted_issues, rank_by_list, order_list,
+            dry_run=dry_run, debug=debug, status_order=status_order,
+            issuetype_order=issuetype_order, brief=brief,
+            epic_field_id=epic_field_id, sprint_field_id=sprint_field_id,
+            severity_field_id=severity_field_id, severity_order=severity_order,
+            batch_size=batch_size, log_buffer=log_buffer, rank_scheduler=rank_scheduler,
+            search_workers=search_workers,
+        )
+        total_analyzed += sub_analyzed
+        total_moved += sub_moved
 
     if brief and (needs_reordering or rank_subtasks):
         logger(f"{label}: {total_analyzed} issues ordenadas.")
     return total_analyzed, total_moved
 
 
-if __name__ == "__main__":
+def rank_sprint_issues(client, sprint_names, rank_by_list, order_list, dry_run=False, debug=False, status_order=None, issuetype_order=None, epic_order=None, brief=False, epic_field_id=None, sprint_field_id=None, severity_field_id=None, severity_order=None, batch_size=50, log_buffer=None, rank_subtasks=False, rank_scheduler=None, search_workers=DEFAULT_SEARCH_WORKERS):
+    """Busca as issues (sem subtarefas) da(s) sprint(s) e as ordena como uma coleção. Retorna (analisadas, reordenadas)."""
+    logger = make_logger(log_buffer)
+    sprint_name = ", ".join(sprint_names)
+    logger(f"Modo de Sprint ativado para '{sprint_name}'. Buscando issues na(s) sprint(s)...")
+
+    # Constrói a cláusula JQL escapando aspas duplas dos nomes de sprints
+    escaped_sprints = [s.replace('"', '\\"') for s in sprint_names]
+    if len(escaped_sprints) == 1:
+        sprint_clause = f'sprint = "{escaped_sprints[0]}"'
+    else:
+        sprint_clause = 'sprint IN (' + ', '.join([f'"{s}"' for s in escaped_sprints]) + ')'
 
+    jql_sprint = f'{sprint_clause} AND type IN standardIssueTypes() ORDER BY Rank ASC'
+    try:
+        rank_field_id = get_rank_field_id(client)
+        fields_to_fetch = build_fields_to_fetch(rank_by_list, rank_field_id, epic_field_id, sprint_field_id, severity_field_id, rank_subtasks)
+
+        try:
+            issues = search_all_issues(client, jql_sprint, fields=fields_to_fetch, max_workers=search_workers, lean=True)
+        except Exception:
+            # Se houver erro (por ex: standardIssueTypes() não suportado), fallback para buscar sem filtro
+            try:
+                jql_sprint_fallback = f'{sprint_clause} ORDER BY Rank ASC'
+                issues = search_all_issues(client, jql_sprint_fallback, fields=fields_to_fetch, max_workers=search_workers, lean=True)
+                if issues:
+                    # Filtrar manualmente sub-tarefas
+                    issues = [issue for issue in issues if getattr(issue.fields.issuetype, 'subtask', False) is False]
+            except Exception as e2:
+                logger(f"Erro ao buscar issues da(s) sprint(s) '{sprint_name}' no fallback: {e2}")
+                issues = None
+    except Exception as e:
+        logger(f"Erro ao preparar busca de issues da(s) sprint(s) '{sprint_name}': {e}")
+        issues = None
+
+    if not issues:
+        logger(f"Nenhuma issue encontrada na sprint '{sprint_name}'.")
+        return 0, 0
+    logger(f"Encontradas {len(issues)} issues na sprint. Processando ordenação...")
+    return rank_issues_collection(
+        client,
+        f"Sprint: {sprint_name}",
+        issues,
+        rank_by_list,
+        order_list,
+        dry_run,
+        debug,
+        status_order,
+        issuetype_order,
+        epic_order=epic_order,
+        brief=brief,
+        epic_field_id=epic_field_id,
+        sprint_field_id=sprint_field_id,
+        severity_field_id=severity_field_id,
+        severity_order=severity_order,
+        batch_size=batch_size,
+        log_buffer=log_buffer,
+        rank_subtasks=rank_subtasks,
+        rank_scheduler=rank_scheduler,
+        search_workers=search_workers,
+    )
+
+
+def main(argv=None, prog=None):
+    """Ponto de entrada da linha de comando; `argv` (padrão: sys.argv[1:]) permite chamar a partir de outro código."""
     def list_of_str(arg):
         if arg is None:
             return None
@@ -985,16 +1499,17 @@ if __name__ == "__main__":
 
     pre_parser = argparse.ArgumentParser(add_help=False)
     pre_parser.add_argument('-c', '--config', type=str, help='Caminho para o arquivo de configuração JSON.')
-    pre_args, _ = pre_parser.parse_known_args()
+    pre_args, _ = pre_parser.parse_known_args(argv)
 
     config = {}
     if pre_args.config:
         loaded_config = load_config(pre_args.config)
         if loaded_config is None:
-            exit(1)
+            sys.exit(1)
         config = loaded_config
 
     parser = argparse.ArgumentParser(
+        prog=prog,
         description=(
             "Reordena issues filhas de um Épico/Story/Tarefa ou de todos os Épicos de um projeto no Jira. "
             "Argumentos passados na linha de comando sobrescrevem os valores do arquivo de configuração.\n"
@@ -1021,10 +1536,26 @@ if __name__ == "__main__":
     parser.add_argument('--epic-order', type=list_of_str, default=config.get('epic-order'), help='Lista de chaves de épicos definindo ordem customizada por épicos. Ex: --epic-order ABC-1,ABC-2')
     parser.add_argument('--batch-size', type=int, default=config.get('batch-size', 50), help="Tamanho do lote de issues para envio à API do Jira. Use 1 para desativar o loteamento.")
     parser.add_argument('--max-workers', type=int, default=config.get('max-workers', 4), help="Número máximo de threads paralelas para processamento de múltiplos épicos.")
+    parser.add_argument('--search-workers', type=int, default=config.get('search-workers', DEFAULT_SEARCH_WORKERS), help="Número máximo de páginas de busca (JQL) buscadas em paralelo.")
+    parser.add_argument('--max-rps', type=float, default=config.get('max-requests-per-second', DEFAULT_MAX_RPS), help="Limite de requisições por segundo ao Jira, compartilhado entre todas as threads (0 desativa). Respostas 429/503 são repetidas respeitando o Retry-After.")
     parser.add_argument('--rank-subtasks', action='store_true', default=config.get('rank-subtasks', False), help="Ordena também as subtarefas de cada issue encontrada.")
-
-    args = parser.parse_args()
-
+    parser.add_argument('--output-order', choices=['completion', 'submission'], default=config.get('output-order', 'completion'), help="Modo projeto em paralelo: imprime o log de cada épico assim que ele termina (completion) ou na ordem dos épicos (submission, com buffer de reordenação limitado).")
+    parser.add_argument('--reorder-window', type=int, default=config.get('reorder-window'), help="Tamanho máximo do buffer de reordenação em --output-order submission. Padrão: 4x --max-workers.")
+    parser.add_argument('--epic-timeout', type=float, default=config.get('epic-timeout'), help="Tempo máximo (segundos) de processamento de cada épico no modo projeto em paralelo; ao exceder, o épico é interrompido antes do próximo lote de rank.")
+    parser.add_argument('--progress', action=argparse.BooleanOptionalAction, default=None, help="Exibe uma linha de progresso (concluídos/total, issues/s, ETA) no modo projeto em paralelo. Padrão: somente em terminal interativo.")
+    parser.add_argument('--full', action='store_true', help="Modo projeto: ignora o estado incremental e processa todos os épicos (o estado é atualizado ao final).")
+    parser.add_argument('--state-file', type=str, default=config.get('state-file'), help="Arquivo SQLite do estado incremental do modo projeto. Padrão: <config>.state.sqlite ao lado do arquivo de configuração.")
+    parser.add_argument('--serve', nargs='?', const=f"{DEFAULT_SERVE_HOST}:{DEFAULT_SERVE_PORT}", default=None, metavar='[HOST:]PORT', help=f"Modo daemon: mantém o cliente aberto e reordena o épico/pai afetado a cada webhook do Jira recebido em POST /webhook. Padrão: {DEFAULT_SERVE_HOST}:{DEFAULT_SERVE_PORT}.")
+    parser.add_argument('--debounce', type=float, default=config.get('serve-debounce', DEFAULT_DEBOUNCE_SECONDS), help="Modo --serve: segundos sem novos eventos de um mesmo pai antes de reordená-lo.")
+    parser.add_argument('--webhook-secret', type=str, default=config.get('webhook-secret'), help="Modo --serve: token exigido no cabeçalho X-Webhook-Token ou no parâmetro ?token= da URL do webhook.")
+    parser.add_argument('--journal', type=str, default=config.get('rank-journal'), help="Arquivo do diário de lotes de rank (JSON Lines). Padrão: rank_journal_TIMESTAMP.jsonl.")
+    parser.add_argument('--resume', type=str, default=None, help="Retoma a aplicação a partir de um diário de uma execução interrompida, sem reordenar novamente.")
+    parser.add_argument('--metrics-json', type=str, default=config.get('metrics-json'), help="Grava ao final um resumo JSON das métricas (requisições por endpoint, latência, status, tentativas, bytes e tempo por fase).")
+    parser.add_argument('--metrics-prom', type=str, default=config.get('metrics-prom'), help="Grava ao final as mesmas métricas no formato texto do Prometheus (textfile collector).")
+    parser.add_argument('--profile', nargs='?', const='', default=None, metavar='PREFIXO', help="Perfila a execução: grava PREFIXO.pstats (cProfile de todas as threads) e PREFIXO.collapsed.txt (pilhas para flamegraph), mede o pico de memória por fase (tracemalloc) e imprime as funções mais custosas ao final. Padrão do prefixo: profile_<script>_TIMESTAMP.")
+    parser.add_argument('--profile-top', type=int, default=DEFAULT_PROFILE_TOP, help=f"Número de funções na tabela de hotspots do --profile. Padrão: {DEFAULT_PROFILE_TOP}.")
+
+    args = parser.parse_args(argv)
     start_time = time.time()
 
     parent_key = args.parent_key if args.parent_key is not None else config.get('parent-key')
@@ -1049,15 +1580,15 @@ if __name__ == "__main__":
 
     if not args.config:
         print("Erro: O arquivo de configuração ('-c' ou '--config') é obrigatório.")
-        exit(1)
+        sys.exit(1)
 
-    if not parent_key and not project_id and not sprint_list:
+    if not args.resume and not args.serve and not parent_key and not project_id and not sprint_list:
         print("Erro: Especifique '--parent-key' para ordenar um item, '--project-id' para ordenar todos os épicos de um projeto, ou '--sprint' para ordenar uma sprint.")
-        exit(1)
+        sys.exit(1)
 
-    if not args.rank_by:
+    if not args.resume and not args.rank_by:
         print("Erro: '--rank-by' é obrigatório (via linha de comando ou no config.json).")
-        exit(1)
+        sys.exit(1)
 
     valid_criteria = {'created', 'updated', 'resolutiondate', 'priority', 'key', 'status', 'issuetype'}
     # adicionar novos critérios
@@ -1065,90 +1596,250 @@ if __name__ == "__main__":
     valid_criteria.add('summary')
     valid_criteria.add('sprint')
     valid_criteria.add('severity')
-    for criterion in args.rank_by:
+    for criterion in args.rank_by or []:
         if criterion not in valid_criteria:
             print(f"Erro: Critério de ordenação inválido '{criterion}'. Válidos são: {', '.join(sorted(list(valid_criteria)))}")
-            exit(1)
+            sys.exit(1)
 
     token = config.get("jira_token")
     if not token or "YOUR_JIRA_API_TOKEN" in token:
         print("Erro: Token do Jira ('jira_token') não encontrado ou não configurado no arquivo de configuração.")
-        exit(1)
+        sys.exit(1)
 
     server = config.get("jira_server")
     if not server:
         print("Erro: URL do servidor Jira ('jira_server') não encontrada no arquivo de configuração.")
-        exit(1)
-
+        sys.exit(1)
+
+    if args.resume and not os.path.exists(args.resume):
+        print(f"Erro: Diário '{args.resume}' não encontrado.")
+        sys.exit(1)
+
+    rank_scheduler = None
+    rank_journal = None
+    if args.resume:
+        rank_journal = RankJournal(args.resume)
+    elif not args.dry_run:
+        rank_journal = RankJournal(args.journal or f"rank_journal_{datetime.now().strftime('%Y-%m-%d_%H%M%S')}.jsonl")
+    enable_metrics_export('rank_issues', args.metrics_json, args.metrics_prom)
+    if args.profile is not None:
+        start_profiling('rank_issues', args.profile, args.profile_top)
     try:
         print("Conectando ao Jira...")
-        jira_client = JIRA(
-            server=server,
-            options={'headers': {'Authorization': f'Bearer {token}'}},
-        )
-        try:
-            jira_client._session.headers.update({'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'})
-        except Exception:
-            pass
+        # Pool para as threads de épicos, as de rank do agendador e as de busca paginada, ao mesmo tempo
+        pool_size = pool_size_for(config, args.max_workers * 2, args.search_workers)
+        jira_client = create_jira_client(config, pool_size=pool_size, max_rps=args.max_rps)
         print("Conectado com sucesso.")
+        rank_scheduler = RankScheduler(jira_client, max_workers=args.max_workers, journal=rank_journal)
 
         # carregar/descobrir IDs dos campos
         epic_field_id = config.get('epic_link_field_id')
         sprint_field_id = config.get('sprint_field_id')
         severity_field_id = config.get('severity_field_id')
+        get_client_field_registry(jira_client, config)
         if not epic_field_id or not sprint_field_id or not severity_field_id:
             try:
-                all_fields = jira_client.fields()
-                if not epic_field_id:
-                    for field in all_fields:
-                        if field.get('name') == 'Epic Link':
-                            epic_field_id = field.get('id')
-                            break
-                if not sprint_field_id:
-                    for field in all_fields:
-                        schema = field.get('schema', {})
-                        if (field.get('name') == 'Sprint' or 
-                            ('custom' in schema and 'sprint' in schema.get('custom', '').lower())):
-                            sprint_field_id = field.get('id')
-                            break
-                if not severity_field_id:
-                    for field in all_fields:
-                        if (field.get('name') == 'Gravidade' or 
-                            field.get('name') == 'Severity'):
-                            severity_field_id = field.get('id')
-                            break
+                epic_field_id, sprint_field_id, severity_field_id = resolve_field_ids(jira_client, epic_field_id, sprint_field_id, severity_field_id)
             except Exception as e:
                 check_and_handle_401(e)
                 print(f"Aviso: Não foi possível obter informações dos campos do Jira: {e}")
 
-        if project_id:
+        if args.serve:
+            host, _, port = args.serve.rpartition(':')
+            host = host or DEFAULT_SERVE_HOST
+            parent_types = {}
+
+            def rerank(parent_key):
+                started = time.time()
+                log_buf = []
+                try:
+                    if parent_key.startswith(SPRINT_TARGET_PREFIX):
+                        sprint_name = parent_key[len(SPRINT_TARGET_PREFIX):]
+                        children, moved = rank_sprint_issues(
+                            jira_client, [sprint_name], args.rank_by, args.order, args.dry_run, args.debug,
+                            args.status_order, args.issuetype_order, epic_order=args.epic_order, brief=args.brief,
+                            epic_field_id=epic_field_id, sprint_field_id=sprint_field_id,
+                            severity_field_id=severity_field_id, severity_order=args.severity_order,
+                            batch_size=args.batch_size, log_buffer=log_buf, rank_subtasks=args.rank_subtasks,
+                            rank_scheduler=rank_scheduler, search_workers=args.search_workers,
+                        )
+                        log_buf.append(f"[webhook] Sprint '{sprint_name}': {children} issues analisadas, {moved} reordenadas em {time.time() - started:.2f}s.")
+                        print("\n".join(log_buf), flush=True)
+                        return
+                    if parent_key not in parent_types:
+                        # O tipo do pai não muda; guardado para poupar uma chamada por evento
+                        parent_types[parent_key] = jira_client.issue(parent_key, fields="issuetype").fields.issuetype.name
+                    children, moved = rank_child_issues(
+                        jira_client, parent_key, args.rank_by, args.order, args.dry_run, args.debug,
+                        args.status_order, args.issuetype_order, brief=args.brief,
+                        epic_field_id=epic_field_id, sprint_field_id=sprint_field_id,
+                        severity_field_id=severity_field_id, severity_order=args.severity_order,
+                        batch_size=args.batch_size, log_buffer=log_buf, rank_subtasks=args.rank_subtasks,
+                        rank_scheduler=rank_scheduler, parent_type_name=parent_types.get(parent_key), search_workers=args.search_workers,
+                    )
+                    log_buf.append(f"[webhook] {parent_key}: {children} filhas analisadas, {moved} reordenadas em {time.time() - started:.2f}s.")
+                except Exception as e:
+                    log_buf.append(f"[webhook] Erro ao reordenar {parent_key}: {e}")
+                print("\n".join(log_buf), flush=True)
+
+            debouncer = Debouncer(args.debounce, rerank)
+            # Com --sprint, cada webhook reordena as sprints observadas em que a issue está, uma a uma
+            webhook_server = make_webhook_server(debouncer, host, int(port), epic_field_id=epic_field_id, secret=args.webhook_secret, verbose=args.debug,
+                                                 sprint_field_id=sprint_field_id, sprints=sprint_list or None)
+            print(f"Aguardando webhooks do Jira em http://{host}:{webhook_server.server_address[1]}/webhook (Ctrl-C para encerrar)...", flush=True)
+            try:
+                webhook_server.serve_forever()
+            except KeyboardInterrupt:
+                print("\nEncerrando o modo --serve.")
+            finally:
+                webhook_server.server_close()
+                debouncer.stop()
+        elif args.resume:
+            def replan(parent_key):
+                log_buf = []
+                children, _ = rank_child_issues(
+                    jira_client, parent_key, args.rank_by, args.order, args.dry_run, args.debug,
+                    args.status_order, args.issuetype_order, brief=args.brief,
+                    epic_field_id=epic_field_id, sprint_field_id=sprint_field_id,
+                    severity_field_id=severity_field_id, severity_order=args.severity_order,
+                    batch_size=args.batch_size, log_buffer=log_buf, rank_subtasks=args.rank_subtasks,
+                    rank_scheduler=rank_scheduler, search_workers=args.search_workers,
+                )
+                print("\n".join(log_buf), flush=True)
+                if not children:
+                    return RuntimeError(f"nenhuma filha de {parent_key} pôde ser buscada para replanejar")
+                if any(label_parent(label) == parent_key for label in rank_journal.failed_labels):
+                    return RuntimeError(f"falha ao aplicar o novo plano de {parent_key}")
+                return None
+
+            resumed, errors = resume_rank_journal(jira_client, args.resume, rank_scheduler, debug=args.debug, verbose=not args.brief, search_workers=args.search_workers, replan=replan)
+            for label, err in errors.items():
+                check_and_handle_401(err)
+                print(f"\nErro ao retomar {label}: {err}")
+            print(f"\nResumo: Planos retomados: {resumed}; Com erro: {len(errors)}")
+        elif project_id:
             print(f"Modo de Projeto ativado para '{project_id}'. Buscando todos os épicos...")
             jql_epics = f'project = "{project_id}" AND issuetype = Epic ORDER BY key ASC'
 
-            # Tentar primeiro sem 'fields' — em algumas versões do client passar 'fields'
-            # pode causar erros internos ('NoneType' is not iterable').
+            # Tentar primeiro a busca enxuta (JSON direto, só a chave); depois sem 'fields' — em algumas
+            # versões do client passar 'fields' pode causar erros internos ('NoneType' is not iterable').
             epics = None
             try:
-                epics = jira_client.search_issues(jql_epics, maxResults=False)
-            except Exception:
+                epics = search_all_issues(jira_client, jql_epics, fields=['key'], max_workers=args.search_workers, lean=True)
+            except Exception as e:
+                check_and_handle_401(e)
+                epics = None
+            if epics is None:
                 try:
-                    epics = jira_client.search_issues(jql_epics, maxResults=False, fields=['key'])
+                    epics = jira_client.search_issues(jql_epics, maxResults=False)
                 except Exception:
                     try:
-                        epics = jira_client.search_issues(jql_epics, maxResults=False, fields="key")
-                    except Exception as e:
-                        print(f"Erro ao buscar épicos (todos os fallbacks falharam): {e}")
-                        epics = None
+                        epics = jira_client.search_issues(jql_epics, maxResults=False, fields=['key'])
+                    except Exception:
+                        try:
+                            epics = jira_client.search_issues(jql_epics, maxResults=False, fields="key")
+                        except Exception as e:
+                            print(f"Erro ao buscar épicos (todos os fallbacks falharam): {e}")
+                            epics = None
 
             if epics:
                 epics = [e for e in epics if getattr(e, 'raw', None) is not None]
+
+            # Estado incremental: processa só os épicos com alterações desde a última execução completa
+            run_started = time.time()
+            state_settings = settings_fingerprint({
+                'rank_by': args.rank_by, 'order': args.order, 'status_order': args.status_order,
+                'issuetype_order': args.issuetype_order, 'severity_order': args.severity_order,
+                'rank_subtasks': args.rank_subtasks, 'epic_field_id': epic_field_id,
+            })
+            rank_state = None
+            try:
+                rank_state = RankState(args.state_file or f"{os.path.splitext(args.config)[0]}.state.sqlite")
+            except Exception as e:
+                print(f"Aviso: Não foi possível abrir o estado incremental ({e}). Processando todos os épicos.")
+            stored_fingerprints = {}
+            if epics and rank_state is not None and not args.full:
+                last_run = rank_state.last_run(project_id, state_settings)
+                if last_run is None:
+                    print("Estado incremental: nenhuma execução anterior com estas opções; processando todos os épicos.")
+                elif not epic_field_id:
+                    print("Aviso: Campo 'Epic Link' não identificado; o modo incremental foi desativado.")
+                else:
+                    try:
+                        dirty = find_dirty_epics(jira_client, project_id, epic_field_id, last_run, config.get('incremental-margin-minutes', 5), args.rank_subtasks, args.search_workers)
+                        total_epics = len(epics)
+                        epics = [epic for epic in epics if epic.key in dirty]
+                        print(f"Modo incremental: {len(epics)} de {total_epics} épicos com alterações desde a última execução (use --full para processar todos).")
+                        if not args.rank_subtasks:
+                            stored_fingerprints = rank_state.fingerprints([epic.key for epic in epics])
+                    except Exception as e:
+                        check_and_handle_401(e)
+                        print(f"Aviso: Falha ao identificar os épicos alterados ({e}). Processando todos os épicos.")
+
             if not epics:
-                print(f"Nenhum épico encontrado no projeto '{project_id}'.")
+                if rank_state is not None and rank_state.last_run(project_id, state_settings) is not None and not args.full:
+                    print("Nenhum épico com alterações desde a última execução.")
+                    if not args.dry_run:
+                        rank_state.set_last_run(project_id, state_settings, run_started)
+                else:
+                    print(f"Nenhum épico encontrado no projeto '{project_id}'.")
             else:
                 print(f"Encontrados {len(epics)} épicos. Processando cada um...")
-                import concurrent.futures
+
+                # Busca em lote as filhas de todos os épicos (poucas consultas 'Epic Link' in (...))
+                children_by_epic = None
+                if epic_field_id:
+                    epic_keys = [epic.key for epic in epics]
+                    try:
+                        fields_to_fetch = build_fields_to_fetch(args.rank_by, get_rank_field_id(jira_client), epic_field_id, sprint_field_id, severity_field_id, args.rank_subtasks)
+                        if not args.brief:
+                            print(f"Buscando as filhas de {len(epic_keys)} épicos em {len(chunked(epic_keys, BULK_JQL_CHUNK_SIZE))} consulta(s)...")
+                        children_by_epic = prefetch_children(jira_client, epic_keys, fields_to_fetch, link='epic', epic_field_id=epic_field_id, search_workers=args.search_workers)
+                        # Mantém só os registros compactos; o JSON bruto de cada página é liberado aqui
+                        convert = make_rank_issue_converter(args.rank_by, get_rank_field_id(jira_client), epic_field_id, sprint_field_id, severity_field_id, args.severity_order)
+                        children_by_epic = {key: [convert(issue) for issue in group] for key, group in children_by_epic.items()}
+                    except Exception as e:
+                        check_and_handle_401(e)
+                        print(f"Aviso: Falha na busca em lote das filhas ({e}). Buscando épico a épico.")
+                        children_by_epic = None
+
+                # Impressão digital (ordem atual, chaves e valores de ordenação) das filhas; épicos sem mudança são pulados
+                epic_fingerprints = {}
+                if children_by_epic is not None and rank_state is not None:
+                    fingerprint_getter = make_rank_value_getter(args.status_order, args.issuetype_order)
+                    for epic in epics:
+                        epic_fingerprints[epic.key] = children_fingerprint(children_by_epic.get(epic.key, []), args.rank_by, fingerprint_getter)
+                    unchanged = {key for key, fp in epic_fingerprints.items() if stored_fingerprints.get(key) == fp}
+                    if unchanged:
+                        epics = [epic for epic in epics if epic.key not in unchanged]
+                        print(f"Modo incremental: {len(unchanged)} épico(s) sem mudança na ordem nem nos campos de ordenação foram pulados.")
+
+                def record_epic_state(epic_key, moved):
+                    if rank_state is None or args.dry_run or epic_key not in epic_fingerprints:
+                        return
+                    if rank_journal is not None and any(label_parent(label) == epic_key for label in rank_journal.failed_labels):
+                        return
+                    # A impressão digital vale para a ordem buscada; se houve movimentos, a ordem no Jira já é outra e
+                    # nenhuma impressão é guardada (a próxima execução que vir o épico alterado o confere de novo)
+                    fingerprint = epic_fingerprints[epic_key] if not moved else ''
+                    rank_state.save_parent(project_id, epic_key, [child.key for child in children_by_epic.get(epic_key, [])], fingerprint, run_started)
+
+                def prefetched_args(epic):
+                    if children_by_epic is None:
+                        return {}
+                    return {'child_issues': children_by_epic.get(epic.key, []), 'parent_type_name': 'Epic'}
 
                 max_workers = args.max_workers
+                epic_sizes_file = config.get('epic_sizes_cache_file', DEFAULT_EPIC_SIZES_FILE)
+                if max_workers is not None and max_workers > 1:
+                    # Despacha os maiores épicos primeiro para que nenhum épico grande fique para o fim da fila
+                    if children_by_epic is not None:
+                        epic_sizes = {key: len(group) for key, group in children_by_epic.items()}
+                    else:
+                        epic_sizes = estimate_epic_sizes(jira_client, [epic.key for epic in epics], load_epic_sizes(epic_sizes_file, server), args.search_workers)
+                    epics = order_longest_first(epics, epic_sizes)
+                observed_sizes = {}
+                epics_failed = 0
                 total_children_analyzed = 0
                 total_children_reordered = 0
 
@@ -1172,14 +1863,21 @@ if __name__ == "__main__":
                             severity_order=args.severity_order,
                             batch_size=args.batch_size,
                             rank_subtasks=args.rank_subtasks,
+                            rank_scheduler=rank_scheduler,
+                            search_workers=args.search_workers,
+                            **prefetched_args(epic),
                         )
                         total_children_analyzed += children
                         total_children_reordered += moved
+                        record_epic_state(epic.key, moved)
                 else:
                     epics_processed = len(epics)
 
-                    def process_epic(epic):
-                        log_buf = []
+                    # Log de cada épico em andamento, para mostrar o que já foi aplicado se ele exceder o tempo limite
+                    epic_logs = {}
+
+                    def process_epic(epic, cancel_event):
+                        log_buf = epic_logs[epic.key] = []
                         try:
                             children, moved = rank_child_issues(
                                 jira_client,
@@ -1198,101 +1896,102 @@ if __name__ == "__main__":
                                 batch_size=args.batch_size,
                                 log_buffer=log_buf,
                                 rank_subtasks=args.rank_subtasks,
+                                rank_scheduler=rank_scheduler,
+                                cancel_event=cancel_event,
+                                search_workers=args.search_workers,
+                                **prefetched_args(epic),
                             )
                             return children, moved, log_buf, None
                         except Exception as thread_e:
                             return 0, 0, log_buf, thread_e
 
-                    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-                        futures = [executor.submit(process_epic, epic) for epic in epics]
-                        for future in futures:
-                            children, moved, log_buf, err = future.result()
-                            if log_buf:
-                                print("\n".join(log_buf))
-                            if err:
-                                print(f"Erro ao processar épico: {err}")
+                    show_progress = args.progress if args.progress is not None else sys.stderr.isatty()
+                    progress_start = time.time()
+                    epics_done = 0
+                    epics_timed_out = 0
+
+                    def print_progress():
+                        if show_progress:
+                            line = format_progress(epics_done, len(epics), total_children_analyzed, time.time() - progress_start)
+                            sys.stderr.write(f"\r{line}\033[K")
+                            sys.stderr.flush()
+
+                    results = iter_parallel(
+                        epics, process_epic, max_workers,
+                        ordered=(args.output_order == 'submission'),
+                        reorder_window=args.reorder_window,
+                        timeout=args.epic_timeout,
+                        on_tick=print_progress,
+                    )
+                    for epic, result, err in results:
+                        epics_done += 1
+                        if isinstance(err, TimeoutError):
+                            epics_timed_out += 1
+                            log_buf = list(epic_logs.get(epic.key, []))
+                            if result is not None:
+                                total_children_analyzed += result[0]
+                                total_children_reordered += result[1]
+                        elif err is None:
+                            children, moved, log_buf, err = result
+                            if err is None:
+                                observed_sizes[epic.key] = children
+                                record_epic_state(epic.key, moved)
                             total_children_analyzed += children
                             total_children_reordered += moved
+                        else:
+                            log_buf = []
+                        if err is not None:
+                            epics_failed += 1
+                        epic_logs.pop(epic.key, None)
+                        if show_progress:
+                            sys.stderr.write("\r\033[K")
+                        if log_buf:
+                            print("\n".join(log_buf))
+                        if isinstance(err, TimeoutError):
+                            print(f"{epic.key}: {err}; épico interrompido (lotes restantes podem ser retomados com --resume).")
+                        elif err:
+                            print(f"Erro ao processar épico {epic.key}: {err}")
+                        print_progress()
+                    if show_progress:
+                        sys.stderr.write("\n")
+                    if epics_timed_out:
+                        print(f"\nAviso: {epics_timed_out} épico(s) excederam o tempo limite de {args.epic_timeout:g}s.")
+                    if observed_sizes and children_by_epic is None:
+                        save_epic_sizes(epic_sizes_file, server, observed_sizes)
 
                 print(f"\nResumo: Épicos processados: {epics_processed}; Filhos analisados: {total_children_analyzed}; Filhos reordenados (ou que mudariam): {total_children_reordered}")
+                # Só avança o marco incremental se todos os épicos foram aplicados sem falhas
+                run_failed = (rank_journal is not None and rank_journal.failed_labels) or epics_failed
+                if rank_state is not None and not args.dry_run and not run_failed:
+                    rank_state.set_last_run(project_id, state_settings, run_started)
+            if rank_state is not None:
+                rank_state.close()
         elif sprint_list:
-            sprint_name = ", ".join(sprint_list)
-            print(f"Modo de Sprint ativado para '{sprint_name}'. Buscando issues na(s) sprint(s)...")
-            
-            # Constrói a cláusula JQL escapando aspas duplas dos nomes de sprints
-            escaped_sprints = [s.replace('"', '\\"') for s in sprint_list]
-            if len(escaped_sprints) == 1:
-                sprint_clause = f'sprint = "{escaped_sprints[0]}"'
-            else:
-                sprint_clause = 'sprint IN (' + ', '.join([f'"{s}"' for s in escaped_sprints]) + ')'
-
-            jql_sprint = f'{sprint_clause} AND type IN standardIssueTypes() ORDER BY Rank ASC'
-            try:
-                fields_to_fetch = set(args.rank_by)
-                fields_to_fetch.update(['priority', 'status', 'issuetype', 'summary'])
-                rank_field_id = get_rank_field_id(jira_client)
-                if rank_field_id:
-                    fields_to_fetch.add(rank_field_id)
-                if severity_field_id:
-                    fields_to_fetch.add(severity_field_id)
-                if args.rank_subtasks:
-                    fields_to_fetch.add('subtasks')
-                if 'epic' in fields_to_fetch and epic_field_id:
-                    fields_to_fetch.discard('epic')
-                    fields_to_fetch.add(epic_field_id)
-                if 'sprint' in fields_to_fetch and sprint_field_id:
-                    fields_to_fetch.discard('sprint')
-                    fields_to_fetch.add(sprint_field_id)
-                if 'severity' in fields_to_fetch:
-                    fields_to_fetch.discard('severity')
-                    if severity_field_id:
-                        fields_to_fetch.add(severity_field_id)
-
-                try:
-                    issues = jira_client.search_issues(jql_sprint, maxResults=False, fields=list(fields_to_fetch))
-                except Exception as e:
-                    # Se houver erro (por ex: standardIssueTypes() não suportado), fallback para buscar sem filtro
-                    try:
-                        jql_sprint_fallback = f'{sprint_clause} ORDER BY Rank ASC'
-                        issues = jira_client.search_issues(jql_sprint_fallback, maxResults=False, fields=list(fields_to_fetch))
-                        if issues:
-                            # Filtrar manualmente sub-tarefas
-                            issues = [issue for issue in issues if getattr(issue.fields.issuetype, 'subtask', False) is False]
-                    except Exception as e2:
-                        print(f"Erro ao buscar issues da(s) sprint(s) '{sprint_name}' no fallback: {e2}")
-                        issues = None
-            except Exception as e:
-                print(f"Erro ao preparar busca de issues da(s) sprint(s) '{sprint_name}': {e}")
-                issues = None
-
-            if not issues:
-                print(f"Nenhuma issue encontrada na sprint '{sprint_name}'.")
+            children, moved = rank_sprint_issues(
+                jira_client,
+                sprint_list,
+                args.rank_by,
+                args.order,
+                args.dry_run,
+                args.debug,
+                args.status_order,
+                args.issuetype_order,
+                epic_order=args.epic_order,
+                brief=args.brief,
+                epic_field_id=epic_field_id,
+                sprint_field_id=sprint_field_id,
+                severity_field_id=severity_field_id,
+                severity_order=args.severity_order,
+                batch_size=args.batch_size,
+                rank_subtasks=args.rank_subtasks,
+                rank_scheduler=rank_scheduler,
+                search_workers=args.search_workers,
+            )
+            sprints_count = len(sprint_list)
+            if sprints_count == 1:
+                print(f"\nResumo: Sprint processada: 1; Issues analisadas: {children}; Issues reordenadas (ou que mudariam): {moved}")
             else:
-                print(f"Encontradas {len(issues)} issues na sprint. Processando ordenação...")
-                children, moved = rank_issues_collection(
-                    jira_client,
-                    f"Sprint: {sprint_name}",
-                    issues,
-                    args.rank_by,
-                    args.order,
-                    args.dry_run,
-                    args.debug,
-                    args.status_order,
-                    args.issuetype_order,
-                    epic_order=args.epic_order,
-                    brief=args.brief,
-                    epic_field_id=epic_field_id,
-                    sprint_field_id=sprint_field_id,
-                    severity_field_id=severity_field_id,
-                    severity_order=args.severity_order,
-                    batch_size=args.batch_size,
-                    rank_subtasks=args.rank_subtasks,
-                )
-                sprints_count = len(sprint_list)
-                if sprints_count == 1:
-                    print(f"\nResumo: Sprint processada: 1; Issues analisadas: {children}; Issues reordenadas (ou que mudariam): {moved}")
-                else:
-                    print(f"\nResumo: Sprints processadas: {sprints_count}; Issues analisadas: {children}; Issues reordenadas (ou que mudariam): {moved}")
+                print(f"\nResumo: Sprints processadas: {sprints_count}; Issues analisadas: {children}; Issues reordenadas (ou que mudariam): {moved}")
         else:
             children, moved = rank_child_issues(
                 jira_client,
@@ -1310,6 +2009,8 @@ if __name__ == "__main__":
                 severity_order=args.severity_order,
                 batch_size=args.batch_size,
                 rank_subtasks=args.rank_subtasks,
+                rank_scheduler=rank_scheduler,
+                search_workers=args.search_workers,
             )
             print(f"\nResumo: Épicos processados: 1; Filhos analisados: {children}; Filhos reordenados (ou que mudariam): {moved}")
 
@@ -1317,7 +2018,23 @@ if __name__ == "__main__":
         check_and_handle_401(e)
         print(f"Ocorreu um erro ao conectar ou executar a reordenação no Jira: {e}")
         print(traceback.format_exc())
-        exit(1)
+        sys.exit(1)
     finally:
+        if rank_scheduler is not None:
+            rank_scheduler.shutdown()
+        if rank_journal is not None:
+            if args.resume:
+                rank_journal.close()
+            elif rank_journal.finish():
+                print(f"\nDiário de rank gravado em '{rank_journal.path}'. Para retomar uma execução interrompida: --resume {rank_journal.path}")
         elapsed = time.time() - start_time
         print(f"\nTempo total de execução: {elapsed:.2f} segundos")
+        peak_mb = peak_rss_mb()
+        if peak_mb is not None:
+            print(f"Pico de memória (RSS): {peak_mb:.1f} MB")
+        stop_profiling()
+        flush_metrics_export()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import json
+import os
+import re
+import threading
+import time
+
+# Rótulos que são chaves de issue (pais replanejáveis), em oposição a coleções como "Sprint: X"
+ISSUE_KEY_RE = re.compile(r'^[A-Za-z][A-Za-z0-9_]*-\d+$')
+
+
+class RankJournal:
+    """Diário append-only (JSON Lines) dos lotes de rank planejados e confirmados, para retomar execuções interrompidas.
+
+    Eventos: `plan` (rótulo e lotes na ordem de envio), `done` (lote confirmado pela API),
+    `failed` (lote que falhou), `complete` (todos os lotes do rótulo aplicados) e `replanned` (plano obsoleto
+    substituído por um novo plano do pai, gravado sob outro rótulo).
+    O arquivo só é criado quando o primeiro evento é gravado e `finish` o apaga se todos os planos foram concluídos.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.failed_labels = set()
+        # Rótulos com plano gravado e ainda não concluídos nesta execução
+        self.open_labels = set()
+        # Diário já existente (ex.: --journal fixo) nunca é apagado, para não perder o histórico anterior
+        self._preexisting = os.path.exists(path)
+        self._file = None
+        self._lock = threading.Lock()
+
+    def _append(self, event):
+        event['ts'] = time.time()
+        line = json.dumps(event, ensure_ascii=False)
+        with self._lock:
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write(line + '\n')
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def record_plan(self, label, plan):
+        with self._lock:
+            self.open_labels.add(label)
+        self._append({'event': 'plan', 'label': label, 'batches': plan})
+
+    def record_done(self, label, batch_index):
+        self._append({'event': 'done', 'label': label, 'batch': batch_index})
+
+    def record_failed(self, label, batch_index, error):
+        self.failed_labels.add(label)
+        self._append({'event': 'failed', 'label': label, 'batch': batch_index, 'error': str(error)})
+
+    def record_complete(self, label):
+        self.failed_labels.discard(label)
+        with self._lock:
+            self.open_labels.discard(label)
+        self._append({'event': 'complete', 'label': label})
+
+    def record_replanned(self, label):
+        self.failed_labels.discard(label)
+        with self._lock:
+            self.open_labels.discard(label)
+        self._append({'event': 'replanned', 'label': label})
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def finish(self):
+        """Fecha o diário e o apaga se todos os planos gravados foram confirmados. True se o arquivo ficou (para --resume)."""
+        self.close()
+        if not os.path.exists(self.path):
+            return False
+        if self.open_labels or self.failed_labels or self._preexisting:
+            return True
+        os.remove(self.path)
+        return False
+
+
+def load_journal(path):
+    """Lê um diário e retorna {rótulo: {'batches': [...], 'done': set(índices), 'complete': bool}}, na ordem do arquivo.
+
+    Um novo `plan` para o mesmo rótulo substitui o anterior; linhas truncadas (ex.: queda no meio da escrita) são ignoradas.
+    """
+    state = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            label = event.get('label')
+            kind = event.get('event')
+            if kind == 'plan':
+                state.pop(label, None)
+                state[label] = {'batches': event.get('batches') or [], 'done': set(), 'complete': False}
+            elif kind == 'replanned':
+                state.pop(label, None)
+            elif label in state:
+                if kind == 'done':
+                    state[label]['done'].add(event.get('batch'))
+                elif kind == 'complete':
+                    state[label]['complete'] = True
+    return state
+
+
+def batch_anchor(move):
+    """Retorna (chave âncora, True se o lote vai depois dela / False se vai antes)."""
+    if 'rankAfterIssue' in move:
+        return move['rankAfterIssue'], True
+    return move['rankBeforeIssue'], False
+
+
+def batch_in_place(move, rank_by_key):
+    """Confere pelos valores do campo Rank se o lote está na posição relativa planejada em torno da âncora."""
+    anchor, after = batch_anchor(move)
+    keys = list(move['issues'])
+    sequence = [anchor] + keys if after else keys + [anchor]
+    ranks = [rank_by_key.get(key) for key in sequence]
+    if any(rank is None for rank in ranks):
+        return False
+    return all(a < b for a, b in zip(ranks, ranks[1:]))
+
+
+def pending_batches(entry):
+    """Lotes ainda a enviar de um rótulo: a partir do primeiro lote não confirmado."""
+    batches = entry['batches']
+    done = entry['done']
+    if entry['complete'] or len(done) >= len(batches):
+        return []
+    first = next(i for i in range(len(batches)) if i not in done)
+    return [(i, batches[i]) for i in range(first, len(batches))]
+
+
+def label_parent(label):
+    """Pai de um rótulo do diário (`ABC-1#2`, cadeia de um plano dividido, pertence a `ABC-1`)."""
+    return label.split('#')[0]
+
+
+def open_parents(state):
+    """{pai: [rótulos]} dos pais com algum rótulo não concluído, incluindo as cadeias já concluídas do mesmo pai."""
+    parents = {label_parent(label) for label, entry in state.items() if not entry['complete']}
+    grouped = {}
+    for label in state:
+        if label_parent(label) in parents:
+            grouped.setdefault(label_parent(label), []).append(label)
+    return grouped
+
+
+def confirmed_batches(entry):
+    """Lotes do rótulo já aplicados no Jira (todos, se o rótulo foi concluído)."""
+    batches = entry['batches']
+    if entry['complete']:
+        return list(batches)
+    return [batches[i] for i in sorted(entry['done']) if 0 <= i < len(batches)]
+
+
+def plan_still_valid(entries, rank_by_key):
+    """Confere pelos valores do campo Rank se os lotes já confirmados de um pai continuam no lugar planejado.
+
+    Retorna None quando nenhum lote foi confirmado (não há como conferir). False significa diário obsoleto
+    (reordenação feita por outra pessoa, por exemplo): o plano só move as issues fora da maior subsequência já
+    ordenada e essa premissa deixou de valer, então os lotes restantes não devem ser enviados.
+    """
+    confirmed = [move for entry in entries for move in confirmed_batches(entry)]
+    if not confirmed:
+        return None
+    return all(batch_in_place(move, rank_by_key) for move in confirmed)
+
+
+def journal_keys(state):
+    """Todas as chaves (lotes e âncoras) dos pais com planos ainda não concluídos no diário."""
+    keys = []
+    seen = set()
+    for labels in open_parents(state).values():
+        for label in labels:
+            for move in state[label]['batches']:
+                for key in list(move['issues']) + [batch_anchor(move)[0]]:
+                    if key not in seen:
+                        seen.add(key)
+                        keys.append(key)
+    return keys
@@ -0,0 +1,99 @@
+import hashlib
+import json
+import math
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    scope TEXT PRIMARY KEY,
+    settings TEXT NOT NULL,
+    last_run REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS parents (
+    parent_key TEXT PRIMARY KEY,
+    scope TEXT NOT NULL,
+    child_keys TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    ranked_at REAL NOT NULL
+);
+"""
+
+
+def settings_fingerprint(settings):
+    """Hash estável das opções de ordenação; mudar critérios/ordens invalida o estado incremental."""
+    return hashlib.sha1(json.dumps(settings, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def children_fingerprint(children, rank_by_list, get_value):
+    """Hash das chaves, na ordem atual (Rank), e dos valores de ordenação das filhas.
+
+    A ordem faz parte do hash: uma filha arrastada no board muda a impressão digital mesmo sem mudar nenhum campo.
+    """
+    rows = [(child.key, [get_value(child, criterion) for criterion in rank_by_list]) for child in children]
+    return hashlib.sha1(json.dumps(rows, default=str).encode('utf-8')).hexdigest()
+
+
+def updated_since_jql(last_run, margin_minutes=5, now=None):
+    """Cláusula JQL relativa (`updated >= -Nm`) cobrindo desde `last_run` com margem, sem depender do fuso do servidor."""
+    now = now if now is not None else time.time()
+    minutes = max(1, math.ceil((now - last_run) / 60)) + max(0, margin_minutes)
+    return f"updated >= -{minutes}m"
+
+
+class RankState:
+    """Estado local (SQLite) das execuções incrementais: último run por escopo e impressão digital das filhas por pai."""
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def last_run(self, scope, settings):
+        """Timestamp do último run completo do escopo com as mesmas opções, ou None."""
+        with self._lock:
+            row = self._conn.execute("SELECT settings, last_run FROM runs WHERE scope = ?", (scope,)).fetchone()
+        if row is None or row[0] != settings:
+            return None
+        return row[1]
+
+    def set_last_run(self, scope, settings, timestamp):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO runs (scope, settings, last_run) VALUES (?, ?, ?) "
+                "ON CONFLICT(scope) DO UPDATE SET settings = excluded.settings, last_run = excluded.last_run",
+                (scope, settings, timestamp),
+            )
+
+    def fingerprints(self, parent_keys):
+        """{pai: impressão digital} dos pais informados que já têm estado gravado."""
+        result = {}
+        keys = list(parent_keys)
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                placeholders = ','.join('?' * len(chunk))
+                for parent_key, fingerprint in self._conn.execute(
+                    f"SELECT parent_key, fingerprint FROM parents WHERE parent_key IN ({placeholders})", chunk
+                ):
+                    result[parent_key] = fingerprint
+        return result
+
+    def save_parent(self, scope, parent_key, child_keys, fingerprint, timestamp=None):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO parents (parent_key, scope, child_keys, fingerprint, ranked_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(parent_key) DO UPDATE SET scope = excluded.scope, child_keys = excluded.child_keys, "
+                "fingerprint = excluded.fingerprint, ranked_at = excluded.ranked_at",
+                (parent_key, scope, json.dumps(list(child_keys)), fingerprint, timestamp if timestamp is not None else time.time()),
+            )
+
+    def forget_parent(self, parent_key):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM parents WHERE parent_key = ?", (parent_key,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
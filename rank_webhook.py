@@ -0,0 +1,250 @@
+import hmac
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+DEFAULT_SERVE_HOST = '127.0.0.1'
+DEFAULT_SERVE_PORT = 8765
+DEFAULT_DEBOUNCE_SECONDS = 5.0
+
+ISSUE_EVENTS = ('jira:issue_created', 'jira:issue_updated', 'jira:issue_deleted')
+EPIC_TYPE_NAMES = ('Epic', 'Épico')
+# Alvos de sprint na fila do debouncer: `sprint:NOME` (chaves de issue nunca têm ':')
+SPRINT_TARGET_PREFIX = 'sprint:'
+
+
+class Debouncer:
+    """Agrupa eventos por chave: `callback(chave)` roda `delay` segundos após o último evento daquela chave.
+
+    Nunca roda duas vezes em paralelo para a mesma chave; eventos que chegam durante a execução agendam uma nova rodada.
+    """
+
+    def __init__(self, delay, callback, clock=time.monotonic):
+        self.delay = delay
+        self.callback = callback
+        self._clock = clock
+        self._due = {}
+        self._running = set()
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._loop, name='rank-debouncer', daemon=True)
+        self._thread.start()
+
+    def submit(self, key):
+        with self._cond:
+            self._due[key] = self._clock() + self.delay
+            self._cond.notify()
+
+    def pending(self):
+        with self._cond:
+            return len(self._due) + len(self._running)
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    now = self._clock()
+                    ready = [k for k, due in self._due.items() if due <= now and k not in self._running]
+                    if ready:
+                        break
+                    waits = [due - now for k, due in self._due.items() if k not in self._running]
+                    self._cond.wait(timeout=max(0.01, min(waits)) if waits else None)
+                if self._stopped:
+                    return
+                for key in ready:
+                    del self._due[key]
+                    self._running.add(key)
+            for key in ready:
+                threading.Thread(target=self._run, args=(key,), daemon=True).start()
+
+    def _run(self, key):
+        try:
+            self.callback(key)
+        finally:
+            with self._cond:
+                self._running.discard(key)
+                self._cond.notify()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self._thread.join(timeout=1)
+
+
+def _only_rank_changed(payload):
+    """True se o changelog do evento só altera o campo Rank (ex.: movimentos feitos pelo próprio reordenador)."""
+    items = (payload.get('changelog') or {}).get('items') or []
+    return bool(items) and all(str(item.get('field', '')).lower() == 'rank' for item in items)
+
+
+def affected_parents(payload, epic_field_id=None):
+    """Chaves das issues pai cuja ordenação deve ser refeita por causa do evento de webhook do Jira."""
+    if payload.get('webhookEvent') not in ISSUE_EVENTS or _only_rank_changed(payload):
+        return set()
+    issue = payload.get('issue') or {}
+    fields = issue.get('fields') or {}
+    issuetype = fields.get('issuetype') or {}
+    parents = set()
+
+    if issuetype.get('name') in EPIC_TYPE_NAMES and payload.get('webhookEvent') != 'jira:issue_deleted':
+        parents.add(issue.get('key'))
+    epic_key = fields.get(epic_field_id) if epic_field_id else None
+    if isinstance(epic_key, dict):
+        epic_key = epic_key.get('key')
+    if epic_key:
+        parents.add(epic_key)
+    parent = fields.get('parent') or {}
+    if parent.get('key'):
+        parents.add(parent['key'])
+    # Uma issue que saiu de um épico não altera a ordem relativa das demais; só o pai atual é reordenado
+    parents.discard(None)
+    return parents
+
+
+def _sprint_values(value):
+    """(nome, estado) de cada sprint do campo Sprint: objetos da API ou o texto legado `...Sprint@1[id=1,state=ACTIVE,name=X,...]`."""
+    if not value:
+        return []
+    if not isinstance(value, list):
+        value = [value]
+    sprints = []
+    for item in value:
+        if isinstance(item, dict):
+            sprints.append((item.get('name'), item.get('state')))
+        elif isinstance(item, str):
+            name = re.search(r'\bname=([^,\]]*)', item)
+            state = re.search(r'\bstate=([^,\]]*)', item)
+            sprints.append((name.group(1) if name else None, state.group(1) if state else None))
+    return sprints
+
+
+def affected_sprints(payload, sprint_field_id=None, watched=None):
+    """Nomes das sprints (não encerradas) cuja ordenação deve ser refeita por causa do evento de webhook do Jira.
+
+    Usa o campo Sprint da issue no payload; sem ele, o `toString` do item Sprint do changelog. Com `watched`,
+    só as sprints desse conjunto. Como nos épicos, a sprint de onde a issue saiu não é reordenada.
+    """
+    if payload.get('webhookEvent') not in ISSUE_EVENTS or _only_rank_changed(payload):
+        return set()
+    if payload.get('webhookEvent') == 'jira:issue_deleted':
+        return set()
+    fields = (payload.get('issue') or {}).get('fields') or {}
+    if sprint_field_id and fields.get(sprint_field_id):
+        sprints = {name for name, state in _sprint_values(fields[sprint_field_id]) if name and str(state).upper() != 'CLOSED'}
+    else:
+        items = (payload.get('changelog') or {}).get('items') or []
+        sprints = {name.strip() for item in items if str(item.get('field', '')).lower() == 'sprint'
+                   for name in (item.get('toString') or '').split(',') if name.strip()}
+    if watched is not None:
+        sprints &= set(watched)
+    return sprints
+
+
+class _WebhookHandler(BaseHTTPRequestHandler):
+    server_version = 'smarter-jira-webhook'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if urlparse(self.path).path == '/health':
+            self._reply(200, {'status': 'ok', 'pending': self.server.debouncer.pending()})
+        else:
+            self._reply(404, {'error': 'not found'})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != '/webhook':
+            self._reply(404, {'error': 'not found'})
+            return
+        secret = self.server.secret
+        if secret:
+            provided = self.headers.get('X-Webhook-Token') or (parse_qs(url.query).get('token') or [None])[0]
+            if provided is None or not hmac.compare_digest(provided.encode('utf-8'), secret.encode('utf-8')):
+                self._reply(403, {'error': 'forbidden'})
+                return
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            payload = json.loads(self.rfile.read(length) or b'{}')
+        except (ValueError, OSError):
+            self._reply(400, {'error': 'invalid JSON'})
+            return
+        if self.server.sprints is not None:
+            targets = sorted(SPRINT_TARGET_PREFIX + name for name in affected_sprints(payload, self.server.sprint_field_id, self.server.sprints))
+        else:
+            targets = sorted(affected_parents(payload, self.server.epic_field_id))
+        for target in targets:
+            self.server.debouncer.submit(target)
+        self._reply(202, {'queued': targets})
+
+
+def make_webhook_server(debouncer, host=DEFAULT_SERVE_HOST, port=DEFAULT_SERVE_PORT, epic_field_id=None, secret=None, verbose=False, sprint_field_id=None, sprints=None):
+    """Servidor HTTP local que recebe webhooks do Jira em POST /webhook e agenda os alvos afetados no `debouncer`.
+
+    Os alvos são as issues pai afetadas ou, com `sprints` (modo --sprint), `sprint:NOME` para cada sprint observada
+    em que a issue está.
+    """
+    server = ThreadingHTTPServer((host, port), _WebhookHandler)
+    server.daemon_threads = True
+    server.debouncer = debouncer
+    server.epic_field_id = epic_field_id
+    server.sprint_field_id = sprint_field_id
+    server.sprints = set(sprints) if sprints is not None else None
+    server.secret = secret
+    server.verbose = verbose
+    return server
+
+
+def send_fake_webhook(url, issue_key, epic_key=None, parent_key=None, epic_field_id=None, event='jira:issue_updated', field='summary', secret=None, sprint=None, sprint_field_id=None):
+    """Envia um payload de webhook no formato do Jira para testar o modo --serve localmente."""
+    from urllib.request import Request, urlopen
+    fields = {'issuetype': {'name': 'Task'}}
+    if epic_key:
+        fields[epic_field_id or 'customfield_epic_link'] = epic_key
+    if sprint:
+        fields[sprint_field_id or 'customfield_sprint'] = [{'name': sprint, 'state': 'active'}]
+    if parent_key:
+        fields['parent'] = {'key': parent_key}
+    payload = {
+        'webhookEvent': event,
+        'timestamp': int(time.time() * 1000),
+        'issue': {'key': issue_key, 'fields': fields},
+        'changelog': {'items': [{'field': field, 'fromString': None, 'toString': None}]},
+    }
+    headers = {'Content-Type': 'application/json'}
+    if secret:
+        headers['X-Webhook-Token'] = secret
+    request = Request(url, data=json.dumps(payload).encode('utf-8'), headers=headers, method='POST')
+    with urlopen(request, timeout=10) as response:
+        return response.status, json.loads(response.read() or b'{}')
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Envia um webhook falso do Jira para um rank_issues.py --serve local.")
+    parser.add_argument('--url', type=str, default=f"http://{DEFAULT_SERVE_HOST}:{DEFAULT_SERVE_PORT}/webhook", help='URL do endpoint de webhook.')
+    parser.add_argument('--issue', type=str, required=True, help='Chave da issue alterada.')
+    parser.add_argument('--epic', type=str, help='Chave do épico da issue.')
+    parser.add_argument('--epic-field-id', type=str, help='ID do campo Epic Link usado no payload (o mesmo que o servidor descobriu).')
+    parser.add_argument('--parent', type=str, help='Chave da issue pai (para subtarefas).')
+    parser.add_argument('--sprint', type=str, help='Nome da sprint da issue (para um servidor em modo --sprint).')
+    parser.add_argument('--sprint-field-id', type=str, help='ID do campo Sprint usado no payload (o mesmo que o servidor descobriu).')
+    parser.add_argument('--event', type=str, default='jira:issue_updated', help='Tipo do evento.')
+    parser.add_argument('--secret', type=str, help='Token do webhook, se o servidor exigir.')
+    args = parser.parse_args()
+    status, body = send_fake_webhook(args.url, args.issue, args.epic, args.parent, args.epic_field_id, args.event, secret=args.secret, sprint=args.sprint, sprint_field_id=args.sprint_field_id)
+    print(f"{status} {body}")
@@ -5,8 +5,20 @@ import sys
 from datetime import datetime, timedelta
 from calendar import monthrange
 
-import pandas as pd
-from jira import JIRA, JIRAError
+from jira_metrics import enable_metrics_export, flush_metrics_export, phase
+from jira_profile import DEFAULT_PROFILE_TOP, start_profiling, stop_profiling
+from jira_search import DEFAULT_SEARCH_WORKERS, DEFAULT_WINDOW_SIZE, search_date_windows
+from jira_session import create_jira_client, pool_size_for
+from jira_throttle import DEFAULT_MAX_RPS
+from report_store import IssueStore, sync_issues
+
+# Status considerados concluídos pelo relatório (na JQL e no armazém local do --sync)
+DONE_STATUSES = ('FECHADO', 'RESOLVIDO')
+# --breakdown -> frequência de período do pandas (semanas de segunda a domingo)
+BREAKDOWN_FREQS = {'month': 'M', 'quarter': 'Q', 'week': 'W-SUN'}
+BREAKDOWN_NAMES = {'month': 'mês', 'quarter': 'trimestre', 'week': 'semana'}
+# Formatos de data sem hora aceitos pela JQL em --start-date/--end-date
+DATE_FORMATS = ('%Y-%m-%d', '%Y/%m/%d')
 
 # Reconfigura o encoding da saída padrão no Windows para evitar quebras por caracteres especiais
 if hasattr(sys.stdout, 'reconfigure'):
@@ -23,6 +35,8 @@ if hasattr(sys.stderr, 'reconfigure'):
 
 def check_and_handle_401(e):
     """Verifica se a exceção é um erro 401 (Não Autorizado) do Jira e encerra com mensagem amigável."""
+    from jira import JIRAError
+
     is_401 = False
     if isinstance(e, JIRAError) and e.status_code == 401:
         is_401 = True
@@ -32,7 +46,7 @@ def check_and_handle_401(e):
     if is_401:
         print("\nErro: O token do Jira fornecido não é mais válido (Erro HTTP 401 - Não Autorizado).")
         print("Por favor, verifique se o 'jira_token' no seu arquivo de configuração está correto e ativo.")
-        exit(1)
+        sys.exit(1)
 
 
 def load_config(config_path):
@@ -43,203 +57,178 @@ def load_config(config_path):
     with open(config_path, 'r', encoding='utf-8') as f:
         return json.load(f)
 
-def get_issues(client, start_date, end_date, project_key, ignore_project_id=False):
-    """Busca issues concluídas no Jira dentro de um período."""
-    
-    jql_parts = []
+def normalize_date(value):
+    """Data de --start-date/--end-date (YYYY-MM-DD ou YYYY/MM/DD) no formato YYYY-MM-DD; None se estiver em outro formato."""
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    return None
+
+def get_project_clause(project_key, ignore_project_id=False):
+    """Cláusula JQL do projeto do config, ou None para buscar em todos os projetos."""
     if not ignore_project_id and project_key:
-        jql_parts.append(f"project = '{project_key}'")
-    elif not ignore_project_id and not project_key:
+        return f"project = '{project_key}'"
+    if not ignore_project_id and not project_key:
         print("Aviso: 'project-id' não definido no config. Buscando em todos os projetos.")
+    return None
 
-    jql_parts.append("status IN (FECHADO, RESOLVIDO)")
-    jql_parts.append(f"resolved >= '{start_date}'")
-    jql_parts.append(f"resolved <= '{end_date}'")
+def get_issues(client, start_date, end_date, project_key, ignore_project_id=False, search_workers=DEFAULT_SEARCH_WORKERS, with_resolution=False, window_size=DEFAULT_WINDOW_SIZE):
+    """Busca issues concluídas no Jira dentro de um período; retorna um iterador que busca as páginas sob demanda."""
     
-    jql_query = " AND ".join(jql_parts)
+    jql_parts = []
+    project_clause = get_project_clause(project_key, ignore_project_id)
+    if project_clause:
+        jql_parts.append(project_clause)
+
+    jql_parts.append(f"status IN ({', '.join(DONE_STATUSES)})")
+    
+    jql_query = " AND ".join(jql_parts + [f"resolved >= '{start_date}'", f"resolved <= '{end_date}'"])
     
     print(f"Executando JQL:\n{jql_query}\n")
     
-    issues = client.search_issues(jql_query, maxResults=False, fields="assignee,components,summary")
-    return issues
+    # Períodos grandes são buscados em janelas de data paralelas; as issues são contadas conforme chegam e descartadas
+    fields = ['assignee', 'components'] + (['resolutiondate'] if with_resolution else [])
+    return search_date_windows(client, jql_parts, start_date, end_date, fields, window_size=window_size, max_workers=search_workers)
 
-def _create_pivot_table(df, index_col, components_ordered):
-    """Função auxiliar para criar e ordenar uma tabela pivô."""
-    pivot = pd.crosstab(df[index_col], df['componente'])
-    
-    if components_ordered:
-        final_order = [col for col in components_ordered if col in pivot.columns]
-        if "Outros Componentes" in pivot.columns and "Outros Componentes" not in final_order:
-            final_order.append("Outros Componentes")
-        for col in pivot.columns:
-            if col not in final_order:
-                final_order.append(col)
-        pivot = pivot[final_order]
-        
-    return pivot
+def _period_label(period, breakdown):
+    """Rótulo do período: 2026-05, 2026Q2 ou, nas semanas, a data da segunda-feira."""
+    return period.start_time.strftime('%Y-%m-%d') if breakdown == 'week' else str(period)
 
-def _calculate_percent_df(pivot_table):
-    """Função auxiliar para calcular o dataframe de percentuais."""
-    if pivot_table.empty or 'Total' not in pivot_table.columns or pivot_table.loc['Total', 'Total'] == 0:
-        return None
-        
-    percent_df = pivot_table.drop('Total').astype(float)
-    row_totals = percent_df['Total']
-    row_totals[row_totals == 0] = 1
-    
-    percent_df = percent_df.drop(columns='Total').div(row_totals, axis=0) * 100
-    percent_df['Total'] = 100.0
-    
-    grand_total = pivot_table.loc['Total', 'Total']
-    total_row_percent = (pivot_table.loc['Total'] / grand_total) * 100
-    percent_df.loc['Total'] = total_row_percent
-    
-    return percent_df
+def generate_report(issues, config, show_as_percent=False, output_file=None, show_roles=False, only_roles=False, breakdown=None, start_date=None, end_date=None):
+    """Gera um relatório em formato de tabela a partir das issues.
+
+    Com `breakdown` (month, quarter ou week), as issues precisam de `resolutiondate` e o relatório ganha as tabelas de
+    tendência entre `start_date` e `end_date` e as contagens de cada período.
+    """
+    # pandas/NumPy só são carregados aqui: `--help` e erros de configuração não pagam o custo do import
+    import pandas as pd
+    from report_pivot import ReportCounter
 
-def generate_report(issues, config, show_as_percent=False, output_file=None, show_roles=False, only_roles=False):
-    """Gera um relatório em formato de tabela a partir das issues."""
-    
     components_str = config.get('components_to_track', '')
     tracked_components_ordered = [comp.strip() for comp in components_str.split(',') if comp.strip()]
     
     role_mappings = {k.replace('role.', '', 1): v for k, v in config.items() if k.startswith('role.')}
     
-    data = []
-    if only_roles:
-        people_with_roles = set(role_mappings.keys())
-
-    for issue in issues:
-        assignee = "Não atribuído"
-        if issue.fields.assignee:
-            assignee = issue.fields.assignee.displayName
-
-        if only_roles and assignee not in people_with_roles:
-            continue
-
-        role = role_mappings.get(assignee)
-        if not role and assignee != "Não atribuído":
-            role = f"*{assignee}"
-
-        if not tracked_components_ordered:
-            if not issue.fields.components:
-                data.append({"assignee": assignee, "role": role or assignee, "componente": "Sem Componente"})
-            else:
-                for c in issue.fields.components:
-                    data.append({"assignee": assignee, "role": role or assignee, "componente": c.name})
-            continue
-
-        assigned_category = "Outros Componentes"
-        if issue.fields.components:
-            issue_components_set = {c.name for c in issue.fields.components}
-            for tracked_comp in tracked_components_ordered:
-                if tracked_comp in issue_components_set:
-                    assigned_category = tracked_comp
-                    break
-        
-        data.append({"assignee": assignee, "role": role or assignee, "componente": assigned_category})
-
-    if not data:
-        print("Nenhuma issue encontrada para os critérios especificados.")
-        return
-
-    df = pd.DataFrame(data)
-
-    # --- Geração de todas as 4 tabelas ---
-
-    # 1. Contagem por Responsável
-    assignee_pivot = _create_pivot_table(df, 'assignee', tracked_components_ordered)
-    assignee_pivot['Total'] = assignee_pivot.sum(axis=1)
-    assignee_pivot.loc['Total'] = assignee_pivot.sum()
-
-    # 2. Percentual por Responsável
-    assignee_percent_df = _calculate_percent_df(assignee_pivot)
-
-    # 3. Contagem por Perfil (Role)
-    role_pivot = _create_pivot_table(df, 'role', tracked_components_ordered)
-    role_counts = df.groupby('role')['assignee'].nunique()
-    role_pivot.insert(0, 'Quant. Perfil Alocado', role_counts)
-    role_pivot.index.name = 'Perfil profissional'
-    task_cols = [col for col in role_pivot.columns if col != 'Quant. Perfil Alocado']
-    role_pivot['Total'] = role_pivot[task_cols].sum(axis=1)
-    total_row = role_pivot.sum()
-    total_row['Quant. Perfil Alocado'] = df['assignee'].nunique()
-    role_pivot.loc['Total'] = total_row
-    
-    # 4. Percentual por Perfil (Role)
-    role_percent_df = _calculate_percent_df(role_pivot.drop(columns=['Quant. Perfil Alocado']))
-
-    # --- Exibição no Console (condicional) ---
-    if show_roles:
-        display_table = role_pivot
-        percent_table_to_format = role_percent_df
-        if show_as_percent and percent_table_to_format is not None:
-            formatted_df = percent_table_to_format.map(lambda x: f"{x:.1f}%")
-            formatted_df.insert(0, 'Quant. Perfil Alocado', role_pivot['Quant. Perfil Alocado'])
-            display_table = formatted_df
-        print("--- Relatório de Tarefas Concluídas por Perfil ---")
-    else:
-        display_table = assignee_pivot
-        if show_as_percent and assignee_percent_df is not None:
-            display_table = assignee_percent_df.map(lambda x: f"{x:.1f}%")
-        print("--- Relatório de Tarefas Concluídas por Responsável ---")
+    with phase('aggregate'):
+        counter = ReportCounter(tracked_components_ordered, role_mappings, only_roles, by_day=bool(breakdown)).add(issues)
+        if not counter:
+            print("Nenhuma issue encontrada para os critérios especificados.")
+            return
+
+        assignee_pivot, assignee_percent_df, role_pivot, role_percent_df = counter.tables()
+        trend_tables = period_tables = None
+        if breakdown:
+            trend_tables, period_tables = counter.breakdown_tables(
+                BREAKDOWN_FREQS[breakdown], lambda period: _period_label(period, breakdown), start_date, end_date)
+
+    with phase('render'):
+        # --- Exibição no Console (condicional) ---
+        if show_roles:
+            display_table = role_pivot
+            percent_table_to_format = role_percent_df
+            if show_as_percent and percent_table_to_format is not None:
+                formatted_df = percent_table_to_format.map(lambda x: f"{x:.1f}%")
+                formatted_df.insert(0, 'Quant. Perfil Alocado', role_pivot['Quant. Perfil Alocado'])
+                display_table = formatted_df
+            print("--- Relatório de Tarefas Concluídas por Perfil ---")
+        else:
+            display_table = assignee_pivot
+            if show_as_percent and assignee_percent_df is not None:
+                display_table = assignee_percent_df.map(lambda x: f"{x:.1f}%")
+            print("--- Relatório de Tarefas Concluídas por Responsável ---")
     
-    print(display_table)
-    print("-" * 70)
+        print(display_table)
+        print("-" * 70)
+        if trend_tables is not None:
+            print(f"--- Tendência por {BREAKDOWN_NAMES[breakdown]} ---")
+            print(trend_tables['Componente'])
+            print("-" * 70)
 
     # --- Exportação para Excel (sempre gera as 5 abas se --output for usado) ---
-    if output_file:
-        try:
-            with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-                # Aba 1
-                assignee_pivot.to_excel(writer, sheet_name='Contagem por Responsável')
-                # Aba 2
-                if assignee_percent_df is not None:
-                    assignee_percent_df.to_excel(writer, sheet_name='Percentual por Responsável', float_format="%.1f")
-                # Aba 3
-                role_pivot.to_excel(writer, sheet_name='Contagem por Perfil')
-                # Aba 4
-                if role_percent_df is not None:
-                    excel_role_percent_df = role_percent_df.copy()
-                    excel_role_percent_df.insert(0, 'Quant. Perfil Alocado', role_pivot['Quant. Perfil Alocado'])
-                    excel_role_percent_df.to_excel(writer, sheet_name='Percentual por Perfil', float_format="%.1f")
-                # Aba 5
-                if role_mappings:
-                    mapping_df = pd.DataFrame(list(role_mappings.items()), columns=['Responsável', 'Perfil'])
-                    mapping_df.to_excel(writer, sheet_name='Mapeamento Perfis', index=False)
-
-            print(f"\nRelatório salvo com sucesso em '{output_file}'")
-        except Exception as e:
-            print(f"\nErro ao salvar o arquivo Excel: {e}")
-
-
-if __name__ == "__main__":
+    with phase('export'):
+        if output_file:
+            try:
+                with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
+                    # Aba 1
+                    assignee_pivot.to_excel(writer, sheet_name='Contagem por Responsável')
+                    # Aba 2
+                    if assignee_percent_df is not None:
+                        assignee_percent_df.to_excel(writer, sheet_name='Percentual por Responsável', float_format="%.1f")
+                    # Aba 3
+                    role_pivot.to_excel(writer, sheet_name='Contagem por Perfil')
+                    # Aba 4
+                    if role_percent_df is not None:
+                        excel_role_percent_df = role_percent_df.copy()
+                        excel_role_percent_df.insert(0, 'Quant. Perfil Alocado', role_pivot['Quant. Perfil Alocado'])
+                        excel_role_percent_df.to_excel(writer, sheet_name='Percentual por Perfil', float_format="%.1f")
+                    # Aba 5
+                    if role_mappings:
+                        mapping_df = pd.DataFrame(list(role_mappings.items()), columns=['Responsável', 'Perfil'])
+                        mapping_df.to_excel(writer, sheet_name='Mapeamento Perfis', index=False)
+                    # Abas do --breakdown: tendências e a contagem de cada período
+                    if trend_tables is not None:
+                        for name, table in trend_tables.items():
+                            table.to_excel(writer, sheet_name=f'Tendência por {name}')
+                        for label, (period_assignee_pivot, period_role_pivot) in period_tables.items():
+                            if show_roles:
+                                period_role_pivot.to_excel(writer, sheet_name=f'{label} Perfil')
+                            else:
+                                period_assignee_pivot.to_excel(writer, sheet_name=f'{label} Responsável')
+
+                print(f"\nRelatório salvo com sucesso em '{output_file}'")
+            except Exception as e:
+                print(f"\nErro ao salvar o arquivo Excel: {e}")
+
+
+def main(argv=None, prog=None):
+    """Ponto de entrada da linha de comando; `argv` (padrão: sys.argv[1:]) permite chamar a partir de outro código."""
     parser = argparse.ArgumentParser(
+        prog=prog,
         description="Gera um relatório de tarefas concluídas no Jira por responsável e componente."
     )
     # Argumentos...
     parser.add_argument('-c', '--config', type=str, required=True, help='Caminho para o arquivo de configuração JSON.')
-    parser.add_argument('--start-date', type=str, help='Data de início do período (YYYY-MM-DD).')
-    parser.add_argument('--end-date', type=str, help='Data de fim do período (YYYY-MM-DD).')
+    parser.add_argument('--start-date', type=str, help='Data de início do período (YYYY-MM-DD, YYYY/MM/DD ou outro formato aceito pela JQL, ex.: -30d).')
+    parser.add_argument('--end-date', type=str, help='Data de fim do período (YYYY-MM-DD, YYYY/MM/DD ou outro formato aceito pela JQL, ex.: -30d).')
     parser.add_argument('--month', type=int, help='Mês numérico (1-12) para o relatório.')
     parser.add_argument('--year', type=int, help='Ano para o relatório.')
     parser.add_argument('--percent', action='store_true', help='Exibe os resultados em formato percentual.')
     parser.add_argument('--output', type=str, help='Caminho do arquivo Excel para salvar o relatório.')
     parser.add_argument('--show_roles', action='store_true', help='Agrupa o relatório por perfil (role).')
+    parser.add_argument('--breakdown', choices=list(BREAKDOWN_FREQS), help='Divide o período em meses, trimestres ou semanas com uma única busca: imprime a tendência por componente e, com --output, grava as abas de tendência e a contagem de cada período.')
     parser.add_argument('--ignore-project-id', action='store_true', help='Executa a consulta em todos os projetos, ignorando o project-id do config.')
     parser.add_argument('--only-roles', action='store_true', help='Considera apenas responsáveis com perfil definido.')
-
-    args = parser.parse_args()
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--sync', action='store_true', help='Atualiza o armazém local com as issues concluídas alteradas desde a última sincronização (na primeira, desde o início do período, se informado). Com um período, gera o relatório a partir do armazém.')
+    mode.add_argument('--offline', action='store_true', help='Gera o relatório a partir do armazém local, sem chamadas ao Jira (use --sync antes).')
+    parser.add_argument('--store', type=str, help="Arquivo SQLite do armazém local. Padrão: `report-store` do config ou <config>.issues.sqlite ao lado do arquivo de configuração.")
+    parser.add_argument('--search-workers', type=int, help=f'Número máximo de páginas de busca buscadas em paralelo. Padrão: {DEFAULT_SEARCH_WORKERS}.')
+    parser.add_argument('--max-rps', type=float, help=f"Limite de requisições por segundo ao Jira, compartilhado entre todas as threads (0 desativa). Padrão: `max-requests-per-second` do config ou {DEFAULT_MAX_RPS}. Respostas 429/503 são repetidas respeitando o Retry-After.")
+    parser.add_argument('--metrics-json', type=str, help='Grava ao final um resumo JSON das métricas (requisições por endpoint, latência, status, tentativas, bytes e tempo por fase).')
+    parser.add_argument('--metrics-prom', type=str, help='Grava ao final as mesmas métricas no formato texto do Prometheus (textfile collector).')
+    parser.add_argument('--profile', nargs='?', const='', default=None, metavar='PREFIXO', help="Perfila a execução: grava PREFIXO.pstats (cProfile de todas as threads) e PREFIXO.collapsed.txt (pilhas para flamegraph), mede o pico de memória por fase (tracemalloc) e imprime as funções mais custosas ao final. Padrão do prefixo: profile_<script>_TIMESTAMP.")
+    parser.add_argument('--profile-top', type=int, default=DEFAULT_PROFILE_TOP, help=f"Número de funções na tabela de hotspots do --profile. Padrão: {DEFAULT_PROFILE_TOP}.")
+
+    args = parser.parse_args(argv)
     config = load_config(args.config)
-    if not config: exit(1)
+    if not config: sys.exit(1)
     token = config.get("jira_token")
-    if not token or "YOUR_JIRA_API_TOKEN" in token:
+    if not args.offline and (not token or "YOUR_JIRA_API_TOKEN" in token):
         print("Erro: Token do Jira não encontrado ou não configurado no arquivo de configuração JSON.")
-        exit(1)
+        sys.exit(1)
 
     # Lógica de data...
     start_date_str, end_date_str = "", ""
     if args.start_date and args.end_date:
-        start_date_str, end_date_str = args.start_date, args.end_date
+        start_date_str, end_date_str = normalize_date(args.start_date), normalize_date(args.end_date)
+        if (args.sync or args.offline) and None in (start_date_str, end_date_str):
+            # O armazém local compara datas; formatos relativos da JQL (ex.: -30d) só valem nas buscas ao Jira
+            print("Erro: Com --sync/--offline, use datas no formato YYYY-MM-DD (ou YYYY/MM/DD).")
+            sys.exit(1)
+        # Outros formatos aceitos pela JQL (ex.: -30d) vão para a consulta como foram informados
+        start_date_str, end_date_str = start_date_str or args.start_date, end_date_str or args.end_date
     elif args.month and args.year:
         start_date = datetime(args.year, args.month, 1)
         end_date = datetime(args.year, args.month, monthrange(args.year, args.month)[1])
@@ -247,18 +236,52 @@ if __name__ == "__main__":
     elif args.year:
         start_date, end_date = datetime(args.year, 1, 1), datetime(args.year, 12, 31)
         start_date_str, end_date_str = start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')
-    else:
+    elif not args.sync:
         print("Erro: Você deve especificar um período.")
-        exit(1)
+        sys.exit(1)
 
-    print(f"Gerando relatório para o período de {start_date_str} a {end_date_str}...")
+    if start_date_str:
+        print(f"Gerando relatório para o período de {start_date_str} a {end_date_str}...")
 
+    store = None
+    enable_metrics_export('report', args.metrics_json or config.get('metrics-json'), args.metrics_prom or config.get('metrics-prom'))
+    if args.profile is not None:
+        start_profiling('report', args.profile, args.profile_top)
     try:
-        jira_client = JIRA(server=config['jira_server'], options={'headers': {'Authorization': f'Bearer {token}'}})
         project_key = config.get('project-id')
-        issues = get_issues(jira_client, start_date_str, end_date_str, project_key, args.ignore_project_id)
-        generate_report(issues, config, args.percent, args.output, args.show_roles, args.only_roles)
+        search_workers = args.search_workers or config.get('search-workers', DEFAULT_SEARCH_WORKERS)
+        if args.sync or args.offline:
+            store_path = args.store or config.get('report-store') or f"{os.path.splitext(args.config)[0]}.issues.sqlite"
+            store = IssueStore(store_path)
+            scope_clause = get_project_clause(project_key, args.ignore_project_id)
+            scope = project_key if scope_clause else '*'
+        if args.sync:
+            jira_client = create_jira_client(config, pool_size=pool_size_for(config, search_workers), max_rps=args.max_rps)
+            saved, removed = sync_issues(store, jira_client, scope_clause, scope, DONE_STATUSES, start_date_str or None, search_workers)
+            print(f"Armazém local '{store_path}' atualizado: {saved} issues gravadas, {removed} removidas.\n")
+            if not start_date_str:
+                return
+        if store is not None:
+            info = store.sync_info(scope)
+            if info is None:
+                print(f"Aviso: O armazém local '{store_path}' nunca foi sincronizado para este escopo. Execute com --sync.")
+            elif info[1] and start_date_str < info[1]:
+                print(f"Aviso: O armazém local só tem issues resolvidas a partir de {info[1]}. Execute com --sync e este período para completar.")
+            issues = store.iter_issues(start_date_str, end_date_str, None if scope == '*' else scope)
+        else:
+            jira_client = create_jira_client(config, pool_size=pool_size_for(config, search_workers), max_rps=args.max_rps)
+            issues = get_issues(jira_client, start_date_str, end_date_str, project_key, args.ignore_project_id, search_workers, with_resolution=bool(args.breakdown), window_size=config.get('search-window-size', DEFAULT_WINDOW_SIZE))
+        generate_report(issues, config, args.percent, args.output, args.show_roles, args.only_roles, args.breakdown, start_date_str, end_date_str)
     except Exception as e:
         check_and_handle_401(e)
         print(f"Ocorreu um erro: {e}")
-        exit(1)
+        sys.exit(1)
+    finally:
+        if store is not None:
+            store.close()
+        stop_profiling()
+        flush_metrics_export()
+
+
+if __name__ == "__main__":
+    main()
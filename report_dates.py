@@ -0,0 +1,16 @@
+from datetime import datetime
+
+
+def local_timestamp(value):
+    """Data de resolução do Jira (`2026-05-31T14:22:10.000+0000` ou `2026-05-31`) como `YYYY-MM-DD HH:MM:SS` no fuso local.
+
+    É a mesma referência das datas sem hora da JQL (`resolved <= '2026-05-31'` é meia-noite do dia 31).
+    """
+    text = str(value)
+    try:
+        parsed = datetime.strptime(text, '%Y-%m-%dT%H:%M:%S.%f%z')
+    except ValueError:
+        parsed = datetime.fromisoformat(text.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed.strftime('%Y-%m-%d %H:%M:%S')
@@ -0,0 +1,275 @@
+from operator import itemgetter
+
+import numpy as np
+import pandas as pd
+
+from report_dates import local_timestamp
+
+UNASSIGNED = "Não atribuído"
+OTHER_COMPONENTS = "Outros Componentes"
+NO_COMPONENT = "Sem Componente"
+# Entradas (issue x componente) acumuladas antes de cada redução com NumPy
+CHUNK_SIZE = 65536
+# Bits de cada código na chave combinada (responsável | componente | dia)
+_CODE_BITS = 21
+
+
+_name = itemgetter('name')
+
+
+def _fields(issue):
+    """Campos da issue lidos pelos atributos, no formato de `raw['fields']`, para objetos sem `raw`."""
+    fields = issue.fields
+    assignee = getattr(fields, 'assignee', None)
+    return {
+        'assignee': {'displayName': assignee.displayName} if assignee else None,
+        'components': [{'name': c.name} for c in getattr(fields, 'components', None) or []],
+        'resolutiondate': getattr(fields, 'resolutiondate', None),
+    }
+
+
+class _Codes(dict):
+    """Nome -> código inteiro na ordem em que aparece."""
+
+    def code(self, name):
+        value = self.get(name)
+        if value is None:
+            value = self[name] = len(self)
+        return value
+
+    def names(self):
+        return list(self)
+
+
+class ReportCounter:
+    """Motor do relatório: conta as issues em uma matriz responsável x componente (x dia) de códigos inteiros.
+
+    Cada issue é lida uma vez e descartada; responsável, perfil, componente e dia viram códigos e as entradas são
+    reduzidas com NumPy em blocos, então a memória não cresce com o número de issues. Todas as tabelas (contagens,
+    perfis alocados e percentuais) saem da mesma matriz.
+    """
+
+    def __init__(self, tracked_components_ordered, role_mappings, only_roles=False, by_day=False):
+        self.tracked = list(tracked_components_ordered)
+        self.role_mappings = role_mappings
+        self.only_roles = only_roles
+        self.by_day = by_day
+        self.assignees = _Codes()
+        self.roles = _Codes()
+        self.components = _Codes()
+        self.days = _Codes()
+        self.assignee_roles = []
+        self._assignee_keys = {}
+        self._component_keys = {}
+        self._pending = []
+        self._totals = {}
+
+    def _assignee_key(self, name):
+        """Chave deslocada do responsável, ou None se ele fica fora do relatório (--only-roles)."""
+        key = None
+        if not self.only_roles or name in self.role_mappings:
+            role = self.role_mappings.get(name)
+            if not role and name != UNASSIGNED:
+                role = f"*{name}"
+            code = self.assignees.code(name)
+            self.assignee_roles.append(self.roles.code(role or name))
+            key = code << (2 * _CODE_BITS)
+        self._assignee_keys[name] = key
+        return key
+
+    def _component_keys_for(self, names):
+        """Códigos das categorias de uma combinação de componentes (o primeiro rastreado, ou todos sem rastreamento)."""
+        if not self.tracked:
+            categories = list(names) or [NO_COMPONENT]
+        else:
+            present = set(names)
+            categories = [next((c for c in self.tracked if c in present), OTHER_COMPONENTS)]
+        keys = self._component_keys[names] = [self.components.code(c) << _CODE_BITS for c in categories]
+        return keys
+
+    def add(self, issues):
+        """Consome `issues` (qualquer iterável, inclusive um gerador de páginas) somando-as na matriz."""
+        pending = self._pending
+        # Caches por responsável e por combinação de componentes: no laço, só buscas em dict e um append por entrada
+        assignee_keys, component_keys = self._assignee_keys, self._component_keys
+        for issue in issues:
+            try:
+                fields = issue.raw['fields']
+            except (AttributeError, KeyError, TypeError):
+                fields = _fields(issue)
+            assignee = fields.get('assignee')
+            name = assignee['displayName'] if assignee else UNASSIGNED
+            assignee_key = assignee_keys[name] if name in assignee_keys else self._assignee_key(name)
+            if assignee_key is None:
+                continue
+            components = fields.get('components')
+            names = tuple(map(_name, components)) if components else ()
+            keys = component_keys.get(names)
+            if keys is None:
+                keys = self._component_keys_for(names)
+            if self.by_day:
+                assignee_key |= self.days.code(local_timestamp(fields.get('resolutiondate'))[:10])
+            for component_key in keys:
+                pending.append(assignee_key | component_key)
+            if len(pending) >= CHUNK_SIZE:
+                self._flush()
+        self._flush()
+        return self
+
+    def _flush(self):
+        if not self._pending:
+            return
+        keys, counts = np.unique(np.array(self._pending, dtype=np.int64), return_counts=True)
+        totals = self._totals
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            totals[key] = totals.get(key, 0) + count
+        self._pending.clear()
+
+    def __bool__(self):
+        return bool(self._totals)
+
+    def matrix(self):
+        """Contagens no formato (responsáveis, componentes, dias); sem `by_day`, a última dimensão tem tamanho 1."""
+        shape = (len(self.assignees), len(self.components), max(1, len(self.days)))
+        result = np.zeros(shape, dtype=np.int64)
+        if self._totals:
+            keys = np.fromiter(self._totals.keys(), dtype=np.int64, count=len(self._totals))
+            mask = (1 << _CODE_BITS) - 1
+            result[keys >> (2 * _CODE_BITS), (keys >> _CODE_BITS) & mask, keys & mask] = np.fromiter(self._totals.values(), dtype=np.int64, count=len(self._totals))
+        return result
+
+    def tables(self):
+        """As 4 tabelas do relatório: contagem e percentual por responsável e por perfil."""
+        return self._tables(self.matrix().sum(axis=2))
+
+    def _component_order(self, names):
+        """Ordem das colunas: as rastreadas na ordem do config, depois 'Outros Componentes' e as demais, em ordem alfabética."""
+        names = sorted(names)
+        if not self.tracked:
+            return names
+        order = [c for c in self.tracked if c in names]
+        if OTHER_COMPONENTS in names and OTHER_COMPONENTS not in order:
+            order.append(OTHER_COMPONENTS)
+        return order + [c for c in names if c not in order]
+
+    def _tables(self, counts):
+        assignee_names = np.array(self.assignees.names(), dtype=object)
+        component_names = self.components.names()
+        rows = np.flatnonzero(counts.sum(axis=1))
+        rows = rows[np.argsort(assignee_names[rows].astype(str), kind='stable')]
+        present = [component_names[i] for i in np.flatnonzero(counts.sum(axis=0))]
+        columns = [self.components[name] for name in self._component_order(present)]
+        component_index = [component_names[i] for i in columns]
+        counts = counts[np.ix_(rows, columns)]
+
+        # 1. Contagem por Responsável
+        assignee_pivot = _count_table(counts, list(assignee_names[rows]), 'assignee', component_index)
+
+        # 2. Percentual por Responsável
+        assignee_percent_df = _percent_table(assignee_pivot.to_numpy(), assignee_pivot.index, assignee_pivot.columns)
+
+        # 3. Contagem por Perfil (Role): soma das linhas dos responsáveis de cada perfil
+        role_names = np.array(self.roles.names(), dtype=object)
+        row_roles = np.array(self.assignee_roles, dtype=np.int64)[rows]
+        used_roles = np.unique(row_roles)
+        used_roles = used_roles[np.argsort(role_names[used_roles].astype(str), kind='stable')]
+        role_position = np.empty(len(role_names), dtype=np.int64)
+        role_position[used_roles] = np.arange(len(used_roles))
+        role_counts = np.zeros((len(used_roles), counts.shape[1]), dtype=np.int64)
+        np.add.at(role_counts, role_position[row_roles], counts)
+        head_counts = np.bincount(role_position[row_roles], minlength=len(used_roles))
+        role_pivot = _count_table(role_counts, list(role_names[used_roles]), 'Perfil profissional', component_index,
+                                  head_counts=head_counts, total_heads=len(rows))
+
+        # 4. Percentual por Perfil (Role)
+        role_values = role_pivot.to_numpy()[:, 1:]
+        role_percent_df = _percent_table(role_values, role_pivot.index, role_pivot.columns[1:])
+        return assignee_pivot, assignee_percent_df, role_pivot, role_percent_df
+
+    def breakdown_tables(self, freq, label_period, start_date=None, end_date=None):
+        """Tabelas do --breakdown: tendências por componente, responsável e perfil (com os períodos sem issues) e,
+        por período, as tabelas de contagem por responsável e por perfil."""
+        day_names = self.days.names()
+        periods = pd.PeriodIndex(pd.to_datetime(day_names), freq=freq)
+        first, last = periods.min(), periods.max()
+        start, end = _period_or_none(start_date, freq), _period_or_none(end_date, freq)
+        if start is not None:
+            first = min(first, start)
+        if end is not None:
+            last = max(last, end)
+        all_periods = pd.period_range(first, last, freq=freq)
+        labels = [label_period(period) for period in all_periods]
+        day_period = all_periods.get_indexer(periods)
+
+        by_day = self.matrix()
+        counts = np.zeros(by_day.shape[:2] + (len(all_periods),), dtype=np.int64)
+        np.add.at(counts, (slice(None), slice(None), day_period), by_day)
+
+        assignee_names = np.array(self.assignees.names(), dtype=object)
+        role_names = np.array(self.roles.names(), dtype=object)
+        component_names = self.components.names()
+        present = [component_names[i] for i in np.flatnonzero(counts.sum(axis=(0, 2)))]
+        columns = [self.components[name] for name in self._component_order(present)]
+
+        # Períodos x componentes
+        period_components = counts.sum(axis=0)[columns].T
+        by_component = _count_table(period_components, labels, 'Período', [component_names[i] for i in columns])
+        trends = {'Componente': by_component}
+
+        # Responsáveis x períodos e perfis x períodos
+        assignee_periods = counts.sum(axis=1)
+        rows = np.flatnonzero(assignee_periods.sum(axis=1))
+        rows = rows[np.argsort(assignee_names[rows].astype(str), kind='stable')]
+        trends['Responsável'] = _count_table(assignee_periods[rows], list(assignee_names[rows]), 'assignee', labels, 'periodo')
+        row_roles = np.array(self.assignee_roles, dtype=np.int64)
+        role_periods = np.zeros((len(role_names), len(labels)), dtype=np.int64)
+        np.add.at(role_periods, row_roles, assignee_periods)
+        used_roles = np.flatnonzero(role_periods.sum(axis=1))
+        used_roles = used_roles[np.argsort(role_names[used_roles].astype(str), kind='stable')]
+        trends['Perfil'] = _count_table(role_periods[used_roles], list(role_names[used_roles]), 'role', labels, 'periodo')
+
+        per_period = {}
+        for position in np.flatnonzero(counts.sum(axis=(0, 1))):
+            assignee_pivot, _, role_pivot, _ = self._tables(counts[:, :, position])
+            per_period[labels[position]] = (assignee_pivot, role_pivot)
+        return trends, dict(sorted(per_period.items()))
+
+
+def _period_or_none(value, freq):
+    """Período de uma data YYYY-MM-DD; None sem data ou para datas relativas da JQL (ex.: -30d), que não estendem a tendência."""
+    if not value:
+        return None
+    try:
+        return pd.Period(value, freq)
+    except ValueError:
+        return None
+
+
+def _count_table(counts, index, index_name, columns, columns_name='componente', head_counts=None, total_heads=None):
+    """DataFrame de contagens com coluna e linha 'Total' (e, nos perfis, a coluna de perfis alocados à frente)."""
+    rows, cols = counts.shape
+    values = np.empty((rows + 1, cols + 1 + (head_counts is not None)), dtype=np.int64)
+    offset = 0
+    if head_counts is not None:
+        values[:rows, 0] = head_counts
+        values[rows, 0] = total_heads
+        offset = 1
+    values[:rows, offset:offset + cols] = counts
+    values[:rows, -1] = counts.sum(axis=1)
+    values[rows, offset:] = values[:rows, offset:].sum(axis=0)
+    header = (['Quant. Perfil Alocado'] if head_counts is not None else []) + list(columns) + ['Total']
+    return pd.DataFrame(values, index=pd.Index(list(index) + ['Total'], name=index_name), columns=pd.Index(header, name=columns_name))
+
+
+def _percent_table(values, index, columns):
+    """Percentual de cada linha sobre o próprio total; a linha 'Total' é a participação de cada coluna no total geral."""
+    grand_total = values[-1, -1]
+    if values.shape[0] <= 1 or grand_total == 0:
+        return None
+    row_totals = values[:-1, -1].astype(float)
+    row_totals[row_totals == 0] = 1
+    percent = np.empty(values.shape, dtype=float)
+    percent[:-1, :-1] = values[:-1, :-1] / row_totals[:, None] * 100
+    percent[:-1, -1] = 100.0
+    percent[-1] = values[-1] / grand_total * 100
+    return pd.DataFrame(percent, index=index, columns=columns)
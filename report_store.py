@@ -0,0 +1,146 @@
+import json
+import sqlite3
+import threading
+import time
+
+from jira_search import DEFAULT_SEARCH_WORKERS, LeanIssue, lean_search_pages
+from rank_state import updated_since_jql
+from report_dates import local_timestamp
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS issues (
+    issue_key TEXT PRIMARY KEY,
+    project TEXT,
+    resolved TEXT NOT NULL,
+    assignee TEXT,
+    components TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS issues_resolved ON issues (resolved);
+CREATE TABLE IF NOT EXISTS syncs (
+    scope TEXT PRIMARY KEY,
+    last_sync REAL NOT NULL,
+    synced_from TEXT
+);
+"""
+
+# Campos buscados na sincronização: o suficiente para decidir se a issue entra no relatório e para contá-la
+SYNC_FIELDS = ['status', 'resolutiondate', 'assignee', 'components', 'project']
+# Linhas lidas do SQLite por vez em `iter_issues`
+ITER_BATCH_SIZE = 1000
+
+
+class IssueStore:
+    """Armazém local (SQLite) das issues concluídas usadas pelo report.py, atualizado de forma incremental.
+
+    Guarda só chave, projeto, data de resolução, responsável e componentes; `syncs` registra por escopo
+    (projeto ou `*`) o instante da última sincronização, usado como marca d'água da seguinte.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def sync_info(self, scope):
+        """(última sincronização, data inicial carregada ou None para todo o histórico) do escopo; None se nunca sincronizado."""
+        with self._lock:
+            row = self._conn.execute("SELECT last_sync, synced_from FROM syncs WHERE scope = ?", (scope,)).fetchone()
+        return tuple(row) if row else None
+
+    def set_synced(self, scope, timestamp, synced_from=None):
+        """Registra a sincronização do escopo; `synced_from` None significa todo o histórico."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO syncs (scope, last_sync, synced_from) VALUES (?, ?, ?) "
+                "ON CONFLICT(scope) DO UPDATE SET last_sync = excluded.last_sync, synced_from = excluded.synced_from",
+                (scope, timestamp, synced_from),
+            )
+
+    def apply_page(self, issues, done_statuses):
+        """Grava as issues de uma página em status concluído e remove as demais (reabertas). Retorna (gravadas, removidas)."""
+        rows, removed = [], []
+        for issue in issues:
+            fields = issue.raw['fields']
+            status = ((fields.get('status') or {}).get('name') or '').upper()
+            resolved = fields.get('resolutiondate')
+            if status not in done_statuses or not resolved:
+                removed.append((issue.key,))
+                continue
+            rows.append((
+                issue.key,
+                (fields.get('project') or {}).get('key'),
+                local_timestamp(resolved),
+                (fields.get('assignee') or {}).get('displayName'),
+                json.dumps([c.get('name') for c in fields.get('components') or []], ensure_ascii=False),
+            ))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO issues (issue_key, project, resolved, assignee, components) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(issue_key) DO UPDATE SET project = excluded.project, resolved = excluded.resolved, "
+                "assignee = excluded.assignee, components = excluded.components",
+                rows,
+            )
+            deleted = self._conn.executemany("DELETE FROM issues WHERE issue_key = ?", removed).rowcount
+        return len(rows), max(0, deleted)
+
+    def iter_issues(self, start_date, end_date, project_key=None):
+        """Issues resolvidas entre `start_date` e `end_date` (YYYY-MM-DD, mesma semântica da JQL), como `LeanIssue`."""
+        query = "SELECT issue_key, resolved, assignee, components FROM issues WHERE resolved >= ? AND resolved <= ?"
+        params = [f"{start_date} 00:00:00", f"{end_date} 00:00:00"]
+        if project_key:
+            query += " AND project = ?"
+            params.append(project_key)
+        with self._lock:
+            cursor = self._conn.execute(query, params)
+        while True:
+            # Lê o cursor em blocos: a memória não cresce com o período
+            with self._lock:
+                rows = cursor.fetchmany(ITER_BATCH_SIZE)
+            if not rows:
+                break
+            for key, resolved, assignee, components in rows:
+                yield LeanIssue({'key': key, 'fields': {
+                    'resolutiondate': resolved,
+                    'assignee': {'displayName': assignee} if assignee else None,
+                    'components': [{'name': name} for name in json.loads(components)],
+                }})
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def sync_issues(store, client, scope_jql, scope, done_statuses, since_date=None, search_workers=DEFAULT_SEARCH_WORKERS, margin_minutes=5):
+    """Baixa para o `store` as issues do escopo alteradas desde a última sincronização (ou todas as concluídas, na primeira).
+
+    `since_date` (YYYY-MM-DD) limita a primeira carga às issues resolvidas a partir dessa data; se for anterior ao que
+    já foi carregado, o período que falta é buscado. As páginas são gravadas conforme chegam. Issues excluídas no Jira
+    não aparecem nas buscas e ficam no armazém. Retorna (gravadas, removidas).
+    """
+    started = time.time()
+    info = store.sync_info(scope)
+    base = [scope_jql] if scope_jql else []
+    done_clause = f"status IN ({', '.join(done_statuses)})"
+    queries = []
+    synced_from = since_date
+    if info is None:
+        queries.append(base + [done_clause] + ([f"resolved >= '{since_date}'"] if since_date else []))
+    else:
+        last_sync, synced_from = info
+        if synced_from and (not since_date or since_date < synced_from):
+            # Período anterior ao já carregado
+            queries.append(base + [done_clause, f"resolved < '{synced_from}'"] + ([f"resolved >= '{since_date}'"] if since_date else []))
+            synced_from = since_date
+        queries.append(base + [updated_since_jql(last_sync, margin_minutes, now=started)])
+
+    saved = removed = 0
+    for clauses in queries:
+        jql = " AND ".join(clauses)
+        print(f"Sincronizando o armazém local com a JQL:\n{jql}\n")
+        for page in lean_search_pages(client, jql, SYNC_FIELDS, max_workers=search_workers):
+            page_saved, page_removed = store.apply_page(page, done_statuses)
+            saved += page_saved
+            removed += page_removed
+    store.set_synced(scope, started, synced_from)
+    return saved, removed
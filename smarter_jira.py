@@ -0,0 +1,75 @@
+"""Ponto de entrada único do Smarter Jira: `smarter-jira rank|report|import [argumentos do script]`.
+
+Os módulos dos comandos (e o jira/pandas) só são importados quando o comando é executado, então `--help` e erros
+de configuração respondem rápido. As mesmas operações ficam disponíveis como API, para um agendador rodar vários
+jobs no mesmo processo (reaproveitando sessões HTTP e o cache de campos):
+
+    import smarter_jira
+    smarter_jira.rank('-c', 'config.json', '--project-id', 'ABC', '--brief')
+    smarter_jira.report('-c', 'config.json', '--month', '5', '--year', '2026', '--output', 'relatorio.xlsx')
+"""
+import argparse
+import importlib
+import sys
+
+PROG = 'smarter-jira'
+# comando -> (módulo com `main(argv, prog)`, descrição)
+COMMANDS = {
+    'rank': ('rank_issues', 'Reordena as issues filhas de uma issue pai, dos épicos de um projeto ou de sprints.'),
+    'report': ('report', 'Gera o relatório de tarefas concluídas por responsável e componente.'),
+    'import': ('import', 'Cria, deleta ou atualiza issues a partir de um arquivo CSV.'),
+}
+
+
+def _exit_code(code):
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code, file=sys.stderr)
+    return 1
+
+
+def run(command, argv=()):
+    """Executa `command` (rank, report ou import) com os argumentos `argv` e retorna o código de saída (0 em caso de sucesso)."""
+    if command not in COMMANDS:
+        raise ValueError(f"Comando desconhecido: {command}. Opções: {', '.join(COMMANDS)}")
+    module = importlib.import_module(COMMANDS[command][0])
+    try:
+        module.main([str(arg) for arg in argv], prog=f"{PROG} {command}")
+    except SystemExit as e:
+        return _exit_code(e.code)
+    return 0
+
+
+def rank(*argv):
+    """Equivalente a `smarter-jira rank ARGV...`; retorna o código de saída."""
+    return run('rank', argv)
+
+
+def report(*argv):
+    """Equivalente a `smarter-jira report ARGV...`; retorna o código de saída."""
+    return run('report', argv)
+
+
+def import_issues(*argv):
+    """Equivalente a `smarter-jira import ARGV...`; retorna o código de saída."""
+    return run('import', argv)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog=PROG,
+        description="Processa issues do Jira em lote.",
+        epilog="\n".join([f"  {name:<8} {description}" for name, (_, description) in COMMANDS.items()])
+        + f"\n\nUse `{PROG} COMANDO --help` para os argumentos de cada comando.",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('command', choices=list(COMMANDS), metavar='COMANDO', help=f"Um de: {', '.join(COMMANDS)}.")
+    parser.add_argument('args', nargs=argparse.REMAINDER, metavar='...', help='Argumentos repassados ao comando.')
+    args = parser.parse_args(argv)
+    return run(args.command, args.args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())